@@ -1,6 +1,10 @@
 from django.contrib import admin
 
 # Register your models here.
-from .models import Attraction
+from .models import Attraction, AttractionSyncState
 
-admin.site.register(Attraction)
\ No newline at end of file
+admin.site.register(Attraction)
+
+@admin.register(AttractionSyncState)
+class AttractionSyncStateAdmin(admin.ModelAdmin):
+    list_display = ('area', 'last_synced_at', 'attraction_count', 'last_error')
@@ -0,0 +1,38 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from attractions.sync import sync_area, sync_stale_areas
+
+
+class Command(BaseCommand):
+    help = 'Refresh attractions from OpenStreetMap for every configured area whose TTL has expired'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--area', type=str, help='Only sync this area (ignores the TTL)')
+        parser.add_argument('--force', action='store_true', help='Sync every area regardless of the TTL')
+        parser.add_argument('--loop', action='store_true', help='Keep running and re-check areas every --interval seconds')
+        parser.add_argument('--interval', type=int, default=60, help='Seconds between checks when looping')
+
+    def handle(self, *args, **options):
+        while True:
+            if options['area']:
+                if options['area'] not in settings.ATTRACTION_SYNC_AREAS:
+                    self.stderr.write(self.style.ERROR(f"Unknown area: {options['area']}"))
+                    return
+                results = {options['area']: sync_area(options['area'])}
+            else:
+                results = sync_stale_areas(force=options['force'])
+
+            if not results:
+                self.stdout.write('All areas are fresh')
+            for area, outcome in results.items():
+                if isinstance(outcome, int):
+                    self.stdout.write(self.style.SUCCESS(f'Synced {outcome} attractions for {area}'))
+                else:
+                    self.stderr.write(self.style.ERROR(f'Failed to sync {area}: {outcome}'))
+
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-18 17:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attractions', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttractionSyncState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('area', models.CharField(max_length=100, unique=True)),
+                ('last_synced_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True)),
+                ('attraction_count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+    ]
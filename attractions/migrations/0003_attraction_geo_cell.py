@@ -0,0 +1,33 @@
+# Generated by Django 5.1.7 on 2026-10-18 17:23
+
+from django.db import migrations, models
+
+from services.geo import cell_for
+
+
+def backfill_geo_cell(apps, schema_editor):
+    Model = apps.get_model('attractions', 'attraction')
+    batch = []
+    for obj in Model.objects.only('id', 'latitude', 'longitude').iterator(chunk_size=2000):
+        obj.geo_cell = cell_for(obj.latitude, obj.longitude)
+        batch.append(obj)
+        if len(batch) >= 2000:
+            Model.objects.bulk_update(batch, ['geo_cell'])
+            batch = []
+    Model.objects.bulk_update(batch, ['geo_cell'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attractions', '0002_attractionsyncstate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attraction',
+            name='geo_cell',
+            field=models.BigIntegerField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_geo_cell, migrations.RunPython.noop),
+    ]
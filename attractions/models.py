@@ -1,6 +1,7 @@
 from django.db import models
+from services.models import GeoIndexedModel
 
-class Attraction(models.Model):
+class Attraction(GeoIndexedModel):
     osm_id = models.BigIntegerField(unique=True)
     name = models.CharField(max_length=255)
     latitude = models.FloatField()
@@ -11,3 +12,15 @@ class Attraction(models.Model):
 
     def __str__(self):
         return self.name
+
+class AttractionSyncState(models.Model):
+    """
+    Bookkeeping for the Overpass refresh of one configured area.
+    """
+    area = models.CharField(max_length=100, unique=True)
+    last_synced_at = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True)
+    attraction_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.area} ({self.last_synced_at or 'never synced'})"
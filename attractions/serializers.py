@@ -4,4 +4,4 @@ from .models import Attraction
 class AttractionSerializer(serializers.ModelSerializer):
     class Meta:
         model = Attraction
-        fields = "__all__"
+        exclude = ["geo_cell"]
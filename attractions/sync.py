@@ -0,0 +1,148 @@
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from services import images, overpass_tiles
+from services.osm_ingest import upsert_rows, values_by_key
+
+from .models import Attraction, AttractionSyncState
+
+logger = logging.getLogger(__name__)
+
+# How often (seconds) a web worker re-reads the sync state table to decide
+# whether a background refresh is due.
+STALENESS_CHECK_INTERVAL = 30
+
+ATTRACTION_UPDATE_FIELDS = ["name", "latitude", "longitude", "category", "image_url"]
+
+_refresh_lock = threading.Lock()
+_refresh_thread = None
+_next_staleness_check = 0.0
+
+
+def fetch_osm_attractions(lat, lon, radius):
+    """
+    Fetch attractions from OpenStreetMap and update the database.
+    Returns the number of attractions written.
+    """
+    elements, _ = overpass_tiles.fetch_elements(overpass_tiles.ATTRACTIONS, lat, lon, radius)
+    rows = []
+    for element in elements:
+        rows.append({
+            "osm_id": element["id"],
+            "name": element.get("tags", {}).get("name", "Unknown Attraction"),
+            "latitude": element["lat"],
+            "longitude": element["lon"],
+            "category": element.get("tags", {}).get("tourism", "attraction"),
+        })
+
+    # Only look up images for attractions that do not have one yet
+    existing_images = values_by_key(Attraction, [row["osm_id"] for row in rows], "image_url")
+    missing = [row["name"] for row in rows if not existing_images.get(row["osm_id"])]
+    new_images = fetch_images_from_pexels(missing)
+    for row in rows:
+        row["image_url"] = existing_images.get(row["osm_id"]) or new_images.get(row["name"])
+
+    return upsert_rows(Attraction, rows, update_fields=ATTRACTION_UPDATE_FIELDS)
+
+
+def fetch_images_from_pexels(queries):
+    """
+    Attraction images by name, through the shared image cache.
+    """
+    return images.image_urls(queries, size="large")
+
+
+def sync_area(area):
+    """
+    Refresh one configured area from Overpass and record the outcome.
+    """
+    area_config = settings.ATTRACTION_SYNC_AREAS[area]
+    state, _ = AttractionSyncState.objects.get_or_create(area=area)
+    try:
+        count = fetch_osm_attractions(
+            area_config["lat"], area_config["lon"], area_config["radius"]
+        )
+    except Exception as e:
+        logger.exception("Attraction sync failed for %s", area)
+        state.last_error = str(e)
+        state.save(update_fields=["last_error"])
+        raise
+
+    state.last_synced_at = timezone.now()
+    state.last_error = ""
+    state.attraction_count = count
+    state.save(update_fields=["last_synced_at", "last_error", "attraction_count"])
+    return count
+
+
+def stale_areas(now=None):
+    """
+    Names of configured areas whose last successful sync is older than the TTL.
+    """
+    now = now or timezone.now()
+    cutoff = now - timedelta(seconds=settings.ATTRACTION_SYNC_TTL)
+    fresh = set(
+        AttractionSyncState.objects.filter(last_synced_at__gte=cutoff)
+        .values_list("area", flat=True)
+    )
+    return [area for area in settings.ATTRACTION_SYNC_AREAS if area not in fresh]
+
+
+def sync_stale_areas(force=False):
+    """
+    Sync every area that is due (or every area when forced).
+    Returns a dict of area -> count, or the error message for failed areas.
+    """
+    areas = list(settings.ATTRACTION_SYNC_AREAS) if force else stale_areas()
+    results = {}
+    for area in areas:
+        try:
+            results[area] = sync_area(area)
+        except Exception as e:
+            results[area] = str(e)
+    return results
+
+
+def _run_background_refresh():
+    try:
+        sync_stale_areas()
+    finally:
+        connection.close()
+
+
+def refresh_in_background_if_stale():
+    """
+    Kick off a background sync when an area is due. Never blocks the caller:
+    the staleness check hits the database at most once per
+    STALENESS_CHECK_INTERVAL and at most one refresh thread runs per process.
+    """
+    global _refresh_thread, _next_staleness_check
+
+    if not settings.ATTRACTION_SYNC_IN_PROCESS:
+        return False
+
+    now = time.monotonic()
+    if now < _next_staleness_check:
+        return False
+
+    with _refresh_lock:
+        if now < _next_staleness_check:
+            return False
+        _next_staleness_check = now + STALENESS_CHECK_INTERVAL
+
+        if _refresh_thread is not None and _refresh_thread.is_alive():
+            return False
+        if not stale_areas():
+            return False
+
+        _refresh_thread = threading.Thread(
+            target=_run_background_refresh, name="attractions-refresh", daemon=True
+        )
+        _refresh_thread.start()
+        return True
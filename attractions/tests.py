@@ -1,3 +1,116 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Attraction, AttractionSyncState
+from . import sync
+from services import images
+
+
+@override_settings(ATTRACTION_SYNC_IN_PROCESS=False)
+class AttractionListTests(TestCase):
+    def setUp(self):
+        Attraction.objects.create(
+            osm_id=1, name="National Museum", latitude=-1.27, longitude=36.81, category="attraction"
+        )
+
+    @mock.patch("services.overpass_tiles.OpenStreetMapService.overpass")
+    def test_list_reads_only_from_database(self, overpass):
+        response = self.client.get(reverse("attraction-list"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 1)
+        overpass.assert_not_called()
+
+
+@override_settings(
+    ATTRACTION_SYNC_TTL=60,
+    ATTRACTION_SYNC_AREAS={"nairobi": {"lat": -1.28, "lon": 36.81, "radius": 1000}},
+)
+class AttractionSyncTests(TestCase):
+    @mock.patch("attractions.sync.fetch_osm_attractions", return_value=3)
+    def test_sync_records_last_sync_time(self, fetch):
+        self.assertEqual(sync.stale_areas(), ["nairobi"])
+
+        self.assertEqual(sync.sync_stale_areas(), {"nairobi": 3})
+
+        state = AttractionSyncState.objects.get(area="nairobi")
+        self.assertIsNotNone(state.last_synced_at)
+        self.assertEqual(state.attraction_count, 3)
+        self.assertEqual(sync.stale_areas(), [])
+        fetch.assert_called_once_with(-1.28, 36.81, 1000)
+
+    def test_area_is_stale_after_ttl(self):
+        AttractionSyncState.objects.create(
+            area="nairobi", last_synced_at=timezone.now() - timedelta(seconds=120)
+        )
+        self.assertEqual(sync.stale_areas(), ["nairobi"])
+
+    @mock.patch("attractions.sync.fetch_osm_attractions", side_effect=RuntimeError("overpass down"))
+    def test_failed_sync_keeps_area_stale(self, fetch):
+        with self.assertLogs("attractions.sync", "ERROR"):
+            self.assertEqual(sync.sync_stale_areas(), {"nairobi": "overpass down"})
+
+        state = AttractionSyncState.objects.get(area="nairobi")
+        self.assertIsNone(state.last_synced_at)
+        self.assertEqual(state.last_error, "overpass down")
+
+
+@override_settings(ATTRACTION_SYNC_IN_PROCESS=False)
+class AttractionProximityTests(TestCase):
+    def setUp(self):
+        for osm_id, name, lat, lon in [
+            (1, "KICC", -1.2886, 36.8231),
+            (2, "Nairobi National Park", -1.3733, 36.8580),
+            (3, "Fort Jesus", -4.0627, 39.6793),
+        ]:
+            Attraction.objects.create(osm_id=osm_id, name=name, latitude=lat, longitude=lon, category="attraction")
+
+    def names(self, params):
+        response = self.client.get(reverse("attraction-list"), params)
+        self.assertEqual(response.status_code, 200)
+        return [item["name"] for item in response.json()]
+
+    def test_radius_returns_nearest_first(self):
+        self.assertEqual(self.names({"lat": -1.37, "lon": 36.85, "radius": 20000}),
+                         ["Nairobi National Park", "KICC"])
+        self.assertEqual(self.names({"lat": -1.2886, "lon": 36.8231, "radius": 1000}), ["KICC"])
+
+    def test_bbox(self):
+        self.assertEqual(self.names({"bbox": "39,-5,40,-3"}), ["Fort Jesus"])
+
+    def test_invalid_coordinates_are_rejected(self):
+        response = self.client.get(reverse("attraction-list"), {"lat": "north", "lon": 36.8})
+        self.assertEqual(response.status_code, 400)
+
+    def test_geo_cell_follows_coordinates(self):
+        attraction = Attraction.objects.get(osm_id=3)
+        attraction.latitude, attraction.longitude = -1.2886, 36.8231
+        attraction.save(update_fields=["latitude", "longitude"])
+
+        self.assertEqual(self.names({"lat": -1.2886, "lon": 36.8231, "radius": 100}), ["KICC", "Fort Jesus"])
+
+
+@override_settings(PEXELS_API_KEY="test-key")
+class FetchOsmAttractionsTests(TestCase):
+    @mock.patch("services.pexels_service.PexelsService.photo_src", return_value={"large": "https://img/new.jpg"})
+    @mock.patch("services.overpass_tiles.OpenStreetMapService.overpass")
+    def test_existing_images_are_not_refetched(self, overpass, photo_src):
+        images.clear_memory_cache()
+        Attraction.objects.create(
+            osm_id=1, name="KICC", latitude=-1.28, longitude=36.82, category="attraction",
+            image_url="https://img/kicc.jpg",
+        )
+        overpass.return_value = {"elements": [
+            {"id": 1, "lat": -1.28, "lon": 36.82, "tags": {"name": "KICC", "tourism": "attraction"}},
+            {"id": 2, "lat": -1.37, "lon": 36.85, "tags": {"name": "Nairobi National Park", "tourism": "attraction"}},
+        ]}
+
+        self.assertEqual(sync.fetch_osm_attractions(-1.28, 36.82, 20000), 2)
+
+        photo_src.assert_called_once_with("nairobi national park", 3.0)
+        self.assertEqual(Attraction.objects.get(osm_id=1).image_url, "https://img/kicc.jpg")
+        self.assertEqual(Attraction.objects.get(osm_id=2).image_url, "https://img/new.jpg")
@@ -1,7 +1,31 @@
 from django.contrib import admin
 
 # Register your models here.
-from .models import Flight, FlightBooking
+from .models import Flight, FlightBooking, FlightChangeNotification, FlightSyncState
+from .notifications import WATCHED_FIELDS, notable_changes, record_flight_change
 
 admin.site.register(FlightBooking),
-admin.site.register(Flight)
\ No newline at end of file
+
+
+@admin.register(Flight)
+class FlightAdmin(admin.ModelAdmin):
+    def save_model(self, request, obj, form, change):
+        changes = {}
+        if change and set(form.changed_data) & set(WATCHED_FIELDS):
+            changes = notable_changes(
+                Flight.objects.get(pk=obj.pk), {field: getattr(obj, field) for field in WATCHED_FIELDS}
+            )
+        super().save_model(request, obj, form, change)
+        if changes:
+            record_flight_change(obj, changes)
+
+
+@admin.register(FlightSyncState)
+class FlightSyncStateAdmin(admin.ModelAdmin):
+    list_display = ('route', 'high_water_mark', 'last_synced_at', 'pages_fetched', 'flight_count', 'last_error')
+
+
+@admin.register(FlightChangeNotification)
+class FlightChangeNotificationAdmin(admin.ModelAdmin):
+    list_display = ('flight', 'subject', 'sent', 'created_at', 'finished_at')
+    readonly_fields = ('cursor', 'sent', 'created_at', 'finished_at')
@@ -0,0 +1,70 @@
+"""
+Signed boarding tokens.
+
+The boarding QR code carries a compact token with the booking id, flight,
+seat and an expiry, signed with the project's SECRET_KEY. Gate scanners can
+check a token with `verify_token` without touching the database; only the
+check-in itself writes.
+
+Tokens are deterministic for a booking (the expiry is derived from the
+flight's departure), so the rendered QR can be cached.
+"""
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core import signing
+from django.utils import timezone
+
+SALT = "bookings.boarding"
+
+
+class InvalidBoardingToken(Exception):
+    pass
+
+
+class ExpiredBoardingToken(InvalidBoardingToken):
+    pass
+
+
+def _signer():
+    return signing.Signer(salt=SALT)
+
+
+def expiry_for(flight):
+    return flight.departure_time + timedelta(seconds=settings.BOARDING_TOKEN_GRACE)
+
+
+def make_token(booking):
+    """
+    Signed token for a booking; `booking.flight` must be loaded.
+    """
+    payload = {
+        "b": booking.id.hex,
+        "f": booking.flight_id,
+        "s": booking.seat_number,
+        "e": int(expiry_for(booking.flight).timestamp()),
+    }
+    return _signer().sign_object(payload, compress=True)
+
+
+def verify_token(token):
+    """
+    Decode and check a boarding token. Returns a dict with booking_id,
+    flight_number, seat and expires_at; raises InvalidBoardingToken (or
+    ExpiredBoardingToken) otherwise.
+    """
+    try:
+        payload = _signer().unsign_object(str(token))
+        expires_at = datetime.fromtimestamp(payload["e"], tz=dt_timezone.utc)
+        result = {
+            "booking_id": str(uuid.UUID(payload["b"])),
+            "flight_number": payload["f"],
+            "seat": payload["s"],
+            "expires_at": expires_at,
+        }
+    except (signing.BadSignature, KeyError, TypeError, ValueError):
+        raise InvalidBoardingToken("Invalid boarding token")
+    if expires_at <= timezone.now():
+        raise ExpiredBoardingToken("Boarding token has expired")
+    return result
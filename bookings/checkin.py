@@ -0,0 +1,74 @@
+import uuid
+
+from django.db import transaction
+
+from .boarding import ExpiredBoardingToken, InvalidBoardingToken, verify_token
+from .models import FlightBooking
+
+CHECKED_IN = "checked_in"
+ALREADY_CHECKED_IN = "already_checked_in"
+CANCELLED = "cancelled"
+NOT_CONFIRMED = "not_confirmed"
+UNKNOWN = "unknown"
+INVALID_TOKEN = "invalid_token"
+EXPIRED_TOKEN = "expired_token"
+
+
+def resolve_scan(scan):
+    """
+    (booking_id, error) for a scanned value, which is either a booking UUID or
+    a signed boarding token. Tokens are verified without a database lookup.
+    """
+    try:
+        return uuid.UUID(str(scan)), None
+    except ValueError:
+        pass
+    try:
+        return uuid.UUID(verify_token(scan)["booking_id"]), None
+    except ExpiredBoardingToken:
+        return None, EXPIRED_TOKEN
+    except InvalidBoardingToken:
+        return None, INVALID_TOKEN
+
+
+def check_in_scans(scans):
+    """
+    Check in every booking in a batch of scans with one locking read and one
+    set-based UPDATE. Returns one {"scan", "booking_id", "result"} dict per
+    scan, in order; a booking scanned twice is "already_checked_in" the
+    second time. Only confirmed bookings are checked in: a pending seat hold
+    is reported as "not_confirmed" and left for expire_holds to release.
+    """
+    resolved = [resolve_scan(scan) for scan in scans]
+    ids = {booking_id for booking_id, _ in resolved if booking_id}
+
+    with transaction.atomic():
+        statuses = dict(
+            FlightBooking.objects.select_for_update()
+            .filter(id__in=ids)
+            .values_list("id", "status")
+        )
+        eligible = [booking_id for booking_id, status in statuses.items() if status == "confirmed"]
+        if eligible:
+            FlightBooking.objects.filter(id__in=eligible).update(status=CHECKED_IN)
+
+    results = []
+    for scan, (booking_id, error) in zip(scans, resolved):
+        if error is None:
+            status = statuses.get(booking_id)
+            if status is None:
+                error = UNKNOWN
+            elif status == CANCELLED:
+                error = CANCELLED
+            elif status == CHECKED_IN:
+                error = ALREADY_CHECKED_IN
+            elif status != "confirmed":
+                error = NOT_CONFIRMED
+            else:
+                statuses[booking_id] = CHECKED_IN
+        results.append({
+            "scan": scan,
+            "booking_id": str(booking_id) if booking_id else None,
+            "result": error or CHECKED_IN,
+        })
+    return results
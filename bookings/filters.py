@@ -0,0 +1,29 @@
+from datetime import datetime, timedelta
+
+import django_filters
+from django.utils import timezone
+
+from .models import Flight
+
+
+class FlightFilter(django_filters.FilterSet):
+    """
+    Flight search. Route and date filters are exact matches and ranges so the
+    (origin, destination, departure_time) indexes can serve them.
+    """
+    departure_after = django_filters.IsoDateTimeFilter(field_name='departure_time', lookup_expr='gte')
+    departure_before = django_filters.IsoDateTimeFilter(field_name='departure_time', lookup_expr='lt')
+    departure_date = django_filters.DateFilter(method='filter_departure_date')
+    airline = django_filters.CharFilter(lookup_expr='iexact')
+    min_price = django_filters.NumberFilter(field_name='price', lookup_expr='gte')
+    max_price = django_filters.NumberFilter(field_name='price', lookup_expr='lte')
+
+    class Meta:
+        model = Flight
+        fields = ['origin', 'destination', 'origin_iata', 'destination_iata']
+
+    def filter_departure_date(self, queryset, name, value):
+        # A half-open range rather than departure_time__date, which would wrap
+        # the column in a function and defeat the index
+        start = timezone.make_aware(datetime.combine(value, datetime.min.time()))
+        return queryset.filter(departure_time__gte=start, departure_time__lt=start + timedelta(days=1))
@@ -0,0 +1,95 @@
+import math
+import time
+import uuid
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from bookings.models import Flight
+from bookings.seats import SeatMap
+from bookings.views import book_flight
+from jobs.models import Job
+from jobs.queue import run_pending
+
+SMTP_LATENCY = 0.0
+
+
+class SlowLocmemBackend(EmailBackend):
+    """
+    locmem backend that waits SMTP_LATENCY seconds per message, standing in
+    for a round trip to a real SMTP server.
+    """
+
+    def send_messages(self, messages):
+        time.sleep(SMTP_LATENCY * len(messages))
+        return super().send_messages(messages)
+
+
+class Command(BaseCommand):
+    help = 'Compare booking throughput with the confirmation e-mail sent inline (eager jobs) vs queued for the worker'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bookings', type=int, default=200)
+        parser.add_argument('--smtp-latency', type=float, default=50, help='Simulated SMTP latency in ms')
+
+    def run_mode(self, label, eager, count):
+        suffix = uuid.uuid4().hex[:8]
+        user = get_user_model().objects.create_user(username=f'bench-{suffix}', email=f'bench-{suffix}@example.com')
+        now = timezone.now()
+        flight = Flight.objects.create(
+            flight_number=f'BQ{suffix}', airline='Bench Air', origin='NBO', destination='MBA',
+            departure_time=now + timedelta(days=1), arrival_time=now + timedelta(days=1, hours=1),
+            available_seats=count, seat_rows=math.ceil(count / 6), seat_letters='ABCDEF',
+        )
+        seats = SeatMap.for_flight(flight).available()[:count]
+        factory = APIRequestFactory()
+        mail.outbox = []
+
+        try:
+            with override_settings(
+                EMAIL_BACKEND='bookings.management.commands.benchmark_booking_queue.SlowLocmemBackend',
+                JOBS_EAGER=eager,
+            ):
+                latencies = []
+                started = time.perf_counter()
+                for seat in seats:
+                    request = factory.post(
+                        '/api/book-flight/', {'flight_number': flight.flight_number, 'seat_number': seat}, format='json'
+                    )
+                    force_authenticate(request, user=user)
+                    request_started = time.perf_counter()
+                    response = book_flight(request)
+                    latencies.append(time.perf_counter() - request_started)
+                    assert response.status_code == 201, response.data
+                elapsed = time.perf_counter() - started
+
+                drain_started = time.perf_counter()
+                run_pending(batch_size=50)
+                drained = time.perf_counter() - drain_started
+
+            latencies.sort()
+            self.stdout.write(
+                f'{label:<8} {count / elapsed:>8.1f} bookings/s  '
+                f'p50 {latencies[len(latencies) // 2] * 1000:>7.2f} ms  '
+                f'p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:>7.2f} ms  '
+                f'worker {drained:>6.2f}s  e-mails {len(mail.outbox)}'
+            )
+        finally:
+            Job.objects.filter(payload__booking_id__in=[
+                str(pk) for pk in flight.flightbooking_set.values_list('pk', flat=True)
+            ]).delete()
+            flight.delete()
+            user.delete()
+
+    def handle(self, *args, **options):
+        global SMTP_LATENCY
+        SMTP_LATENCY = options['smtp_latency'] / 1000
+        self.stdout.write(f'{options["bookings"]} bookings, {options["smtp_latency"]:.0f} ms simulated SMTP latency')
+        self.run_mode('inline', True, options['bookings'])
+        self.run_mode('queued', False, options['bookings'])
@@ -0,0 +1,84 @@
+import math
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from bookings.models import Flight, FlightBooking
+from bookings.seats import SeatMap
+from bookings.views import batch_check_in, check_in_flight
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Compare checking in a full flight one request per booking vs one batched request'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=1000, help='Bookings to check in')
+
+    def measure(self, label, func, count):
+        queries = 0
+
+        def count_queries(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(count_queries):
+            started = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - started
+        checked_in = FlightBooking.objects.filter(flight_id='BENCHCI', status='checked_in').count()
+        self.stdout.write(
+            f'{label:<14} {queries:>6} queries {elapsed:>8.3f}s {count / elapsed:>9.0f} check-ins/s '
+            f'({checked_in} checked in)'
+        )
+
+    def handle(self, *args, **options):
+        count = options['count']
+        factory = APIRequestFactory()
+
+        # Everything runs in one transaction that is rolled back at the end,
+        # so the benchmark leaves no rows behind.
+        try:
+            with transaction.atomic():
+                user = get_user_model().objects.create_user(
+                    username='bench-gate', email='bench-gate@example.com', is_staff=True
+                )
+                now = timezone.now()
+                flight = Flight.objects.create(
+                    flight_number='BENCHCI', airline='Bench Air', origin='NBO', destination='LHR',
+                    departure_time=now + timedelta(hours=2), arrival_time=now + timedelta(hours=11),
+                    available_seats=0, seat_rows=math.ceil(count / 6), seat_letters='ABCDEF',
+                )
+                bookings = FlightBooking.objects.bulk_create([
+                    FlightBooking(user=user, flight=flight, seat_number=seat, status='confirmed')
+                    for seat in SeatMap.for_flight(flight).available()[:count]
+                ])
+                ids = [str(booking.id) for booking in bookings]
+                self.stdout.write(f'{len(ids)} bookings on {connection.vendor}')
+
+                def one_by_one():
+                    for booking_id in ids:
+                        request = factory.post(f'/bookings/check-in/{booking_id}/')
+                        force_authenticate(request, user=user)
+                        check_in_flight(request, booking_id=booking_id)
+
+                def batched():
+                    request = factory.post('/bookings/check-in/batch/', {'scans': ids}, format='json')
+                    force_authenticate(request, user=user)
+                    batch_check_in(request)
+
+                self.measure('one by one', one_by_one, len(ids))
+                FlightBooking.objects.filter(flight=flight).update(status='confirmed')
+                self.measure('batched', batched, len(ids))
+                raise _Rollback
+        except _Rollback:
+            pass
@@ -0,0 +1,164 @@
+import math
+import tempfile
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.mail import send_mail
+from django.core.mail.backends import filebased, locmem
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.template.loader import render_to_string
+from django.test import override_settings
+from django.utils import timezone
+
+from bookings.models import Flight, FlightBooking
+from bookings.notifications import NOTIFIED_BOOKING_STATUSES, notable_changes, record_flight_change, send_flight_change
+from bookings.seats import SeatMap
+
+CONNECT_LATENCY = 0.0
+connections_opened = 0
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _handshake():
+    global connections_opened
+    connections_opened += 1
+    time.sleep(CONNECT_LATENCY)
+
+
+class HandshakeLocmemBackend(locmem.EmailBackend):
+    """
+    locmem backend that opens and closes a "connection" per send_messages
+    call like the SMTP backend does, waiting CONNECT_LATENCY seconds for the
+    handshake.
+    """
+    connection_open = False
+
+    def open(self):
+        if self.connection_open:
+            return False
+        _handshake()
+        self.connection_open = True
+        return True
+
+    def close(self):
+        self.connection_open = False
+
+    def send_messages(self, messages):
+        new_connection = self.open()
+        try:
+            return super().send_messages(messages)
+        finally:
+            if new_connection:
+                self.close()
+
+
+class HandshakeFileBackend(filebased.EmailBackend):
+    """
+    File backend (one file per connection) with the same handshake cost.
+    """
+
+    def open(self):
+        new_connection = super().open()
+        if new_connection:
+            _handshake()
+        return new_connection
+
+
+class Command(BaseCommand):
+    help = 'Compare notifying every passenger of a changed flight one e-mail at a time vs the batched fan-out'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--passengers', type=int, default=10000)
+        parser.add_argument('--backend', choices=['locmem', 'file'], default='locmem')
+        parser.add_argument('--connect-latency', type=float, default=1.0, help='Simulated SMTP handshake in ms')
+        parser.add_argument('--batch-size', type=int, default=None)
+
+    def measure(self, label, func, count):
+        global connections_opened
+        connections_opened = 0
+        queries = 0
+
+        def count_queries(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        mail.outbox = []
+        with connection.execute_wrapper(count_queries):
+            started = time.perf_counter()
+            sent = func()
+            elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f'{label:<10} {sent:>6} e-mails {connections_opened:>6} connections {queries:>6} queries '
+            f'{elapsed:>8.3f}s {count / elapsed:>9.0f} e-mails/s'
+        )
+
+    def handle(self, *args, **options):
+        global CONNECT_LATENCY
+        CONNECT_LATENCY = options['connect_latency'] / 1000
+        count = options['passengers']
+        backend = {'locmem': HandshakeLocmemBackend, 'file': HandshakeFileBackend}[options['backend']]
+
+        # Everything runs in one transaction that is rolled back at the end,
+        # so the benchmark leaves no rows behind.
+        with tempfile.TemporaryDirectory() as outbox_dir, override_settings(
+            EMAIL_BACKEND=f'{backend.__module__}.{backend.__name__}', EMAIL_FILE_PATH=outbox_dir, JOBS_EAGER=False,
+        ):
+            try:
+                with transaction.atomic():
+                    self.run(count, options['batch_size'])
+                    raise _Rollback
+            except _Rollback:
+                pass
+
+    def run(self, count, batch_size):
+        now = timezone.now()
+        flight = Flight.objects.create(
+            flight_number='BENCHFN', airline='Bench Air', origin='NBO', destination='LHR',
+            departure_time=now + timedelta(days=1), arrival_time=now + timedelta(days=1, hours=9),
+            available_seats=0, seat_rows=math.ceil(count / 6), seat_letters='ABCDEF',
+        )
+        users = get_user_model().objects.bulk_create([
+            get_user_model()(username=f'bench-fn-{i}', email=f'bench-fn-{i}@example.com') for i in range(count)
+        ])
+        FlightBooking.objects.bulk_create([
+            FlightBooking(user=user, flight=flight, seat_number=seat, status='confirmed')
+            for user, seat in zip(users, SeatMap.for_flight(flight).available())
+        ], batch_size=1000)
+        self.stdout.write(f'{count} passengers on {connection.vendor}')
+
+        new_departure = flight.departure_time + timedelta(hours=3)
+        changes = notable_changes(flight, {'departure_time': new_departure})
+        flight.departure_time = new_departure
+        flight.save(update_fields=['departure_time'])
+
+        def one_by_one():
+            # what a per-booking job does: load the booking, render, connect, send
+            booking_ids = FlightBooking.objects.filter(
+                flight=flight, status__in=NOTIFIED_BOOKING_STATUSES
+            ).values_list('pk', flat=True)
+            for booking_id in booking_ids:
+                booking = FlightBooking.objects.select_related('user', 'flight').get(pk=booking_id)
+                context = {'flight': booking.flight, 'changes': changes}
+                send_mail(
+                    render_to_string('bookings/email/flight_change_subject.txt', context).strip(),
+                    f"Hello {booking.user.username},\n\n"
+                    f"{render_to_string('bookings/email/flight_change.txt', context).strip()}\n\n"
+                    f"Booking ID: {booking.id}\nSeat: {booking.seat_number}",
+                    settings.DEFAULT_FROM_EMAIL,
+                    [booking.user.email],
+                )
+            return len(booking_ids)
+
+        def fan_out():
+            return send_flight_change(record_flight_change(flight, changes), batch_size=batch_size)
+
+        self.measure('one by one', one_by_one, count)
+        self.measure('fan-out', fan_out, count)
@@ -0,0 +1,94 @@
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from bookings.models import Flight, FlightBooking
+from bookings.seats import SeatMap, book_seat, cancel_booking
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Time seat availability on a busy aircraft: booking-row scan vs the seat bitmap'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=50)
+        parser.add_argument('--letters', default='ABCDEF')
+        parser.add_argument('--churn', type=int, default=2000, help='Cancel/rebook cycles before measuring')
+        parser.add_argument('--iterations', type=int, default=200, help='Availability lookups per method')
+
+    def measure(self, label, func, iterations):
+        queries = 0
+
+        def count_queries(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(count_queries):
+            started = time.perf_counter()
+            for _ in range(iterations):
+                result = func()
+            elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f'{label:<28} {queries / iterations:>5.1f} queries {elapsed / iterations * 1000:>8.3f} ms/call '
+            f'({len(result)} free)'
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(0)
+        capacity = options['rows'] * len(options['letters'])
+
+        # Everything runs in one transaction that is rolled back at the end,
+        # so the benchmark leaves no rows behind.
+        try:
+            with transaction.atomic():
+                user = get_user_model().objects.create_user(username='bench-seats', email='bench-seats@example.com')
+                now = timezone.now()
+                flight = Flight.objects.create(
+                    flight_number='BENCH1', airline='Bench Air', origin='NBO', destination='LHR',
+                    departure_time=now + timedelta(days=1), arrival_time=now + timedelta(days=1, hours=9),
+                    available_seats=capacity, seat_rows=options['rows'], seat_letters=options['letters'],
+                )
+                labels = SeatMap.for_flight(flight).available()
+
+                started = time.perf_counter()
+                bookings = [book_seat(user, flight, label) for label in labels]
+                for _ in range(options['churn']):
+                    booking = bookings.pop(rng.randrange(len(bookings)))
+                    cancel_booking(booking)
+                    bookings.append(book_seat(user, flight, booking.seat_number))
+                # leave ~5% of the cabin free
+                for booking in rng.sample(bookings, capacity // 20):
+                    cancel_booking(booking)
+                elapsed = time.perf_counter() - started
+                operations = capacity + 2 * options['churn'] + capacity // 20
+                self.stdout.write(
+                    f'{capacity}-seat aircraft, {FlightBooking.objects.filter(flight=flight).count()} booking rows, '
+                    f'{operations} book/cancel operations in {elapsed:.2f}s ({operations / elapsed:.0f}/s)'
+                )
+
+                def booking_scan():
+                    booked = set(
+                        FlightBooking.objects.filter(flight=flight).exclude(status='cancelled')
+                        .values_list('seat_number', flat=True)
+                    )
+                    return [label for label in labels if label not in booked]
+
+                def bitmap():
+                    return SeatMap.for_flight(
+                        Flight.objects.only('seat_rows', 'seat_letters', 'seat_map').get(pk=flight.pk)
+                    ).available()
+
+                self.measure('booking-row scan', booking_scan, options['iterations'])
+                self.measure('seat bitmap', bitmap, options['iterations'])
+                raise _Rollback
+        except _Rollback:
+            pass
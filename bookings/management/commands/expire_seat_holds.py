@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from bookings.seats import expire_holds
+
+
+class Command(BaseCommand):
+    help = 'Release seat holds whose TTL has passed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep running and sweep every --interval seconds')
+        parser.add_argument('--interval', type=float, default=15, help='Seconds between sweeps when looping')
+
+    def handle(self, *args, **options):
+        while True:
+            released = expire_holds()
+            if released or not options['loop']:
+                self.stdout.write(f'Released {released} expired seat hold(s)')
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
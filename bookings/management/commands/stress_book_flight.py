@@ -0,0 +1,172 @@
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+from django.db.models import Count
+from django.utils import timezone
+
+from bookings.models import Flight, FlightBooking
+from bookings.seats import (
+    HoldExpired, NoSeatsAvailable, SeatAlreadyBooked, SeatMap, book_seat, confirm_hold, expire_holds, hold_seat,
+)
+
+
+def _with_retry(func):
+    # SQLite has one writer at a time and reports contention as "database is
+    # locked"; a real client would retry, so the harness does too.
+    while True:
+        try:
+            return func()
+        except OperationalError as e:
+            if 'locked' not in str(e):
+                raise
+            time.sleep(random.uniform(0, 0.005))
+
+
+def _attempt(user, flight, seat, hold, confirm, hold_ttl):
+    try:
+        if not hold:
+            _with_retry(lambda: book_seat(user, flight, seat))
+            return 'booked'
+        booking = _with_retry(lambda: hold_seat(user, flight, seat, ttl=hold_ttl))
+        if not confirm:
+            return 'held'
+        try:
+            _with_retry(lambda: confirm_hold(booking))
+            return 'confirmed'
+        except HoldExpired:
+            return 'hold_expired'
+    except SeatAlreadyBooked:
+        return 'seat_taken'
+    except NoSeatsAvailable:
+        return 'sold_out'
+
+
+class Command(BaseCommand):
+    help = 'Hammer one flight with concurrent bookings and seat holds and check that it is never oversold'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--attempts', type=int, default=500, help='Total booking attempts')
+        parser.add_argument('--rows', type=int, default=50, help='Seat rows on the flight')
+        parser.add_argument('--letters', default='ABCDEF', help='Seat letters per row')
+        parser.add_argument('--hold-ratio', type=float, default=0.0,
+                            help='Share of attempts that hold a seat first (half of those then confirm)')
+        parser.add_argument('--hold-ttl', type=float, default=0.05, help='Seat hold TTL in seconds')
+        parser.add_argument('--seed', type=int, default=None)
+        parser.add_argument('--keep', action='store_true', help='Keep the stress flight and its bookings')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        suffix = uuid.uuid4().hex[:8]
+        user = get_user_model().objects.create_user(
+            username=f'stress-{suffix}', email=f'stress-{suffix}@example.com'
+        )
+        capacity = options['rows'] * len(options['letters'])
+        now = timezone.now()
+        flight = Flight.objects.create(
+            flight_number=f'ST{suffix}',
+            airline='Stress Air',
+            origin='NBO',
+            destination='MBA',
+            departure_time=now + timedelta(days=1),
+            arrival_time=now + timedelta(days=1, hours=1),
+            available_seats=capacity,
+            price=100,
+            seat_rows=options['rows'],
+            seat_letters=options['letters'],
+        )
+
+        attempts = [
+            (
+                f'{rng.randint(1, options["rows"])}{rng.choice(options["letters"])}',
+                rng.random() < options['hold_ratio'],
+                rng.random() < 0.5,
+            )
+            for _ in range(options['attempts'])
+        ]
+        chunks = [attempts[i::options['threads']] for i in range(options['threads'])]
+        outcomes = Counter()
+        lock = threading.Lock()
+        errors = []
+        done = threading.Event()
+
+        def worker(chunk):
+            local = Counter()
+            try:
+                for seat, hold, confirm in chunk:
+                    local[_attempt(user, flight, seat, hold, confirm, options['hold_ttl'])] += 1
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+            with lock:
+                outcomes.update(local)
+
+        def sweeper():
+            try:
+                while not done.is_set():
+                    outcomes['swept'] += _with_retry(expire_holds)
+                    time.sleep(0.01)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(chunk,)) for chunk in chunks]
+        sweep_thread = threading.Thread(target=sweeper)
+        started = time.perf_counter()
+        if options['hold_ratio']:
+            sweep_thread.start()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        done.set()
+        if sweep_thread.is_alive():
+            sweep_thread.join()
+
+        try:
+            if errors:
+                raise CommandError(f'{len(errors)} thread(s) failed: {errors[0]!r}')
+
+            flight.refresh_from_db()
+            live = FlightBooking.objects.filter(flight=flight).exclude(status='cancelled')
+            live_seats = set(live.values_list('seat_number', flat=True))
+            booked = live.count()
+            duplicate_seats = (
+                live.values('seat_number').annotate(n=Count('id')).filter(n__gt=1).count()
+            )
+            seats = SeatMap.for_flight(flight)
+            taken_seats = {seats.label(index) for index in range(seats.size)} - set(seats.available())
+            oversold = max(booked - capacity, 0)
+            counter_drift = capacity - flight.available_seats - booked
+            map_drift = len(taken_seats ^ live_seats)
+
+            self.stdout.write(
+                f'{options["attempts"]} attempts from {options["threads"]} threads on {connection.vendor} '
+                f'in {elapsed:.3f}s'
+            )
+            self.stdout.write(
+                ' '.join(f'{key}={outcomes[key]}' for key in (
+                    'booked', 'held', 'confirmed', 'hold_expired', 'swept', 'seat_taken', 'sold_out'
+                ))
+                + f' ({(outcomes["booked"] + outcomes["confirmed"]) / elapsed:.1f} bookings/s)'
+            )
+            self.stdout.write(
+                f'oversold={oversold} duplicate_seats={duplicate_seats} '
+                f'counter_drift={counter_drift} map_drift={map_drift}'
+            )
+            if oversold or duplicate_seats or counter_drift or map_drift:
+                raise CommandError('Seat inventory is inconsistent')
+        finally:
+            if not options['keep']:
+                flight.delete()
+                user.delete()
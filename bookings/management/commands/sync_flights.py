@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from bookings.sync import sync_flights
+
+
+class Command(BaseCommand):
+    help = 'Page through Aviationstack and upsert flights departing after the route\'s high-water mark'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dep', dest='dep_iata', help='Departure airport IATA code')
+        parser.add_argument('--arr', dest='arr_iata', help='Arrival airport IATA code')
+        parser.add_argument('--full', action='store_true', help='Ignore the high-water mark and rewrite every flight')
+        parser.add_argument('--max-pages', type=int, help='Stop after this many pages')
+        parser.add_argument('--page-size', type=int, help='Records per Aviationstack request')
+
+    def handle(self, *args, **options):
+        try:
+            result = sync_flights(
+                options['dep_iata'], options['arr_iata'], full=options['full'],
+                max_pages=options['max_pages'], page_size=options['page_size'],
+            )
+        except Exception as e:
+            raise CommandError(f'Flight sync failed: {e}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{result["pages"]} page(s), {result["seen"]} flights seen, {result["written"]} written; '
+            f'high-water mark {result["high_water_mark"]}'
+        ))
@@ -0,0 +1,38 @@
+# Generated by Django 5.1.7 on 2026-10-18 17:31
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def cancel_duplicate_seats(apps, schema_editor):
+    # The old check-then-insert booking path could double-book a seat; keep
+    # the earliest booking for each seat so the constraint can be created.
+    FlightBooking = apps.get_model('bookings', 'FlightBooking')
+    seen = set()
+    duplicates = []
+    bookings = (
+        FlightBooking.objects.exclude(status='cancelled')
+        .order_by('flight_id', 'seat_number', 'created_at')
+        .values_list('id', 'flight_id', 'seat_number')
+    )
+    for booking_id, flight_id, seat_number in bookings.iterator():
+        if (flight_id, seat_number) in seen:
+            duplicates.append(booking_id)
+        seen.add((flight_id, seat_number))
+    FlightBooking.objects.filter(id__in=duplicates).update(status='cancelled')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(cancel_duplicate_seats, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='flightbooking',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'cancelled'), _negated=True), fields=('flight', 'seat_number'), name='unique_active_seat_per_flight'),
+        ),
+    ]
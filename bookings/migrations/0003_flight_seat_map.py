@@ -0,0 +1,66 @@
+# Generated by Django 5.1.7 on 2026-10-18 17:33
+
+import re
+
+from django.db import migrations, models
+
+LABEL = re.compile(r'^(\d+)([A-Z])$')
+
+
+def backfill_seat_maps(apps, schema_editor):
+    # Bookings used to store a bare seat number ("1".."100"); relabel those onto
+    # the default layout ("1" -> "1A", "6" -> "2A", ...) and build each
+    # flight's bitmap from its live bookings.
+    Flight = apps.get_model('bookings', 'Flight')
+    FlightBooking = apps.get_model('bookings', 'FlightBooking')
+
+    flight_ids = FlightBooking.objects.exclude(status='cancelled').values_list('flight_id', flat=True).distinct()
+    for flight in Flight.objects.filter(pk__in=list(flight_ids)).iterator():
+        letters = flight.seat_letters
+        bookings = list(FlightBooking.objects.filter(flight=flight).exclude(status='cancelled'))
+        numbers = [int(b.seat_number) for b in bookings if str(b.seat_number).strip().isdigit()]
+        rows = max([flight.seat_rows] + [(n - 1) // len(letters) + 1 for n in numbers if n > 0])
+
+        labels = {str(b.seat_number).strip().upper() for b in bookings}
+        bits = bytearray((rows * len(letters) + 7) // 8)
+        for booking in bookings:
+            seat = str(booking.seat_number).strip().upper()
+            if seat.isdigit() and int(seat) > 0:
+                row, column = divmod(int(seat) - 1, len(letters))
+                label = f'{row + 1}{letters[column]}'
+                if label not in labels:
+                    labels.add(label)
+                    booking.seat_number = seat = label
+                    booking.save(update_fields=['seat_number'])
+            match = LABEL.match(seat)
+            if match and 1 <= int(match.group(1)) <= rows and match.group(2) in letters:
+                index = (int(match.group(1)) - 1) * len(letters) + letters.index(match.group(2))
+                bits[index >> 3] |= 1 << (index & 7)
+
+        Flight.objects.filter(pk=flight.pk).update(seat_rows=rows, seat_map=bytes(bits))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0002_unique_active_seat_per_flight'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='flight',
+            name='seat_letters',
+            field=models.CharField(default='ABCDE', max_length=12),
+        ),
+        migrations.AddField(
+            model_name='flight',
+            name='seat_map',
+            field=models.BinaryField(default=b''),
+        ),
+        migrations.AddField(
+            model_name='flight',
+            name='seat_rows',
+            field=models.PositiveSmallIntegerField(default=20),
+        ),
+        migrations.RunPython(backfill_seat_maps, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.7 on 2026-10-18 17:43
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0005_flight_search_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='flightbooking',
+            name='hold_expires_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='flightbooking',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['hold_expires_at'], name='booking_hold_expiry_idx'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.1.7 on 2026-10-18 17:49
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0006_seat_holds'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FlightChangeNotification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('changes', models.JSONField(default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('subject', models.CharField(max_length=200)),
+                ('body', models.TextField()),
+                ('cursor', models.UUIDField(blank=True, null=True)),
+                ('sent', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='flight',
+            name='status',
+            field=models.CharField(choices=[('scheduled', 'Scheduled'), ('active', 'Active'), ('landed', 'Landed'), ('cancelled', 'Cancelled'), ('incident', 'Incident'), ('diverted', 'Diverted')], default='scheduled', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='flightbooking',
+            index=models.Index(fields=['flight', 'id'], name='booking_flight_id_idx'),
+        ),
+        migrations.AddField(
+            model_name='flightchangenotification',
+            name='flight',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='change_notifications', to='bookings.flight'),
+        ),
+    ]
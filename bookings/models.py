@@ -1,3 +1,4 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from django.contrib.auth import get_user_model
 import uuid
@@ -7,18 +8,61 @@ from django.conf import settings
 User = get_user_model()
 
 class Flight(models.Model):
+    # Aviationstack's flight_status values
+    STATUS_CHOICES = [
+        ('scheduled', 'Scheduled'),
+        ('active', 'Active'),
+        ('landed', 'Landed'),
+        ('cancelled', 'Cancelled'),
+        ('incident', 'Incident'),
+        ('diverted', 'Diverted'),
+    ]
+
     flight_number = models.CharField(primary_key=True, max_length=10, unique=True)
     airline = models.CharField(max_length=100)
     origin = models.CharField(max_length=100)  
     destination = models.CharField(max_length=100)  
-    departure_time = models.DateTimeField(default=timezone.now)  
+    origin_iata = models.CharField(max_length=3, blank=True, default="")
+    destination_iata = models.CharField(max_length=3, blank=True, default="")
+    departure_time = models.DateTimeField(default=timezone.now, db_index=True)
     arrival_time = models.DateTimeField(default=timezone.now)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='scheduled')
     available_seats = models.IntegerField(default=100)  
     price = models.DecimalField(max_digits=10, decimal_places=2, default=200.00)  
+    # Cabin layout: seats are labelled "<row><letter>", e.g. "12C"
+    seat_rows = models.PositiveSmallIntegerField(default=20)
+    seat_letters = models.CharField(max_length=12, default="ABCDE")
+    # One bit per seat in row-major order, set while the seat is booked (see bookings.seats.SeatMap)
+    seat_map = models.BinaryField(default=b"", editable=False)
+
+    class Meta:
+        indexes = [
+            # route search, ordered/paginated by departure
+            models.Index(fields=["origin", "destination", "departure_time"], name="flight_route_departure_idx"),
+            models.Index(
+                fields=["origin_iata", "destination_iata", "departure_time"], name="flight_iata_departure_idx"
+            ),
+        ]
 
     def __str__(self):
         return f"{self.flight_number} - {self.airline}"
 
+class FlightSyncState(models.Model):
+    """
+    Bookkeeping for the Aviationstack sync of one route ("NBO-MBA", or "*"
+    for an unfiltered side). `high_water_mark` is the latest departure time
+    already ingested; later runs only write flights departing at or after it.
+    """
+    route = models.CharField(max_length=20, unique=True)
+    high_water_mark = models.DateTimeField(blank=True, null=True)
+    last_synced_at = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True)
+    pages_fetched = models.PositiveIntegerField(default=0)
+    flight_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.route} ({self.last_synced_at or 'never synced'})"
+
 class FlightBooking(models.Model):
     STATUS_CHOICES = [
         ('confirmed', 'Confirmed'),
@@ -34,6 +78,49 @@ class FlightBooking(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     qr_code = models.ImageField(upload_to='qrcodes/', blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)  # ✅ Remove default=timezone.now
+    # Set while the booking is a pending seat hold (see bookings.seats.hold_seat)
+    hold_expires_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            # Only live holds are indexed, so the expiry sweep never scans confirmed bookings
+            models.Index(
+                fields=['hold_expires_at'],
+                condition=models.Q(status='pending'),
+                name='booking_hold_expiry_idx',
+            ),
+            # passenger fan-out walks a flight's bookings in id order
+            models.Index(fields=['flight', 'id'], name='booking_flight_id_idx'),
+        ]
+        constraints = [
+            # A seat can only be held by one live booking per flight
+            models.UniqueConstraint(
+                fields=['flight', 'seat_number'],
+                condition=~models.Q(status='cancelled'),
+                name='unique_active_seat_per_flight',
+            ),
+        ]
 
     def __str__(self):
         return f"Booking {self.id} - {self.user.username} ({self.status})"
+
+class FlightChangeNotification(models.Model):
+    """
+    A message to every passenger of a flight about one change to it, sent by
+    the `bookings.notify_passengers` job (see bookings.notifications).
+
+    `subject` and `body` are rendered once when the change is recorded.
+    `cursor` is the last booking id already sent to, so an interrupted
+    fan-out resumes after it.
+    """
+    flight = models.ForeignKey(Flight, on_delete=models.CASCADE, related_name='change_notifications')
+    changes = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    subject = models.CharField(max_length=200)
+    body = models.TextField()
+    cursor = models.UUIDField(blank=True, null=True)
+    sent = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"{self.flight_id} change #{self.pk} ({self.sent} sent)"
@@ -0,0 +1,120 @@
+"""
+Passenger notifications for flight changes.
+
+`record_flight_change` renders the message for a flight once, stores it as
+a FlightChangeNotification and queues the `bookings.notify_passengers` job.
+The job (`send_flight_change`) streams the flight's bookings in id order and
+sends them in batches over a single e-mail connection, moving the
+notification's cursor forward after every batch, so a retry after a crash
+carries on where the last batch left off instead of mailing everyone again.
+"""
+from itertools import islice
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import F
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from jobs.queue import enqueue
+
+from .models import FlightBooking, FlightChangeNotification
+
+# Changes to these fields are worth telling passengers about...
+WATCHED_FIELDS = ("departure_time", "arrival_time", "status")
+# ...except a flight taking off and landing as planned
+ROUTINE_STATUSES = ("active", "landed")
+NOTIFIED_BOOKING_STATUSES = ("confirmed", "checked_in")
+
+
+def notable_changes(flight, values):
+    """
+    {field: [old, new]} for the watched fields that `values` would change on
+    `flight`.
+    """
+    changes = {
+        field: [getattr(flight, field), values[field]]
+        for field in WATCHED_FIELDS
+        if field in values and getattr(flight, field) != values[field]
+    }
+    if "status" in changes and changes["status"][1] in ROUTINE_STATUSES:
+        del changes["status"]
+    return changes
+
+
+def record_flight_change(flight, changes):
+    """
+    Render the notification for `changes` to `flight` (already saved with
+    the new values) and queue it for sending. Returns the notification.
+    """
+    context = {"flight": flight, "changes": changes}
+    with transaction.atomic():
+        notification = FlightChangeNotification.objects.create(
+            flight=flight,
+            changes=changes,
+            subject=render_to_string("bookings/email/flight_change_subject.txt", context).strip(),
+            body=render_to_string("bookings/email/flight_change.txt", context).strip(),
+        )
+        enqueue("bookings.notify_passengers", notification_id=notification.pk)
+    return notification
+
+
+def update_flight(flight, **values):
+    """
+    Save new values on a flight and, if passengers should hear about them,
+    record the change. Returns the notification or None.
+    """
+    changes = notable_changes(flight, values)
+    for field, value in values.items():
+        setattr(flight, field, value)
+    with transaction.atomic():
+        flight.save(update_fields=list(values))
+        return record_flight_change(flight, changes) if changes else None
+
+
+def _message(notification, username, email, booking_id, seat_number, connection):
+    body = f"Hello {username},\n\n{notification.body}\n\nBooking ID: {booking_id}\nSeat: {seat_number}"
+    return EmailMessage(
+        notification.subject, body, settings.DEFAULT_FROM_EMAIL, [email], connection=connection
+    )
+
+
+def send_flight_change(notification, batch_size=None, connection=None):
+    """
+    Send `notification` to every passenger on its flight past the cursor.
+    Returns the number of messages sent by this call.
+
+    A batch interrupted half way is sent again in full on the next run:
+    delivery is at least once per passenger, at most one batch is repeated.
+    """
+    batch_size = batch_size or settings.FLIGHT_NOTIFY_BATCH_SIZE
+    bookings = FlightBooking.objects.filter(
+        flight_id=notification.flight_id, status__in=NOTIFIED_BOOKING_STATUSES
+    ).exclude(user__email="")
+    if notification.cursor:
+        bookings = bookings.filter(pk__gt=notification.cursor)
+    rows = (
+        bookings.order_by("pk")
+        .values_list("pk", "seat_number", "user__username", "user__email")
+        .iterator(chunk_size=batch_size)
+    )
+
+    sent = 0
+    connection = connection or get_connection()
+    with connection:
+        while batch := list(islice(rows, batch_size)):
+            connection.send_messages([
+                _message(notification, username, email, booking_id, seat_number, connection)
+                for booking_id, seat_number, username, email in batch
+            ])
+            notification.cursor = batch[-1][0]
+            FlightChangeNotification.objects.filter(pk=notification.pk).update(
+                cursor=notification.cursor, sent=F("sent") + len(batch)
+            )
+            sent += len(batch)
+
+    notification.sent += sent
+    notification.finished_at = timezone.now()
+    FlightChangeNotification.objects.filter(pk=notification.pk).update(finished_at=notification.finished_at)
+    return sent
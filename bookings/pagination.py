@@ -0,0 +1,12 @@
+from rest_framework.pagination import CursorPagination
+
+
+class FlightCursorPagination(CursorPagination):
+    """
+    Keyset pagination on departure time: every page is an index range scan
+    from the previous page's last row, however deep the client pages.
+    """
+    ordering = ('departure_time', 'flight_number')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
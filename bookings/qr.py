@@ -0,0 +1,46 @@
+"""
+Boarding-pass QR codes rendered on demand.
+
+The PNG is a pure function of the booking's QR content, so nothing is written
+to media storage: rendered bytes are kept in a bounded in-process LRU keyed
+by that content, and the content hash doubles as a strong ETag.
+"""
+import hashlib
+from io import BytesIO
+
+import qrcode
+from django.conf import settings
+
+from services.cache import MISSING, LRUCache
+
+from .boarding import make_token
+
+_rendered = LRUCache(maxsize=settings.QR_CACHE_SIZE, ttl=settings.QR_CACHE_TTL)
+
+
+def qr_content(booking):
+    """
+    The signed boarding token; `booking.flight` must be loaded.
+    """
+    return make_token(booking)
+
+
+def etag(content):
+    return '"%s"' % hashlib.sha256(content.encode()).hexdigest()[:32]
+
+
+def render_png(content):
+    """
+    PNG bytes of the QR code for `content`, rendered at most once per cache lifetime.
+    """
+    png = _rendered.get(content)
+    if png is MISSING:
+        buffer = BytesIO()
+        qrcode.make(content).save(buffer, format="PNG")
+        png = buffer.getvalue()
+        _rendered.set(content, png)
+    return png
+
+
+def clear_cache():
+    _rendered.clear()
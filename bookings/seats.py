@@ -0,0 +1,290 @@
+import re
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Flight, FlightBooking
+
+SEAT_LABEL = re.compile(r"^\s*(\d+)\s*([A-Za-z])\s*$")
+
+
+class BookingError(Exception):
+    """
+    A booking that cannot be made; the message is safe to show to clients.
+    """
+
+
+class NoSeatsAvailable(BookingError):
+    def __init__(self):
+        super().__init__("No seats available")
+
+
+class SeatAlreadyBooked(BookingError):
+    def __init__(self):
+        super().__init__("Seat already booked")
+
+
+class InvalidSeat(BookingError):
+    def __init__(self, seat_number):
+        super().__init__(f"Seat {seat_number} does not exist on this flight")
+
+
+class AlreadyCancelled(BookingError):
+    def __init__(self):
+        super().__init__("Booking is already cancelled")
+
+
+class HoldExpired(BookingError):
+    def __init__(self):
+        super().__init__("Seat hold has expired")
+
+
+class NotAHold(BookingError):
+    def __init__(self):
+        super().__init__("Booking is not a pending seat hold")
+
+
+class SeatMap:
+    """
+    Booked/free state of every seat on a flight, one bit per seat.
+
+    Seats are numbered row-major from the flight's layout, so "1A" is bit 0
+    and "2A" is bit len(seat_letters). The bitmap is stored in
+    Flight.seat_map; a short (or empty) bitmap means the remaining seats
+    are free.
+    """
+
+    def __init__(self, rows, letters, data=b""):
+        self.rows = rows
+        self.letters = letters
+        self.size = rows * len(letters)
+        self.bits = bytearray((self.size + 7) // 8)
+        data = bytes(data or b"")[:len(self.bits)]
+        self.bits[:len(data)] = data
+
+    @classmethod
+    def for_flight(cls, flight):
+        return cls(flight.seat_rows, flight.seat_letters, flight.seat_map)
+
+    def index(self, label):
+        """
+        Bit index of a seat label such as "12C"; raises InvalidSeat.
+        """
+        match = SEAT_LABEL.match(str(label or ""))
+        if match:
+            row, letter = int(match.group(1)), match.group(2).upper()
+            if 1 <= row <= self.rows and letter in self.letters:
+                return (row - 1) * len(self.letters) + self.letters.index(letter)
+        raise InvalidSeat(label)
+
+    def label(self, index):
+        row, column = divmod(index, len(self.letters))
+        return f"{row + 1}{self.letters[column]}"
+
+    def normalize(self, label):
+        return self.label(self.index(label))
+
+    def is_taken(self, label):
+        index = self.index(label)
+        return bool(self.bits[index >> 3] & (1 << (index & 7)))
+
+    def take(self, label):
+        index = self.index(label)
+        self.bits[index >> 3] |= 1 << (index & 7)
+
+    def release(self, label):
+        index = self.index(label)
+        self.bits[index >> 3] &= ~(1 << (index & 7)) & 0xFF
+
+    def available(self):
+        """
+        Labels of every free seat, in seat order.
+        """
+        free = []
+        for byte_index, byte in enumerate(self.bits):
+            if byte == 0xFF:
+                continue
+            start = byte_index * 8
+            for index in range(start, min(start + 8, self.size)):
+                if not byte & (1 << (index - start)):
+                    free.append(self.label(index))
+        return free
+
+    def to_bytes(self):
+        return bytes(self.bits)
+
+
+def _lock_flight(flight_id):
+    # A no-op UPDATE takes the flight's row lock until commit
+    Flight.objects.filter(pk=flight_id).update(available_seats=F("available_seats"))
+
+
+def _locked_seat_map(flight_id):
+    # Callers have already updated the flight row in this transaction, so the
+    # row is locked and the bitmap cannot change underneath them.
+    return SeatMap.for_flight(
+        Flight.objects.only("seat_rows", "seat_letters", "seat_map").get(pk=flight_id)
+    )
+
+
+def _take_seat(flight_id):
+    return Flight.objects.filter(
+        pk=flight_id, available_seats__gt=0
+    ).update(available_seats=F("available_seats") - 1)
+
+
+def book_seat(user, flight, seat_number, status="confirmed", hold_expires_at=None):
+    """
+    Atomically take one seat on `flight` for `user`.
+
+    The seat counter is decremented first with a conditional UPDATE, which
+    write-locks the flight row until commit; the seat bitmap is only read and
+    rewritten after that, and the booking row is protected by the unique
+    (flight, seat_number) constraint. Concurrent requests can therefore
+    neither oversell the flight nor book the same seat twice.
+
+    A seat (or the last seats) still held by a lapsed hold the sweeper hasn't
+    reached yet is released on the spot rather than reported as taken.
+    """
+    try:
+        with transaction.atomic():
+            if not _take_seat(flight.pk):
+                if not (_expire_flight_holds(flight.pk) and _take_seat(flight.pk)):
+                    raise NoSeatsAvailable()
+
+            seats = _locked_seat_map(flight.pk)
+            seat_number = seats.normalize(seat_number)
+            if seats.is_taken(seat_number):
+                if not _expire_flight_holds(flight.pk):
+                    raise SeatAlreadyBooked()
+                seats = _locked_seat_map(flight.pk)
+                if seats.is_taken(seat_number):
+                    raise SeatAlreadyBooked()
+            seats.take(seat_number)
+            Flight.objects.filter(pk=flight.pk).update(seat_map=seats.to_bytes())
+
+            return FlightBooking.objects.create(
+                user=user,
+                flight=flight,
+                seat_number=seat_number,
+                status=status,
+                hold_expires_at=hold_expires_at,
+            )
+    except IntegrityError:
+        raise SeatAlreadyBooked()
+
+
+def hold_seat(user, flight, seat_number, ttl=None):
+    """
+    Hold a seat for `ttl` seconds (SEAT_HOLD_TTL by default) while the user
+    checks out. The hold is a pending booking: it counts against availability
+    until it is confirmed with confirm_hold, cancelled, or expires.
+    """
+    ttl = settings.SEAT_HOLD_TTL if ttl is None else ttl
+    return book_seat(
+        user, flight, seat_number, status="pending", hold_expires_at=timezone.now() + timedelta(seconds=ttl)
+    )
+
+
+def confirm_hold(booking):
+    """
+    Turn an unexpired hold into a confirmed booking.
+    """
+    with transaction.atomic():
+        # Serialize with the expiry sweep, which also works under the flight lock
+        _lock_flight(booking.flight_id)
+        confirmed = FlightBooking.objects.filter(
+            pk=booking.pk, status="pending", hold_expires_at__gt=timezone.now()
+        ).update(status="confirmed", hold_expires_at=None)
+        if not confirmed:
+            status, expired_at = FlightBooking.objects.filter(pk=booking.pk).values_list(
+                "status", "hold_expires_at"
+            ).first() or (None, None)
+            # Holds released by the sweeper are cancelled but keep their expiry
+            if status == "pending" or (status == "cancelled" and expired_at):
+                raise HoldExpired()
+            raise NotAHold()
+    booking.status, booking.hold_expires_at = "confirmed", None
+    return booking
+
+
+def _expire_flight_holds(flight_id, now=None):
+    """
+    Cancel one flight's lapsed holds and give their seats back.
+    Returns the number of holds released.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        _lock_flight(flight_id)
+        due = list(
+            FlightBooking.objects.filter(
+                flight_id=flight_id, status="pending", hold_expires_at__lte=now
+            ).values_list("pk", "seat_number")
+        )
+        if not due:
+            return 0
+
+        FlightBooking.objects.filter(pk__in=[pk for pk, _ in due]).update(status="cancelled")
+        seats = _locked_seat_map(flight_id)
+        for _, seat_number in due:
+            try:
+                seats.release(seat_number)
+            except InvalidSeat:
+                pass
+        Flight.objects.filter(pk=flight_id).update(
+            available_seats=F("available_seats") + len(due), seat_map=seats.to_bytes()
+        )
+    return len(due)
+
+
+def expire_holds(now=None, batch_size=100):
+    """
+    Release every hold that has lapsed by `now`, one flight per transaction.
+
+    Only due holds are read, through the partial index on hold_expires_at, so
+    the cost follows the number of expiring holds, not the size of the
+    bookings table. Returns the number of holds released.
+    """
+    now = now or timezone.now()
+    released = 0
+    while True:
+        # Oldest holds first, straight off the index; DISTINCT would make the
+        # planner scan by flight instead.
+        due = (
+            FlightBooking.objects.filter(status="pending", hold_expires_at__lte=now)
+            .order_by("hold_expires_at").values_list("flight_id", flat=True)[:batch_size]
+        )
+        flight_ids = list(dict.fromkeys(due))
+        if not flight_ids:
+            return released
+        for flight_id in flight_ids:
+            released += _expire_flight_holds(flight_id, now)
+
+
+def cancel_booking(booking):
+    """
+    Cancel a booking and give its seat back to the flight.
+    """
+    with transaction.atomic():
+        # Lock the flight first, in the same order as book_seat
+        Flight.objects.filter(pk=booking.flight_id).update(
+            available_seats=F("available_seats") + 1
+        )
+        cancelled = FlightBooking.objects.filter(pk=booking.pk).exclude(
+            status="cancelled"
+        ).update(status="cancelled", hold_expires_at=None)
+        if not cancelled:
+            raise AlreadyCancelled()
+
+        seats = _locked_seat_map(booking.flight_id)
+        try:
+            seats.release(booking.seat_number)
+        except InvalidSeat:
+            # booked before the flight had a seat layout; only the counter changes
+            pass
+        Flight.objects.filter(pk=booking.flight_id).update(seat_map=seats.to_bytes())
+    booking.status, booking.hold_expires_at = "cancelled", None
+    return booking
@@ -4,7 +4,7 @@ from .models import Flight, FlightBooking
 class FlightSerializer(serializers.ModelSerializer):
     class Meta:
         model = Flight
-        fields = '__all__'
+        exclude = ['seat_map']
 
 class FlightBookingSerializer(serializers.ModelSerializer):
     class Meta:
@@ -0,0 +1,199 @@
+"""
+Incremental flight sync from Aviationstack.
+
+A run pages through `/flights` with limit/offset, turns each page into rows
+and upserts them in bulk. Every route keeps a FlightSyncState whose high-water
+mark is the latest departure already ingested. Reruns only insert flights
+from the mark on; older rows are still written when they update a flight
+already stored for the same departure date, so status changes and re-timings
+land. Flights are keyed on their number alone, so a row for another day's
+operation replaces the stored flight; that is skipped while the stored flight
+still has live bookings or seat holds, which would otherwise move with it to
+the other date. Only a run that pages through to the end of the results moves the mark
+forward. Requests for flights are then answered from the indexed Flight
+table.
+
+Existing flights whose times or status change are compared before the
+upsert, and their passengers are notified (see bookings.notifications).
+"""
+import logging
+from datetime import timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from services.aviationstack_service import AviationstackService
+from services.osm_ingest import upsert_rows
+
+from .models import Flight, FlightBooking, FlightSyncState
+from .notifications import WATCHED_FIELDS, notable_changes, record_flight_change
+
+logger = logging.getLogger(__name__)
+
+# Columns refreshed from Aviationstack; seats, prices and layout are local
+FLIGHT_UPDATE_FIELDS = [
+    "airline", "origin", "destination", "origin_iata", "destination_iata", "departure_time", "arrival_time",
+    "status",
+]
+FLIGHT_STATUSES = {value for value, _ in Flight.STATUS_CHOICES}
+
+
+def route_key(dep_iata=None, arr_iata=None):
+    return f"{(dep_iata or '*').upper()}-{(arr_iata or '*').upper()}"
+
+
+def parse_flight(item):
+    """
+    A Flight row from one Aviationstack record, or None when it lacks a flight
+    number, airports or departure time.
+    """
+    departure = item.get("departure") or {}
+    arrival = item.get("arrival") or {}
+    flight_number = ((item.get("flight") or {}).get("iata") or "")[:10]
+    departure_time = parse_datetime(departure.get("scheduled") or departure.get("estimated") or "")
+    arrival_time = parse_datetime(arrival.get("scheduled") or arrival.get("estimated") or "")
+    if not (flight_number and departure.get("airport") and arrival.get("airport") and departure_time):
+        return None
+
+    return {
+        "flight_number": flight_number,
+        "airline": ((item.get("airline") or {}).get("name") or "")[:100],
+        "origin": departure["airport"][:100],
+        "destination": arrival["airport"][:100],
+        "origin_iata": (departure.get("iata") or "")[:3],
+        "destination_iata": (arrival.get("iata") or "")[:3],
+        "departure_time": departure_time,
+        # Missing arrival times used to be stored as 1970; the departure is a saner floor
+        "arrival_time": arrival_time or departure_time,
+        "status": item.get("flight_status") if item.get("flight_status") in FLIGHT_STATUSES else "scheduled",
+    }
+
+
+def sync_flights(dep_iata=None, arr_iata=None, full=False, max_pages=None, page_size=None):
+    """
+    Page through Aviationstack for a route and upsert new flights.
+
+    With `full`, the high-water mark is ignored and every flight is written.
+    The mark only advances when the run reaches the end of the results, so a
+    run cut short by `max_pages` does not skip the pages it never fetched.
+    Returns a dict with pages, seen, written, high_water_mark and complete
+    (whether the run reached the end of the results).
+    """
+    max_pages = max_pages or settings.AVIATIONSTACK_MAX_PAGES
+    page_size = page_size or settings.AVIATIONSTACK_PAGE_SIZE
+    state, _ = FlightSyncState.objects.get_or_create(route=route_key(dep_iata, arr_iata))
+    mark = None if full else state.high_water_mark
+    newest = state.high_water_mark
+
+    pages = seen = written = offset = 0
+    exhausted = False
+    try:
+        while pages < max_pages:
+            payload = AviationstackService.flights(
+                dep_iata=dep_iata, arr_iata=arr_iata, limit=page_size, offset=offset
+            )
+            data = payload.get("data") or []
+            pages += 1
+            seen += len(data)
+
+            rows = [row for row in map(parse_flight, data) if row]
+            if rows:
+                latest = max(row["departure_time"] for row in rows)
+                newest = latest if newest is None else max(newest, latest)
+            current = Flight.objects.only(*WATCHED_FIELDS).in_bulk([row["flight_number"] for row in rows])
+            booked = _booked_flights(rows, current)
+            if booked:
+                logger.info("Skipping other operations of booked flights %s", ", ".join(sorted(booked)))
+                rows = [row for row in rows if row["flight_number"] not in booked or _same_operation(
+                    current[row["flight_number"]], row
+                )]
+            if mark is not None:
+                rows = [
+                    row for row in rows
+                    if row["departure_time"] >= mark or _same_operation(current.get(row["flight_number"]), row)
+                ]
+            changed = _changed_flights(rows, current)
+            written += upsert_rows(Flight, rows, FLIGHT_UPDATE_FIELDS, unique_field="flight_number")
+            for flight in Flight.objects.filter(pk__in=changed):
+                record_flight_change(flight, changed[flight.pk])
+
+            offset += len(data)
+            total = (payload.get("pagination") or {}).get("total", 0)
+            if not data or offset >= total:
+                exhausted = True
+                break
+    except Exception as e:
+        logger.exception("Flight sync failed for %s", state.route)
+        state.last_error = str(e)
+        state.save(update_fields=["last_error"])
+        raise
+
+    if exhausted:
+        state.high_water_mark = newest
+    state.last_synced_at = timezone.now()
+    state.last_error = ""
+    state.pages_fetched = pages
+    state.flight_count = written
+    state.save()
+    logger.info("Synced %s: %s pages, %s flights seen, %s written", state.route, pages, seen, written)
+    return {
+        "pages": pages, "seen": seen, "written": written, "high_water_mark": state.high_water_mark,
+        "complete": exhausted,
+    }
+
+
+def _same_operation(flight, row):
+    """
+    Whether a row is the stored flight on the same (UTC) departure date, as
+    opposed to another day's operation of the same flight number.
+    """
+    return flight is not None and (
+        flight.departure_time.astimezone(dt_timezone.utc).date()
+        == row["departure_time"].astimezone(dt_timezone.utc).date()
+    )
+
+
+def _booked_flights(rows, current):
+    """
+    Flight numbers of stored flights that rows would move to another
+    departure date while they still have live bookings or seat holds.
+    """
+    moving = {
+        row["flight_number"] for row in rows
+        if row["flight_number"] in current and not _same_operation(current[row["flight_number"]], row)
+    }
+    if not moving:
+        return set()
+    return set(
+        FlightBooking.objects.filter(flight_id__in=moving).exclude(status="cancelled")
+        .values_list("flight_id", flat=True).distinct()
+    )
+
+
+def _changed_flights(rows, current):
+    """
+    {flight_number: changes} for rows that would change a stored flight's
+    times or status, given the stored flights read before the upsert. A row
+    for another departure date is the next operation of a recurring flight
+    number replacing the stored one, not a change to notify passengers of.
+    """
+    changed = {}
+    for row in rows:
+        flight = current.get(row["flight_number"])
+        if _same_operation(flight, row) and (changes := notable_changes(flight, row)):
+            changed[flight.pk] = changes
+    return changed
+
+
+def is_fresh(dep_iata=None, arr_iata=None, max_age=None):
+    """
+    Whether the route was synced successfully within `max_age` seconds
+    (FLIGHT_SYNC_TTL by default).
+    """
+    max_age = settings.FLIGHT_SYNC_TTL if max_age is None else max_age
+    cutoff = timezone.now() - timedelta(seconds=max_age)
+    return FlightSyncState.objects.filter(
+        route=route_key(dep_iata, arr_iata), last_synced_at__gte=cutoff
+    ).exists()
+
@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.core.mail import send_mail
+
+from jobs.queue import task
+
+from .models import FlightBooking, FlightChangeNotification
+from .notifications import send_flight_change
+from .sync import sync_flights
+
+
+@task('bookings.send_confirmation')
+def send_confirmation(booking_id):
+    booking = FlightBooking.objects.select_related('user', 'flight').get(pk=booking_id)
+    send_mail(
+        "Your Flight Booking Confirmation",
+        f"Hello {booking.user.username},\nYour flight booking is confirmed.\nBooking ID: {booking.id}\nFlight: {booking.flight.flight_number}\nSeat: {booking.seat_number}",
+        settings.DEFAULT_FROM_EMAIL,
+        [booking.user.email],
+        fail_silently=False,
+    )
+
+
+@task('bookings.notify_passengers')
+def notify_passengers(notification_id):
+    notification = FlightChangeNotification.objects.get(pk=notification_id)
+    if notification.finished_at is None:
+        send_flight_change(notification)
+
+
+@task('bookings.sync_flights')
+def sync_route(dep_iata, arr_iata):
+    sync_flights(dep_iata or None, arr_iata or None)
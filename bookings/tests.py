@@ -1,3 +1,905 @@
-from django.test import TestCase
+import unittest
+import uuid
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+import requests
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from jobs.models import Job
+from jobs.queue import run_pending
+from services.http import ProviderUnavailable
+
+from . import boarding, qr, sync
+from .checkin import check_in_scans
+from .models import Flight, FlightBooking, FlightChangeNotification, FlightSyncState
+from .notifications import send_flight_change, update_flight
+from .seats import (
+    AlreadyCancelled, HoldExpired, InvalidSeat, NoSeatsAvailable, NotAHold, SeatAlreadyBooked, SeatMap, book_seat,
+    cancel_booking, confirm_hold, expire_holds, hold_seat,
+)
+
+
+def make_flight(flight_number="KQ100", available_seats=100, **kwargs):
+    now = timezone.now()
+    fields = {
+        "airline": "Kenya Airways",
+        "origin": "NBO",
+        "destination": "MBA",
+        "departure_time": now + timedelta(days=1),
+        "arrival_time": now + timedelta(days=1, hours=1),
+        "price": 120,
+        **kwargs,
+    }
+    return Flight.objects.create(flight_number=flight_number, available_seats=available_seats, **fields)
+
+
+def make_user(username="traveller", **kwargs):
+    return get_user_model().objects.create_user(username=username, email=f"{username}@example.com", **kwargs)
+
+
+class BookSeatTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.flight = make_flight(available_seats=2)
+
+    def test_booking_takes_a_seat(self):
+        booking = book_seat(self.user, self.flight, "1A")
+
+        self.flight.refresh_from_db()
+        self.assertEqual(booking.status, "confirmed")
+        self.assertEqual(self.flight.available_seats, 1)
+
+    def test_same_seat_cannot_be_booked_twice(self):
+        book_seat(self.user, self.flight, "1A")
+
+        with self.assertRaises(SeatAlreadyBooked):
+            book_seat(make_user("other"), self.flight, "1A")
+
+        # the failed attempt must not have consumed a seat
+        self.flight.refresh_from_db()
+        self.assertEqual(self.flight.available_seats, 1)
+        self.assertEqual(FlightBooking.objects.count(), 1)
+
+    def test_sold_out_flight_rejects_bookings(self):
+        book_seat(self.user, self.flight, "1A")
+        book_seat(self.user, self.flight, "1B")
+
+        with self.assertRaises(NoSeatsAvailable):
+            book_seat(self.user, self.flight, "1C")
+        self.assertEqual(FlightBooking.objects.count(), 2)
+
+    def test_seat_must_exist_on_the_flight(self):
+        for seat in ("21A", "1F", "0A", "A1", ""):
+            with self.assertRaises(InvalidSeat):
+                book_seat(self.user, self.flight, seat)
+        self.flight.refresh_from_db()
+        self.assertEqual(self.flight.available_seats, 2)
+
+    def test_seat_label_is_normalized(self):
+        booking = book_seat(self.user, self.flight, " 12c ")
+
+        self.assertEqual(booking.seat_number, "12C")
+        with self.assertRaises(SeatAlreadyBooked):
+            book_seat(self.user, self.flight, "12C")
+
+    def test_cancelled_seat_can_be_rebooked(self):
+        booking = book_seat(self.user, self.flight, "1A")
+        cancel_booking(booking)
+
+        self.flight.refresh_from_db()
+        self.assertEqual(self.flight.available_seats, 2)
+        self.assertIn("1A", SeatMap.for_flight(self.flight).available())
+        with self.assertRaises(AlreadyCancelled):
+            cancel_booking(booking)
+
+        book_seat(make_user("other"), self.flight, "1A")
+        self.assertEqual(FlightBooking.objects.filter(seat_number="1A").count(), 2)
+
+
+class SeatMapTests(TestCase):
+    def test_layout_labels_and_bits(self):
+        seats = SeatMap(3, "ABC")
+
+        self.assertEqual(seats.size, 9)
+        self.assertEqual(seats.index("1A"), 0)
+        self.assertEqual(seats.index("2A"), 3)
+        self.assertEqual(seats.label(8), "3C")
+
+        seats.take("1A")
+        seats.take("3C")
+        self.assertEqual(seats.available(), ["1B", "1C", "2A", "2B", "2C", "3A", "3B"])
+        seats.release("3C")
+
+        restored = SeatMap(3, "ABC", seats.to_bytes())
+        self.assertTrue(restored.is_taken("1A"))
+        self.assertFalse(restored.is_taken("3C"))
+
+    def test_full_bytes_are_skipped(self):
+        seats = SeatMap(50, "ABCDEF")
+        for label in seats.available():
+            seats.take(label)
+        seats.release("50F")
+
+        self.assertEqual(seats.available(), ["50F"])
+
+
+class AvailableSeatsViewTests(APITestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.flight = make_flight(seat_rows=2, seat_letters="AB", available_seats=4)
+
+    def test_lists_free_seats_with_one_query(self):
+        book_seat(self.user, self.flight, "1B")
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("available-seats", args=[self.flight.flight_number]))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["available_seats"], ["1A", "2A", "2B"])
+
+    def test_owner_can_cancel(self):
+        booking = book_seat(self.user, self.flight, "1B")
+        url = reverse("cancel-booking", args=[booking.id])
+
+        self.client.force_authenticate(make_user("stranger"))
+        self.assertEqual(self.client.post(url).status_code, 404)
+
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.post(url).status_code, 200)
+        self.assertEqual(self.client.post(url).status_code, 400)
+        response = self.client.get(reverse("available-seats", args=[self.flight.flight_number]))
+        self.assertEqual(response.json()["available_seats"], ["1A", "1B", "2A", "2B"])
+
+
+@override_settings(JOBS_EAGER=False)
+class BookFlightViewTests(APITestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.flight = make_flight()
+        self.client.force_authenticate(self.user)
+
+    def test_confirmation_is_queued_not_sent_inline(self):
+        response = self.client.post(
+            reverse("book-flight"), {"flight_number": self.flight.flight_number, "seat_number": "3c"}
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["seat_number"], "3C")
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(Job.objects.filter(status=Job.QUEUED).count(), 1)
+
+        self.assertEqual(run_pending(), (1, 0))
+        # the QR code is rendered on demand, never written to media storage
+        self.assertFalse(FlightBooking.objects.get().qr_code)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn("Seat: 3C", mail.outbox[0].body)
+
+    def test_rejected_booking_queues_nothing(self):
+        response = self.client.post(
+            reverse("book-flight"), {"flight_number": self.flight.flight_number, "seat_number": "99Z"}
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Job.objects.exists())
+
+
+class BookingQRCodeTests(APITestCase):
+    def setUp(self):
+        qr.clear_cache()
+        self.user = make_user()
+        self.booking = book_seat(self.user, make_flight(), "1A")
+        self.url = reverse("booking-qr", args=[self.booking.id])
+        self.client.force_authenticate(self.user)
+
+    def test_renders_png_with_validators(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "image/png")
+        self.assertTrue(response.content.startswith(b"\x89PNG"))
+        self.assertTrue(response["ETag"].startswith('"'))
+        self.assertIn("private", response["Cache-Control"])
+        self.assertIn("max-age", response["Cache-Control"])
+
+    def test_repeat_fetches_reuse_the_rendered_bytes(self):
+        with mock.patch("bookings.qr.qrcode.make", wraps=qr.qrcode.make) as make:
+            first = self.client.get(self.url)
+            second = self.client.get(self.url)
+
+        make.assert_called_once()
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(first["ETag"], second["ETag"])
+
+    def test_matching_etag_returns_not_modified(self):
+        tag = self.client.get(self.url)["ETag"]
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=tag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(response["ETag"], tag)
+
+    def test_only_the_passenger_or_staff_get_the_code(self):
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+        self.client.force_authenticate(make_user("other"))
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+        self.client.force_authenticate(make_user("gate", is_staff=True))
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    def test_booking_details_point_at_the_endpoint(self):
+        response = self.client.get(reverse("booking-details", args=[self.booking.id]))
+
+        self.assertTrue(response.json()["qr_code_url"].endswith(self.url))
+
+
+class BoardingTokenTests(APITestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.booking = book_seat(self.user, make_flight(), "4D")
+        self.token = boarding.make_token(self.booking)
+
+    def test_token_round_trip(self):
+        boarding_pass = boarding.verify_token(self.token)
+
+        self.assertEqual(boarding_pass["booking_id"], str(self.booking.id))
+        self.assertEqual(boarding_pass["flight_number"], "KQ100")
+        self.assertEqual(boarding_pass["seat"], "4D")
+        self.assertEqual(boarding.make_token(self.booking), self.token)
+        self.assertEqual(qr.qr_content(self.booking), self.token)
+
+    def test_tampered_or_garbage_tokens_are_rejected(self):
+        for token in (self.token[:-2] + "xx", "not-a-token", ""):
+            with self.assertRaises(boarding.InvalidBoardingToken):
+                boarding.verify_token(token)
+
+    def test_expired_token_is_rejected(self):
+        Flight.objects.update(departure_time=timezone.now() - timedelta(days=1))
+        self.booking.refresh_from_db()
+
+        with self.assertRaises(boarding.ExpiredBoardingToken):
+            boarding.verify_token(boarding.make_token(self.booking))
+
+    def test_verify_endpoint_does_not_touch_the_database(self):
+        self.client.force_authenticate(self.user)
+
+        with self.assertNumQueries(0):
+            response = self.client.post(reverse("verify-boarding-token"), {"token": self.token})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["seat"], "4D")
+        response = self.client.post(reverse("verify-boarding-token"), {"token": "bogus"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_verify_qr_code_loads_booking_in_one_query(self):
+        self.client.force_authenticate(self.user)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("verify-qr", args=[self.booking.id]))
+
+        self.assertEqual(response.json()["passenger"], "traveller")
+
+
+class CheckInTests(APITestCase):
+    def setUp(self):
+        self.booking = book_seat(make_user(), make_flight(), "1A")
+        self.url = reverse("check-in", args=[self.booking.id])
+        self.client.force_authenticate(make_user("gate", is_staff=True))
+
+    def test_check_in_is_a_single_update(self):
+        with self.assertNumQueries(1):
+            response = self.client.post(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.status, "checked_in")
+
+    def test_repeat_and_cancelled_check_ins_are_refused(self):
+        self.client.post(self.url)
+        self.assertEqual(self.client.post(self.url).status_code, 400)
+
+        other = book_seat(make_user("other"), self.booking.flight, "1B")
+        cancel_booking(other)
+        response = self.client.post(reverse("check-in", args=[other.id]))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["message"], "Booking is cancelled.")
+
+    def test_seat_holds_are_refused(self):
+        live = hold_seat(make_user("live"), self.booking.flight, "1B")
+        expired = hold_seat(make_user("expired"), self.booking.flight, "1C", ttl=0)
+
+        for hold in (live, expired):
+            response = self.client.post(reverse("check-in", args=[hold.id]))
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json()["message"], "Booking is not confirmed.")
+
+        self.assertEqual(expire_holds(), 1)
+        self.assertEqual(FlightBooking.objects.get(pk=live.pk).status, "pending")
+
+    def test_unknown_booking(self):
+        self.assertEqual(self.client.post(reverse("check-in", args=[uuid.uuid4()])).status_code, 404)
+
+    def test_get_and_anonymous_check_ins_are_refused(self):
+        self.assertEqual(self.client.get(self.url).status_code, 405)
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.post(self.url).status_code, 401)
+
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.status, "confirmed")
+
+    def test_passengers_cannot_check_in(self):
+        self.client.force_authenticate(make_user("passenger"))
+
+        self.assertEqual(self.client.post(self.url).status_code, 403)
+
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.status, "confirmed")
+
+
+class BatchCheckInTests(APITestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.flight = make_flight()
+        self.bookings = [book_seat(self.user, self.flight, seat) for seat in ("1A", "1B", "1C", "1D")]
+        self.client.force_authenticate(make_user("gate", is_staff=True))
+
+    def test_batch_reports_each_scan(self):
+        confirmed, already, cancelled, by_token = self.bookings
+        FlightBooking.objects.filter(pk=already.pk).update(status="checked_in")
+        cancel_booking(cancelled)
+        unknown = uuid.uuid4()
+        scans = [
+            str(confirmed.id), str(already.id), str(cancelled.id), str(unknown),
+            boarding.make_token(by_token), "garbage", str(confirmed.id),
+        ]
+
+        # savepoint, one locking read, one UPDATE, release
+        with self.assertNumQueries(4):
+            results = check_in_scans(scans)
+
+        self.assertEqual([item["result"] for item in results], [
+            "checked_in", "already_checked_in", "cancelled", "unknown",
+            "checked_in", "invalid_token", "already_checked_in",
+        ])
+        self.assertEqual(results[4]["booking_id"], str(by_token.id))
+        self.assertEqual(
+            set(FlightBooking.objects.filter(status="checked_in").values_list("seat_number", flat=True)),
+            {"1A", "1B", "1D"},
+        )
+
+    def test_seat_holds_are_not_confirmed(self):
+        live = hold_seat(self.user, self.flight, "2A")
+        expired = hold_seat(self.user, self.flight, "2B", ttl=0)
+
+        results = check_in_scans([str(live.id), boarding.make_token(expired), str(self.bookings[0].id)])
+
+        self.assertEqual([item["result"] for item in results], ["not_confirmed", "not_confirmed", "checked_in"])
+        self.assertEqual(
+            dict(FlightBooking.objects.filter(pk__in=[live.pk, expired.pk]).values_list("seat_number", "status")),
+            {"2A": "pending", "2B": "pending"},
+        )
+        self.assertEqual(expire_holds(), 1)
+
+    def test_endpoint(self):
+        ids = [str(booking.id) for booking in self.bookings]
+
+        response = self.client.post(reverse("batch-check-in"), {"scans": ids}, format="json")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["summary"], {"checked_in": 4})
+        response = self.client.post(reverse("batch-check-in"), {"scans": ids}, format="json")
+        self.assertEqual(response.json()["summary"], {"already_checked_in": 4})
+
+    def test_passengers_cannot_batch_check_in(self):
+        self.client.force_authenticate(self.user)
+        scans = [str(self.bookings[0].id), boarding.make_token(self.bookings[1])]
+
+        response = self.client.post(reverse("batch-check-in"), {"scans": scans}, format="json")
+
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(FlightBooking.objects.exclude(status="confirmed").exists())
+
+    def test_rejects_bad_payloads(self):
+        for payload in ({}, {"scans": []}, {"scans": "abc"}, {"scans": ["x"] * 1001}):
+            response = self.client.post(reverse("batch-check-in"), payload, format="json")
+            self.assertEqual(response.status_code, 400)
+
+    def test_single_check_in_accepts_post(self):
+        response = self.client.post(reverse("check-in", args=[self.bookings[0].id]))
+
+        self.assertEqual(response.status_code, 200)
+
+
+def aviationstack_record(flight_number, departure, dep="NBO", arr="MBA"):
+    return {
+        "flight": {"iata": flight_number},
+        "airline": {"name": "Kenya Airways"},
+        "departure": {"airport": "Jomo Kenyatta International", "iata": dep, "scheduled": departure},
+        "arrival": {"airport": "Moi International", "iata": arr, "scheduled": None},
+    }
+
+
+def aviationstack_pages(records, page_size):
+    """
+    A fake AviationstackService.flights honouring limit/offset.
+    """
+    def flights(limit, offset, **params):
+        return {
+            "pagination": {"limit": limit, "offset": offset, "total": len(records)},
+            "data": records[offset:offset + limit],
+        }
+    return flights
+
+
+@override_settings(AVIATIONSTACK_PAGE_SIZE=2, FLIGHT_SYNC_TTL=600)
+class FlightSyncTests(APITestCase):
+    def setUp(self):
+        self.records = [
+            aviationstack_record("KQ600", "2026-10-20T06:00:00+00:00"),
+            aviationstack_record("KQ602", "2026-10-20T12:00:00+00:00"),
+            aviationstack_record("KQ604", "2026-10-21T06:00:00+00:00"),
+            {"flight": {"iata": ""}, "departure": {}, "arrival": {}},
+            aviationstack_record("KQ606", "2026-10-21T18:00:00+00:00"),
+        ]
+
+    def test_pages_through_results_and_upserts(self):
+        with mock.patch("bookings.sync.AviationstackService.flights",
+                        side_effect=aviationstack_pages(self.records, 2)) as flights:
+            result = sync.sync_flights("NBO", "MBA")
+
+        self.assertEqual([c.kwargs["offset"] for c in flights.call_args_list], [0, 2, 4])
+        self.assertEqual((result["pages"], result["seen"], result["written"]), (3, 5, 4))
+        flight = Flight.objects.get(pk="KQ600")
+        self.assertEqual((flight.origin_iata, flight.destination_iata), ("NBO", "MBA"))
+        # no scheduled arrival: fall back to the departure instead of 1970
+        self.assertEqual(flight.arrival_time, flight.departure_time)
+        self.assertEqual(
+            FlightSyncState.objects.get(route="NBO-MBA").high_water_mark.isoformat(), "2026-10-21T18:00:00+00:00"
+        )
+
+    @override_settings(JOBS_EAGER=False)
+    def test_changed_flights_notify_their_passengers(self):
+        with mock.patch("bookings.sync.AviationstackService.flights",
+                        side_effect=aviationstack_pages(self.records, 2)):
+            sync.sync_flights("NBO", "MBA")
+        self.records[4] = {**aviationstack_record("KQ606", "2026-10-21T20:00:00+00:00"), "flight_status": "cancelled"}
+
+        with mock.patch("bookings.sync.AviationstackService.flights",
+                        side_effect=aviationstack_pages(self.records, 2)):
+            sync.sync_flights("NBO", "MBA")
+
+        notification = FlightChangeNotification.objects.get()
+        self.assertEqual(notification.flight_id, "KQ606")
+        self.assertEqual(set(notification.changes), {"departure_time", "arrival_time", "status"})
+        self.assertEqual(Flight.objects.get(pk="KQ606").status, "cancelled")
+
+    @override_settings(JOBS_EAGER=False)
+    def test_next_days_operation_of_a_flight_number_does_not_notify(self):
+        with mock.patch("bookings.sync.AviationstackService.flights",
+                        side_effect=aviationstack_pages(self.records, 2)):
+            sync.sync_flights("NBO", "MBA")
+        # the provider moves on to tomorrow's KQ600 and KQ606
+        self.records[0] = aviationstack_record("KQ600", "2026-10-21T06:00:00+00:00")
+        self.records[4] = aviationstack_record("KQ606", "2026-10-22T18:00:00+00:00")
+
+        for full in (False, True):
+            with mock.patch("bookings.sync.AviationstackService.flights",
+                            side_effect=aviationstack_pages(self.records, 2)):
+                sync.sync_flights("NBO", "MBA", full=full)
+
+        self.assertFalse(FlightChangeNotification.objects.exists())
+        self.assertEqual(Flight.objects.get(pk="KQ606").departure_time.isoformat(), "2026-10-22T18:00:00+00:00")
+
+    def test_next_days_operation_does_not_move_a_booked_flight(self):
+        with mock.patch("bookings.sync.AviationstackService.flights",
+                        side_effect=aviationstack_pages(self.records, 2)):
+            sync.sync_flights("NBO", "MBA")
+        book_seat(make_user(), Flight.objects.get(pk="KQ606"), "1A")
+        self.records[4] = aviationstack_record("KQ606", "2026-10-22T18:00:00+00:00")
+
+        for full in (False, True):
+            with mock.patch("bookings.sync.AviationstackService.flights",
+                            side_effect=aviationstack_pages(self.records, 2)):
+                with self.assertLogs("bookings.sync", "INFO"):
+                    sync.sync_flights("NBO", "MBA", full=full)
+
+        flight = Flight.objects.get(pk="KQ606")
+        self.assertEqual(flight.departure_time.isoformat(), "2026-10-21T18:00:00+00:00")
+        self.assertEqual(flight.available_seats, 99)
+
+    def test_rerun_only_inserts_flights_after_the_high_water_mark(self):
+        with mock.patch("bookings.sync.AviationstackService.flights",
+                        side_effect=aviationstack_pages(self.records, 2)):
+            sync.sync_flights("NBO", "MBA")
+        Flight.objects.filter(pk="KQ600").update(price=999)
+        Flight.objects.filter(pk="KQ602").delete()
+        self.records[0] = {**self.records[0], "flight_status": "active"}
+        self.records.append(aviationstack_record("KQ608", "2026-10-22T06:00:00+00:00"))
+
+        with mock.patch("bookings.sync.AviationstackService.flights",
+                        side_effect=aviationstack_pages(self.records, 2)):
+            result = sync.sync_flights("NBO", "MBA")
+
+        # KQ602 is behind the mark and not stored, so it is not re-inserted;
+        # stored flights behind the mark still take the provider's status
+        self.assertEqual(result["written"], 4)
+        self.assertFalse(Flight.objects.filter(pk="KQ602").exists())
+        self.assertTrue(Flight.objects.filter(pk="KQ608").exists())
+        kq600 = Flight.objects.get(pk="KQ600")
+        self.assertEqual((kq600.status, kq600.price), ("active", 999))
+
+    def test_run_stopped_by_max_pages_keeps_the_mark(self):
+        with mock.patch("bookings.sync.AviationstackService.flights",
+                        side_effect=aviationstack_pages(self.records, 2)):
+            result = sync.sync_flights("NBO", "MBA", max_pages=1)
+
+        self.assertEqual((result["pages"], result["high_water_mark"]), (1, None))
+        self.assertIsNone(FlightSyncState.objects.get(route="NBO-MBA").high_water_mark)
+
+        with mock.patch("bookings.sync.AviationstackService.flights",
+                        side_effect=aviationstack_pages(self.records, 2)):
+            result = sync.sync_flights("NBO", "MBA")
+
+        # the pages the first run never fetched are not skipped
+        self.assertEqual(Flight.objects.count(), 4)
+        self.assertEqual(result["high_water_mark"].isoformat(), "2026-10-21T18:00:00+00:00")
+
+    def test_failed_run_keeps_the_mark(self):
+        with mock.patch("bookings.sync.AviationstackService.flights", side_effect=requests.ConnectionError("down")):
+            with self.assertLogs("bookings.sync", "ERROR"), self.assertRaises(requests.ConnectionError):
+                sync.sync_flights()
+
+        state = FlightSyncState.objects.get(route="*-*")
+        self.assertIsNone(state.high_water_mark)
+        self.assertEqual(state.last_error, "down")
+
+    @override_settings(JOBS_EAGER=False)
+    def test_endpoint_filters_by_date_locally_and_reuses_fresh_sync(self):
+        url = reverse("fetch-flights")
+        with mock.patch("bookings.sync.AviationstackService.flights",
+                        side_effect=aviationstack_pages(self.records, 2)) as flights:
+            first = self.client.get(url, {"dep_iata": "nbo", "arr_iata": "MBA", "flight_date": "2026-10-20"})
+            pending = self.client.get(url, {"dep_iata": "NBO", "arr_iata": "MBA", "flight_date": "2026-10-21"})
+            # a never-synced route gets one page inline; the rest is a job
+            self.assertEqual(flights.call_count, 1)
+            self.assertEqual(run_pending(), (1, 0))
+            response = self.client.get(url, {"dep_iata": "NBO", "arr_iata": "MBA", "flight_date": "2026-10-21"})
+
+        self.assertEqual(flights.call_count, 4)
+        self.assertEqual([f["flight_number"] for f in first.json()["results"]], ["KQ600", "KQ602"])
+        self.assertEqual(pending.status_code, 202)
+        self.assertEqual([f["flight_number"] for f in response.json()["results"]], ["KQ604", "KQ606"])
+        self.assertEqual(self.client.get(url, {"flight_date": "tomorrow"}).status_code, 400)
+
+    @override_settings(JOBS_EAGER=False)
+    def test_endpoint_is_accepted_while_the_first_sync_is_queued(self):
+        url = reverse("fetch-flights")
+        with mock.patch("bookings.sync.AviationstackService.flights",
+                        side_effect=aviationstack_pages(self.records, 2)):
+            response = self.client.get(url, {"dep_iata": "NBO", "arr_iata": "MBA", "flight_date": "2026-10-21"})
+            self.assertEqual(response.status_code, 202)
+            self.assertEqual(Job.objects.get().payload, {"dep_iata": "NBO", "arr_iata": "MBA"})
+            run_pending()
+
+        # once the job has finished, an empty day is just empty
+        response = self.client.get(url, {"dep_iata": "NBO", "arr_iata": "MBA", "flight_date": "2026-10-30"})
+        self.assertEqual(response.status_code, 404)
+
+    def test_endpoint_is_paginated(self):
+        FlightSyncState.objects.create(route="*-*", last_synced_at=timezone.now())
+        for number in ("KQ700", "KQ701", "KQ702"):
+            make_flight(number)
+
+        with mock.patch("bookings.sync.AviationstackService.flights") as flights:
+            response = self.client.get(reverse("fetch-flights"), {"page_size": 2})
+
+        flights.assert_not_called()
+        self.assertEqual([f["flight_number"] for f in response.json()["results"]], ["KQ700", "KQ701"])
+        self.assertIsNotNone(response.json()["next"])
+
+    @override_settings(PROVIDER_REVALIDATE_EAGER=True)
+    def test_stale_route_is_served_from_the_database_while_upstream_is_down(self):
+        url = reverse("fetch-flights")
+        with mock.patch("bookings.sync.AviationstackService.flights",
+                        side_effect=aviationstack_pages(self.records, 2)):
+            self.client.get(url, {"dep_iata": "NBO", "arr_iata": "MBA"})
+            run_pending()
+        FlightSyncState.objects.update(last_synced_at=timezone.now() - timedelta(seconds=601))
+
+        with mock.patch("bookings.sync.AviationstackService.flights",
+                        side_effect=requests.ConnectionError("down")) as flights:
+            with self.assertLogs("services.revalidate", "WARNING"), self.assertLogs("bookings.sync", "ERROR"):
+                response = self.client.get(url, {"dep_iata": "NBO", "arr_iata": "MBA"})
+
+        self.assertEqual(flights.call_count, 1)  # the background refresh
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["results"]), 4)
+        self.assertEqual(FlightSyncState.objects.get(route="NBO-MBA").last_error, "down")
+
+    def test_unsynced_route_is_503_without_local_flights(self):
+        url = reverse("fetch-flights")
+        with mock.patch("bookings.sync.AviationstackService.flights",
+                        side_effect=ProviderUnavailable("aviationstack is unavailable", retry_after=20)):
+            with self.assertLogs("bookings.sync", "ERROR"):
+                response = self.client.get(url, {"dep_iata": "NBO", "arr_iata": "MBA"})
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response["Retry-After"], "20")
+
+            make_flight("KQ700", origin_iata="NBO", destination_iata="MBA")
+            with self.assertLogs("bookings.sync", "ERROR"):
+                response = self.client.get(url, {"dep_iata": "NBO", "arr_iata": "MBA"})
+        self.assertEqual([f["flight_number"] for f in response.json()["results"]], ["KQ700"])
+
+
+class FlightListTests(APITestCase):
+    def setUp(self):
+        start = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+        for i in range(30):
+            make_flight(
+                flight_number=f"KQ{i:03}",
+                origin="Jomo Kenyatta International" if i % 3 else "Moi International",
+                destination="Moi International" if i % 3 else "Jomo Kenyatta International",
+                departure_time=start + timedelta(hours=i),
+                price=100 + i,
+            )
+        self.url = reverse("flight-list")
+
+    def test_cursor_pages_cover_every_flight_once(self):
+        seen = []
+        response = self.client.get(self.url, {"page_size": 7})
+        while True:
+            body = response.json()
+            seen += [flight["flight_number"] for flight in body["results"]]
+            if not body["next"]:
+                break
+            response = self.client.get(body["next"])
+
+        self.assertEqual(seen, [f"KQ{i:03}" for i in range(30)])
+
+    def test_filters(self):
+        response = self.client.get(self.url, {
+            "origin": "Jomo Kenyatta International",
+            "destination": "Moi International",
+            "min_price": 110,
+            "max_price": 120,
+            "airline": "kenya airways",
+        })
+
+        numbers = [flight["flight_number"] for flight in response.json()["results"]]
+        self.assertEqual(numbers, ["KQ010", "KQ011", "KQ013", "KQ014", "KQ016", "KQ017", "KQ019", "KQ020"])
+        self.assertNotIn("seat_map", response.json()["results"][0])
+
+    def test_departure_date_filter(self):
+        day = (timezone.localtime(Flight.objects.get(pk="KQ000").departure_time)).date()
+
+        response = self.client.get(self.url, {"departure_date": day.isoformat()})
+
+        self.assertTrue(response.json()["results"])
+        for flight in response.json()["results"]:
+            self.assertEqual(flight["departure_time"][:10], day.isoformat())
+
+    @unittest.skipUnless(connection.vendor == "sqlite", "query plan format is backend specific")
+    def test_route_search_uses_the_composite_index(self):
+        first = self.client.get(self.url, {
+            "origin": "Jomo Kenyatta International", "destination": "Moi International", "page_size": 5,
+        }).json()
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(first["next"])
+        sql = next(q["sql"] for q in queries if q["sql"].startswith("SELECT"))
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+            plan = " ".join(str(row[-1]) for row in cursor.fetchall())
+
+        self.assertIn("USING INDEX flight_route_departure_idx", plan)
+        self.assertNotIn("SCAN bookings_flight", plan)
+
+
+class SeatHoldTests(APITestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.flight = make_flight(available_seats=4, seat_rows=2, seat_letters="AB")
+
+    def lapse(self, *bookings):
+        FlightBooking.objects.filter(pk__in=[b.pk for b in bookings]).update(
+            hold_expires_at=timezone.now() - timedelta(seconds=1)
+        )
+
+    def test_hold_counts_against_availability_until_confirmed(self):
+        hold = hold_seat(self.user, self.flight, "1A", ttl=60)
+
+        self.assertEqual(hold.status, "pending")
+        self.flight.refresh_from_db()
+        self.assertEqual(self.flight.available_seats, 3)
+        self.assertNotIn("1A", SeatMap.for_flight(self.flight).available())
+        with self.assertRaises(SeatAlreadyBooked):
+            book_seat(make_user("other"), self.flight, "1A")
+
+        confirm_hold(hold)
+        hold.refresh_from_db()
+        self.assertEqual((hold.status, hold.hold_expires_at), ("confirmed", None))
+        with self.assertRaises(NotAHold):
+            confirm_hold(hold)
+
+    def test_lapsed_hold_cannot_be_confirmed(self):
+        hold = hold_seat(self.user, self.flight, "1A", ttl=60)
+        self.lapse(hold)
+
+        with self.assertRaises(HoldExpired):
+            confirm_hold(hold)
+        self.assertEqual(expire_holds(), 1)
+        with self.assertRaises(HoldExpired):
+            confirm_hold(hold)
+
+    def test_sweeper_releases_only_due_holds(self):
+        due = [hold_seat(self.user, self.flight, seat, ttl=60) for seat in ("1A", "1B")]
+        live = hold_seat(self.user, self.flight, "2A", ttl=60)
+        book_seat(self.user, self.flight, "2B")
+        self.lapse(*due)
+
+        self.assertEqual(expire_holds(), 2)
+
+        self.flight.refresh_from_db()
+        self.assertEqual(self.flight.available_seats, 2)
+        self.assertEqual(SeatMap.for_flight(self.flight).available(), ["1A", "1B"])
+        live.refresh_from_db()
+        self.assertEqual(live.status, "pending")
+        self.assertEqual(expire_holds(), 0)
+
+    def test_lapsed_holds_are_released_on_demand(self):
+        holds = [hold_seat(self.user, self.flight, seat, ttl=60) for seat in ("1A", "1B", "2A", "2B")]
+        self.lapse(holds[0])
+
+        # the flight looks sold out, but the lapsed hold is reclaimed inline
+        booking = book_seat(make_user("other"), self.flight, "1A")
+
+        self.assertEqual(booking.status, "confirmed")
+        holds[0].refresh_from_db()
+        self.assertEqual(holds[0].status, "cancelled")
+
+    @unittest.skipUnless(connection.vendor == "sqlite", "query plan format is backend specific")
+    def test_sweep_reads_the_partial_index(self):
+        with CaptureQueriesContext(connection) as queries:
+            expire_holds()
+        sweep = queries.captured_queries[0]["sql"]
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sweep}")
+            plan = " ".join(str(row[-1]) for row in cursor.fetchall())
+
+        self.assertIn("booking_hold_expiry_idx", plan)
+
+    def test_hold_and_confirm_endpoints(self):
+        self.client.force_authenticate(self.user)
+
+        response = self.client.post(reverse("hold-seat"), {"flight_number": "KQ100", "seat_number": "2b"})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["status"], "pending")
+        self.assertIsNotNone(response.json()["hold_expires_at"])
+
+        url = reverse("confirm-hold", args=[response.json()["id"]])
+        self.client.force_authenticate(make_user("other"))
+        self.assertEqual(self.client.post(url).status_code, 404)
+        self.client.force_authenticate(self.user)
+        with override_settings(JOBS_EAGER=False):
+            response = self.client.post(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["status"], "confirmed")
+        self.assertEqual(Job.objects.filter(name="bookings.send_confirmation").count(), 1)
+        self.assertEqual(self.client.post(url).status_code, 400)
+
+
+class CountingBackend(EmailBackend):
+    """
+    locmem backend that records how it was used and can fail on a given batch.
+    """
+    def __init__(self, fail_on_batch=None, **kwargs):
+        super().__init__(**kwargs)
+        self.opened = self.batches = 0
+        self.fail_on_batch = fail_on_batch
+
+    def open(self):
+        self.opened += 1
+
+    def send_messages(self, messages):
+        self.batches += 1
+        if self.batches == self.fail_on_batch:
+            raise ConnectionError("smtp went away")
+        return super().send_messages(messages)
+
+
+@override_settings(JOBS_EAGER=False, FLIGHT_NOTIFY_BATCH_SIZE=3)
+class FlightChangeNotificationTests(TestCase):
+    def setUp(self):
+        self.flight = make_flight(seat_rows=4, seat_letters="AB")
+        for i, seat in enumerate(["1A", "1B", "2A", "2B", "3A", "3B", "4A"]):
+            book_seat(make_user(f"passenger{i}"), self.flight, seat)
+        FlightBooking.objects.filter(seat_number="4A").update(status="cancelled")
+        FlightBooking.objects.filter(seat_number="3B").update(status="checked_in")
+
+    def delay(self, hours=2):
+        return update_flight(self.flight, departure_time=self.flight.departure_time + timedelta(hours=hours))
+
+    def test_change_is_rendered_once_and_queued(self):
+        notification = self.delay()
+
+        self.assertIn("New departure time", notification.body)
+        self.assertEqual(notification.subject, "Update to flight KQ100")
+        self.assertEqual(Job.objects.get(name="bookings.notify_passengers").payload, {"notification_id": notification.pk})
+        # nothing worth telling passengers about
+        self.assertIsNone(update_flight(self.flight, price=99))
+        self.assertIsNone(update_flight(self.flight, status="active"))
+        cancelled = update_flight(self.flight, status="cancelled")
+        self.assertEqual(cancelled.subject, "Flight KQ100 has been cancelled")
+
+    def test_fan_out_sends_batches_over_one_connection(self):
+        notification = self.delay()
+        backend = CountingBackend()
+
+        with self.assertNumQueries(4):
+            # one streamed read, a cursor update per batch, finish
+            self.assertEqual(send_flight_change(notification, connection=backend), 6)
+
+        self.assertEqual((backend.opened, backend.batches), (1, 2))
+        self.assertEqual(len(mail.outbox), 6)
+        self.assertEqual(mail.outbox[0].subject, "Update to flight KQ100")
+        self.assertIn("Hello passenger", mail.outbox[0].body)
+        self.assertNotIn("passenger6@example.com", [m.to[0] for m in mail.outbox])
+        notification.refresh_from_db()
+        self.assertEqual(notification.sent, 6)
+        self.assertIsNotNone(notification.finished_at)
+
+    def test_fan_out_resumes_after_a_crash(self):
+        notification = self.delay()
+
+        with self.assertRaises(ConnectionError):
+            send_flight_change(notification, connection=CountingBackend(fail_on_batch=2))
+        notification.refresh_from_db()
+        self.assertEqual(notification.sent, 3)
+        self.assertIsNone(notification.finished_at)
+
+        self.assertEqual(send_flight_change(notification), 3)
+        recipients = [m.to[0] for m in mail.outbox]
+        self.assertEqual(len(recipients), 6)
+        self.assertEqual(len(set(recipients)), 6)
+
+    def test_job_sends_the_notification(self):
+        self.delay()
+
+        self.assertEqual(run_pending(), (1, 0))
+        self.assertEqual(len(mail.outbox), 6)
+        self.assertEqual(FlightChangeNotification.objects.get().sent, 6)
+
+
+class ConcurrentBookingTests(TransactionTestCase):
+    def test_concurrent_bookings_never_oversell(self):
+        out = StringIO()
+        call_command(
+            "stress_book_flight", threads=8, attempts=200, rows=8, letters="ABCDE", seed=1, stdout=out
+        )
+
+        self.assertIn("oversold=0 duplicate_seats=0 counter_drift=0 map_drift=0", out.getvalue())
+        # the harness cleans up after itself
+        self.assertFalse(Flight.objects.exists())
+
+    def test_concurrent_holds_confirms_and_expiry_stay_consistent(self):
+        out = StringIO()
+        call_command(
+            "stress_book_flight", threads=8, attempts=300, rows=8, letters="ABCDE",
+            hold_ratio=0.7, hold_ttl=0.02, seed=2, stdout=out,
+        )
+
+        self.assertIn("oversold=0 duplicate_seats=0 counter_drift=0 map_drift=0", out.getvalue())
@@ -1,15 +1,21 @@
 from django.urls import path
-from .views import FlightListView, book_flight, verify_qr_code, check_in_flight, fetch_flights, get_available_seats, get_booking_details
+from .views import FlightListView, book_flight, verify_qr_code, check_in_flight, fetch_flights, get_available_seats, get_booking_details, cancel_flight_booking, booking_qr_code, verify_boarding_token, batch_check_in, hold_flight_seat, confirm_seat_hold
 from django.conf import settings
 from django.conf.urls.static import static
 
 urlpatterns = [
     path('flights/', FlightListView.as_view(), name='flight-list'),
     path('book-flight/', book_flight, name='book-flight'),
+    path('hold-seat/', hold_flight_seat, name='hold-seat'),
     path('verify/<uuid:booking_id>/', verify_qr_code, name='verify-qr'),
+    path('verify-token/', verify_boarding_token, name='verify-boarding-token'),
+    path('check-in/batch/', batch_check_in, name='batch-check-in'),
     path('check-in/<uuid:booking_id>/', check_in_flight, name='check-in'),
     path('fetch-flights/', fetch_flights, name='fetch-flights'),
     path('flights/<str:flight_number>/available-seats/', get_available_seats, name='available-seats'),
     path('bookings/<uuid:booking_id>/', get_booking_details, name='booking-details'),
+    path('bookings/<uuid:booking_id>/qr.png', booking_qr_code, name='booking-qr'),
+    path('bookings/<uuid:booking_id>/confirm/', confirm_seat_hold, name='confirm-hold'),
+    path('bookings/<uuid:booking_id>/cancel/', cancel_flight_booking, name='cancel-booking'),
 
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
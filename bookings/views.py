@@ -1,17 +1,35 @@
 import requests
-import qrcode
+from collections import Counter
+from datetime import datetime, timedelta
 import logging
-from io import BytesIO
-from django.core.files.base import ContentFile
-from django.core.mail import send_mail
 from django.conf import settings
+from django.db import transaction
+from django.http import HttpResponse
 from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.dateparse import parse_date
+from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import generics, status
-from rest_framework.decorators import api_view, permission_classes, renderer_classes
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.decorators import api_view, authentication_classes, permission_classes, renderer_classes
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+from idempotency.keys import idempotent
+from jobs.models import Job
+from jobs.queue import enqueue
+from services import revalidate
+from services.views import provider_unavailable
+from .boarding import InvalidBoardingToken, verify_token
+from .checkin import check_in_scans
+from .filters import FlightFilter
 from .models import Flight, FlightBooking
+from .pagination import FlightCursorPagination
+from .qr import etag, qr_content, render_png
+from .seats import BookingError, SeatMap, book_seat, cancel_booking, confirm_hold, hold_seat
 from .serializers import FlightSerializer, FlightBookingSerializer
+from .sync import is_fresh, route_key, sync_flights
 import os
 from dotenv import load_dotenv
 
@@ -23,12 +41,16 @@ logger = logging.getLogger(__name__)
 
 # Aviationstack API key
 AVIATIONSTACK_API_KEY = os.getenv("AVIATIONSTACK_API_KEY")
-API_URL = "http://api.aviationstack.com/v1/flights"
+
+MAX_CHECK_IN_BATCH = 1000
 
 # ✈️ List All Flights
 class FlightListView(generics.ListAPIView):
     queryset = Flight.objects.all()
     serializer_class = FlightSerializer
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = FlightFilter
+    pagination_class = FlightCursorPagination
 
 # ✈️ Fetch Flights from Aviationstack API and Save to Database
 @api_view(['GET'])
@@ -36,114 +58,122 @@ def fetch_flights(request):
     if not AVIATIONSTACK_API_KEY:
         return Response({"error": "Missing API key"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-    # TODO: Add error handing if query params are missing
-    response = requests.get(API_URL, params={
-        # 'flight_status': 'scheduled',
-        'access_key': AVIATIONSTACK_API_KEY,
-        # Whoops, you can't filter by date on the free plan
-        # TODO: Fetch as many results as possibe using the limit param and then manually filter by date?
-        # 'flight_date': request.query_params.get('flight_date'), # YYYY-MM-DD
-        'dep_iata': request.query_params.get('dep_iata'),
-        'arr_iata': request.query_params.get('arr_iata'),
-    })
-
-    if response.status_code != 200:
-        logger.error(f"Failed to fetch flights: {response.text}")
-        return Response({"error": "Failed to fetch flights"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-    data = response.json().get("data", [])
-
-    print(data)
-
-    if not data:
-        return Response({"error": "No flight data received"}, status=status.HTTP_404_NOT_FOUND)
-
-    for flight_data in data:
-        flight_number = flight_data.get("flight", {}).get("iata", "")
-        airline = flight_data.get("airline", {}).get("name", "")
-        origin = flight_data.get("departure", {}).get("airport", "")
-        destination = flight_data.get("arrival", {}).get("airport", "")
-        departure_time = flight_data.get("departure", {}).get("estimated", "")
-        arrival_time = flight_data.get("arrival", {}).get("estimated", "")
-        available_seats = 100  # Default value since Aviationstack doesn't provide this
-        price = 200.00  # Default price
-
-        if not arrival_time:
-            arrival_time = "1970-01-01T00:00:00Z"  # Default value to prevent NULL error
-
-        if flight_number and origin and destination:
-            Flight.objects.get_or_create(
-                flight_number=flight_number,
-                defaults={
-                    "airline": airline,
-                    "origin": origin,
-                    "destination": destination,
-                    "departure_time": departure_time,
-                    "arrival_time": arrival_time,
-                    "available_seats": available_seats,
-                    "price": price,
-                },
+    dep_iata = (request.query_params.get('dep_iata') or '').upper()
+    arr_iata = (request.query_params.get('arr_iata') or '').upper()
+    # Aviationstack can't filter by date on the free plan, so dates are
+    # filtered locally on the indexed departure_time column
+    flight_date = request.query_params.get('flight_date')  # YYYY-MM-DD
+    day = parse_date(flight_date) if flight_date else None
+    if flight_date and day is None:
+        return Response({"error": "flight_date must be YYYY-MM-DD"}, status=status.HTTP_400_BAD_REQUEST)
+
+    # Only go upstream when this route hasn't been synced recently. A route
+    # synced before is answered from the database while it refreshes in the
+    # background; a route never synced waits for one page of Aviationstack,
+    # and the rest of it is synced by a job instead of in this request.
+    upstream_error = None
+    sync_job = {"dep_iata": dep_iata, "arr_iata": arr_iata}
+    if not is_fresh(dep_iata, arr_iata):
+        if is_fresh(dep_iata, arr_iata, max_age=settings.FLIGHT_SYNC_TTL + settings.PROVIDER_SERVE_STALE):
+            revalidate.refresh(
+                ('aviationstack', route_key(dep_iata, arr_iata)), lambda: sync_flights(dep_iata, arr_iata)
             )
+        else:
+            try:
+                result = sync_flights(dep_iata, arr_iata, max_pages=1)
+            except requests.RequestException as e:
+                logger.warning("Failed to fetch flights, serving stored flights: %s", e)
+                upstream_error = e
+            else:
+                if not result["complete"] and not _sync_pending(sync_job):
+                    enqueue('bookings.sync_flights', **sync_job)
 
     flights = Flight.objects.all()
-    serializer = FlightSerializer(flights, many=True)
-    return Response(serializer.data)
+    if dep_iata:
+        flights = flights.filter(origin_iata=dep_iata)
+    if arr_iata:
+        flights = flights.filter(destination_iata=arr_iata)
+    if day:
+        start = timezone.make_aware(datetime.combine(day, datetime.min.time()))
+        flights = flights.filter(departure_time__gte=start, departure_time__lt=start + timedelta(days=1))
+
+    # Paged like FlightListView, so an unfiltered request never serializes the whole table
+    paginator = FlightCursorPagination()
+    page = paginator.paginate_queryset(flights, request)
+    if not page:
+        if upstream_error is not None:
+            return provider_unavailable(upstream_error)
+        if _sync_pending(sync_job):
+            return Response({"message": "Flights for this route are still being synced, please retry shortly"},
+                            status=status.HTTP_202_ACCEPTED)
+        return Response({"error": "No flight data received"}, status=status.HTTP_404_NOT_FOUND)
+    return paginator.get_paginated_response(FlightSerializer(page, many=True).data)
+
+def _sync_pending(payload):
+    # Whether the rest of a route's first sync is still queued or running
+    return Job.objects.filter(
+        name='bookings.sync_flights', payload=payload, status__in=[Job.QUEUED, Job.RUNNING]
+    ).exists()
 
 # 🎟️ Book a Flight
 @api_view(['POST'])
+@idempotent
 def book_flight(request):
     flight_number = request.data.get("flight_number")
     seat_number = request.data.get("seat_number")
 
     flight = get_object_or_404(Flight, flight_number=flight_number)
 
-    # TODO: Confirm that the flight has the given seat
-
-    if flight.available_seats <= 0:
-        return Response({"error": "No seats available"}, status=status.HTTP_400_BAD_REQUEST)
+    # Validate the seat against the flight layout, take it and reduce available
+    # seats in one transaction. The confirmation e-mail is queued in the same
+    # transaction and sent by the job worker after commit.
+    try:
+        with transaction.atomic():
+            booking = book_seat(request.user, flight, seat_number)
+            enqueue('bookings.send_confirmation', booking_id=str(booking.id))
+    except BookingError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-    # Prevent duplicate seat bookings
-    if FlightBooking.objects.filter(flight=flight, seat_number=seat_number).exists():
-        return Response({"error": "Seat already booked"}, status=status.HTTP_400_BAD_REQUEST)
+    serializer = FlightBookingSerializer(booking)
+    return Response(serializer.data, status=status.HTTP_201_CREATED)
 
-    # Create booking
-    booking = FlightBooking.objects.create(
-        user=request.user,
-        flight=flight,
-        seat_number=seat_number,
-        status="confirmed"
-    )
+# ⏳ Hold a Seat during checkout
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@idempotent
+def hold_flight_seat(request):
+    flight = get_object_or_404(Flight, flight_number=request.data.get("flight_number"))
 
-    # Reduce available seats
-    flight.available_seats -= 1
-    flight.save()
-
-    # Generate QR Code
-    qr_content = f"Booking ID: {booking.id} - Flight: {flight.flight_number}"
-    qr = qrcode.make(qr_content)
-    qr_io = BytesIO()
-    qr.save(qr_io, format="PNG")
-    booking.qr_code.save(f"{booking.id}.png", ContentFile(qr_io.getvalue()), save=True)
-
-    print(request.user)
-
-    # Send Email Confirmation
-    send_mail(
-        "Your Flight Booking Confirmation",
-        f"Hello {request.user.username},\nYour flight booking is confirmed.\nBooking ID: {booking.id}\nFlight: {flight.flight_number}\nSeat: {seat_number}",
-        settings.DEFAULT_FROM_EMAIL,
-        [request.user.email],
-        fail_silently=False,
-    )
+    try:
+        booking = hold_seat(request.user, flight, request.data.get("seat_number"))
+    except BookingError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
     serializer = FlightBookingSerializer(booking)
     return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+# ✅ Confirm a Seat Hold
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@idempotent
+def confirm_seat_hold(request, booking_id):
+    booking = get_object_or_404(FlightBooking, id=booking_id, user=request.user)
+
+    try:
+        with transaction.atomic():
+            confirm_hold(booking)
+            enqueue('bookings.send_confirmation', booking_id=str(booking.id))
+    except BookingError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    serializer = FlightBookingSerializer(booking)
+    return Response(serializer.data, status=status.HTTP_200_OK)
+
 # ✅ Verify QR Code at the AirportFav
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def verify_qr_code(request, booking_id):
-    booking = get_object_or_404(FlightBooking, id=booking_id)
+    booking = get_object_or_404(FlightBooking.objects.select_related('flight', 'user'), id=booking_id)
 
     if booking.status == 'checked_in':
         return Response({"message": "Passenger already checked in."}, status=status.HTTP_400_BAD_REQUEST)
@@ -157,20 +187,60 @@ def verify_qr_code(request, booking_id):
         "status": booking.status
     }, status=status.HTTP_200_OK)
 
-# 🎟️ Check-in Flight
-@api_view(['GET'])
-def check_in_flight(request, booking_id):
-    booking = get_object_or_404(FlightBooking, id=booking_id)
+# ✅ Verify a signed boarding token at the gate, without a database lookup
+@api_view(['GET', 'POST'])
+@authentication_classes([JWTStatelessUserAuthentication])
+@permission_classes([IsAuthenticated])
+def verify_boarding_token(request):
+    token = request.data.get("token") or request.query_params.get("token")
+    if not token:
+        return Response({"error": "token is required"}, status=status.HTTP_400_BAD_REQUEST)
 
-    if booking.status == 'checked_in':
-        return Response({"message": "Passenger already checked in."}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        boarding_pass = verify_token(token)
+    except InvalidBoardingToken as e:
+        return Response({"valid": False, "error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response({"valid": True, **boarding_pass}, status=status.HTTP_200_OK)
 
-    booking.status = 'checked_in'
-    booking.save()
+# 🎟️ Check-in Flight; POST only, so link prefetchers and crawlers cannot check anyone in,
+# and staff only, so passengers cannot check in other people's bookings
+@api_view(['POST'])
+@permission_classes([IsAdminUser])
+def check_in_flight(request, booking_id):
+    # A single conditional UPDATE; the booking is only read again to explain a refusal.
+    # Only confirmed bookings qualify, so a pending hold cannot escape expire_holds.
+    checked_in = FlightBooking.objects.filter(id=booking_id, status='confirmed').update(status='checked_in')
+
+    if not checked_in:
+        booking = get_object_or_404(FlightBooking.objects.only('status'), id=booking_id)
+        if booking.status == 'cancelled':
+            return Response({"message": "Booking is cancelled."}, status=status.HTTP_400_BAD_REQUEST)
+        if booking.status == 'pending':
+            return Response({"message": "Booking is not confirmed."}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"message": "Passenger already checked in."}, status=status.HTTP_400_BAD_REQUEST)
 
     return Response({
         "message": "Check-in successful!",
-        "booking_status": booking.status
+        "booking_status": "checked_in"
+    }, status=status.HTTP_200_OK)
+
+# 🎟️ Batch check-in for gate scanners replaying buffered scans (staff only)
+@api_view(['POST'])
+@permission_classes([IsAdminUser])
+def batch_check_in(request):
+    scans = request.data.get("scans")
+    if not isinstance(scans, list) or not scans:
+        return Response({"error": "scans must be a non-empty list of booking ids or boarding tokens"},
+                        status=status.HTTP_400_BAD_REQUEST)
+    if len(scans) > MAX_CHECK_IN_BATCH:
+        return Response({"error": f"At most {MAX_CHECK_IN_BATCH} scans per request"},
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    results = check_in_scans([str(scan) for scan in scans])
+    return Response({
+        "results": results,
+        "summary": Counter(item["result"] for item in results),
     }, status=status.HTTP_200_OK)
 
 from rest_framework.renderers import JSONRenderer
@@ -178,15 +248,34 @@ from rest_framework.renderers import JSONRenderer
 @api_view(['GET'])
 @renderer_classes([JSONRenderer])  # ✅ Ensure JSON response
 def get_available_seats(request, flight_number):
-    flight = get_object_or_404(Flight, flight_number=flight_number)
-    booked_seats = list(FlightBooking.objects.filter(flight=flight).values_list('seat_number', flat=True))
+    # One primary-key read of the layout and seat bitmap; no booking rows needed
+    flight = get_object_or_404(
+        Flight.objects.only('seat_rows', 'seat_letters', 'seat_map'), flight_number=flight_number
+    )
+    seats = SeatMap.for_flight(flight)
 
-    print("booked seats", booked_seats)
+    return Response({
+        "seat_rows": flight.seat_rows,
+        "seat_letters": flight.seat_letters,
+        "available_seats": seats.available(),
+    }, status=status.HTTP_200_OK)
 
-    # TODO: Remove booked seats
-    available_seats = [seat for seat in range(1, flight.available_seats + 1) if seat not in booked_seats]
+# ❌ Cancel a Booking
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def cancel_flight_booking(request, booking_id):
+    booking = get_object_or_404(FlightBooking, id=booking_id, user=request.user)
+
+    try:
+        cancel_booking(booking)
+    except BookingError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response({
+        "message": "Booking cancelled.",
+        "booking_status": booking.status
+    }, status=status.HTTP_200_OK)
 
-    return Response({"available_seats": available_seats}, status=status.HTTP_200_OK)
 @api_view(['GET'])
 def get_booking_details(request, booking_id):
     booking = get_object_or_404(FlightBooking, id=booking_id)
@@ -195,5 +284,24 @@ def get_booking_details(request, booking_id):
         "flight": booking.flight.flight_number,
         "seat": booking.seat_number,
         "status": booking.status,
-        "qr_code_url": booking.qr_code.url if booking.qr_code else None
+        "qr_code_url": request.build_absolute_uri(reverse('booking-qr', args=[booking.id]))
     }, status=status.HTTP_200_OK)
+
+# 🔳 Boarding QR code, rendered on demand. It carries a signed boarding token,
+# so only the passenger (or staff) may fetch it.
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def booking_qr_code(request, booking_id):
+    bookings = FlightBooking.objects.select_related('flight').only('id', 'seat_number', 'flight__departure_time')
+    if not request.user.is_staff:
+        bookings = bookings.filter(user=request.user)
+    booking = get_object_or_404(bookings, id=booking_id)
+    content = qr_content(booking)
+    tag = etag(content)
+
+    response = get_conditional_response(request, etag=tag)
+    if response is None:
+        response = HttpResponse(render_png(content), content_type='image/png')
+    response['ETag'] = tag
+    patch_cache_control(response, private=True, max_age=settings.QR_CACHE_TTL)
+    return response
@@ -0,0 +1,66 @@
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives
+from django.template.loader import render_to_string
+
+from bookings.qr import render_png
+from jobs.queue import task
+
+from .models import FlightBooking
+
+
+@task('flights.send_booking_confirmation')
+def send_booking_confirmation(booking_id):
+    """
+    E-mail the booking confirmation with its QR code attached. The QR is
+    rendered in memory; nothing is written to media storage.
+    """
+    booking = FlightBooking.objects.select_related('flight').get(pk=booking_id)
+
+    qr_data = (
+        f"BOOKING:{booking.booking_reference}|"
+        f"FLIGHT:{booking.flight.flight_number}|"
+        f"NAME:{booking.name}|"
+        f"TICKETS:{booking.num_tickets}"
+    )
+
+    subject = f"Flight Booking Confirmation - {booking.flight.flight_number}"
+
+    context = {
+        "booking": booking,
+        "flight_number": booking.flight.flight_number,
+        "airline": booking.flight.airline,
+        "departure_airport": booking.flight.departure_airport,
+        "arrival_airport": booking.flight.arrival_airport,
+        "departure_time": booking.flight.departure_time,
+        "arrival_time": booking.flight.arrival_time,
+        "booking_reference": booking.booking_reference,
+        "num_tickets": booking.num_tickets,
+    }
+
+    html_message = render_to_string("email/booking_confirmation.html", context)
+
+    plain_message = f"""
+    Hello {booking.name},
+
+    Your flight booking is confirmed!
+    Booking Reference: {booking.booking_reference}
+    Flight: {booking.flight.flight_number} - {booking.flight.airline}
+    Departure: {booking.flight.departure_airport} at {booking.flight.departure_time}
+    Arrival: {booking.flight.arrival_airport} at {booking.flight.arrival_time}
+    Number of Tickets: {booking.num_tickets}
+
+    Please keep your booking reference for check-in.
+    """
+
+    email = EmailMultiAlternatives(
+        subject,
+        plain_message,
+        settings.DEFAULT_FROM_EMAIL if hasattr(settings, 'DEFAULT_FROM_EMAIL') else settings.EMAIL_HOST_USER,
+        [booking.email]
+    )
+    email.attach_alternative(html_message, "text/html")
+
+    # Attach QR code to the email
+    email.attach('booking_qrcode.png', render_png(qr_data), 'image/png')
+
+    email.send()
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from hotels.models import Hotel
+from hotels.views import HOTEL_UPDATE_FIELDS
+from services import geocoding, images
+from services.osm_ingest import upsert_rows
+
+class Command(BaseCommand):
+    help = 'Import hotels from OpenStreetMap and get images from Pexels'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('city', type=str, help='City to search for hotels')
+    
+    def handle(self, *args, **options):
+        city = options['city']
+        
+        # Search OSM for hotels
+        osm_results = geocoding.search(f'hotels in {city}', limit=10)
+        
+        # Search Pexels for hotel images
+        image_urls = images.image_urls([f'hotel {location["display_name"]}' for location in osm_results])
+        
+        rows = []
+        for location in osm_results:
+            rows.append({
+                'osm_id': str(location['osm_id']),
+                'name': location.get('display_name', 'Unknown Hotel'),
+                'address': location.get('display_name', ''),
+                'latitude': location.get('lat'),
+                'longitude': location.get('lon'),
+                'price_per_night': 0,  # You'd want to implement proper pricing logic
+                'image_url': image_urls[f'hotel {location["display_name"]}'],
+            })
+        
+        upsert_rows(Hotel, rows, update_fields=HOTEL_UPDATE_FIELDS)
+        for row in rows:
+            self.stdout.write(self.style.SUCCESS(f'Imported hotel: {row["name"]}'))
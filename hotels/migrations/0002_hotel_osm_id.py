@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 17:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotels', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hotel',
+            name='osm_id',
+            field=models.CharField(blank=True, max_length=100, null=True, unique=True),
+        ),
+    ]
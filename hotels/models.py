@@ -1,12 +1,14 @@
 from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
+from services.models import GeoIndexedModel
 
-class Hotel(models.Model):
+class Hotel(GeoIndexedModel):
     name = models.CharField(max_length=255)
     description = models.TextField(blank=True, null=True)
     address = models.CharField(max_length=500)
     
     # OpenStreetMap related fields
+    osm_id = models.CharField(max_length=100, unique=True, null=True, blank=True)
     latitude = models.DecimalField(max_digits=10, decimal_places=7, null=True, blank=True)
     longitude = models.DecimalField(max_digits=10, decimal_places=7, null=True, blank=True)
     
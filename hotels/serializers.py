@@ -4,7 +4,7 @@ from .models import Hotel
 class HotelSerializer(serializers.ModelSerializer):
     class Meta:
         model = Hotel
-        fields = '__all__'
+        exclude = ['geo_cell']
         extra_kwargs = {
             'latitude': {'required': False},
             'longitude': {'required': False},
@@ -1,3 +1,82 @@
-from django.test import TestCase
+import threading
+import time
+from unittest import mock
 
-# Create your tests here.
+import requests
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from services import images
+from services.http import ProviderUnavailable
+
+LOCATIONS = [
+    {'osm_id': 1, 'display_name': 'Sarova Stanley', 'lat': '-1.2840', 'lon': '36.8230'},
+    {'osm_id': 2, 'display_name': 'Sarova Stanley', 'lat': '-1.2841', 'lon': '36.8231'},
+    {'osm_id': 3, 'display_name': 'Slow Lodge', 'lat': '-1.3000', 'lon': '36.8000'},
+    {'osm_id': 4, 'display_name': 'Hilton Nairobi', 'lat': '-1.2860', 'lon': '36.8210'},
+]
+
+
+@override_settings(PEXELS_API_KEY='test-key', PEXELS_BATCH_DEADLINE=0.5)
+class SearchLocationsTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch('hotels.views.geocoding.search', return_value=LOCATIONS)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        images.clear_memory_cache()
+        self.calls = []
+        self.release_slow = threading.Event()
+        self.addCleanup(self.release_slow.set)
+
+    def fake_photo_src(self, query, timeout=None):
+        self.calls.append(query)
+        if query == 'slow lodge':
+            self.release_slow.wait(5)
+        else:
+            time.sleep(0.1)
+        return {'original': f'https://images.example/{query}.jpg'}
+
+    def test_enrichment_is_concurrent_deduplicated_and_bounded(self):
+        with mock.patch('services.pexels_service.PexelsService.photo_src', side_effect=self.fake_photo_src):
+            started = time.perf_counter()
+            response = self.client.get(reverse('hotel-search-locations'), {'query': 'nairobi'})
+            elapsed = time.perf_counter() - started
+
+        self.assertEqual(response.status_code, 200)
+        images = [item['image_url'] for item in response.json()]
+        self.assertEqual(images, [
+            'https://images.example/sarova stanley.jpg',
+            'https://images.example/sarova stanley.jpg',
+            None,
+            'https://images.example/hilton nairobi.jpg',
+        ])
+        self.assertEqual(sorted(self.calls), ['hilton nairobi', 'sarova stanley', 'slow lodge'])
+        # one deadline, not the sum of the individual lookups
+        self.assertLess(elapsed, 1.5)
+
+    def test_provider_outage_is_503(self):
+        with mock.patch('hotels.views.geocoding.search',
+                        side_effect=ProviderUnavailable('nominatim is unavailable', retry_after=12.5)):
+            response = self.client.get(reverse('hotel-search-locations'), {'query': 'nairobi'})
+
+        self.assertEqual(response.status_code, 503)
+        # rounded up, so retrying then does not hit the open breaker again
+        self.assertEqual(response['Retry-After'], '13')
+
+    def test_rejected_provider_request_is_not_an_outage(self):
+        unauthorized = requests.Response()
+        unauthorized.status_code = 401
+        with mock.patch('hotels.views.geocoding.search',
+                        side_effect=requests.HTTPError('401 Unauthorized', response=unauthorized)):
+            with self.assertLogs('services.views', 'ERROR'):
+                response = self.client.get(reverse('hotel-search-locations'), {'query': 'nairobi'})
+
+        self.assertEqual(response.status_code, 502)
+        self.assertNotIn('Retry-After', response)
+
+    @override_settings(PEXELS_API_KEY='')
+    def test_missing_api_key(self):
+        response = self.client.get(reverse('hotel-search-locations'), {'query': 'nairobi'})
+        self.assertEqual(response.status_code, 500)
@@ -1,13 +1,19 @@
-import os
 import requests
 from rest_framework import viewsets, filters, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 
+from services import geocoding, images
+from services.geo import ProximityFilter
+from services.osm_ingest import upsert_rows
+from services.pexels_service import PexelsService
+from services.views import provider_unavailable
 from .models import Hotel
 from .serializers import HotelSerializer
 
+HOTEL_UPDATE_FIELDS = ['name', 'address', 'latitude', 'longitude', 'image_url']
+
 class HotelViewSet(viewsets.ModelViewSet):
     queryset = Hotel.objects.all()
     serializer_class = HotelSerializer
@@ -16,6 +22,7 @@ class HotelViewSet(viewsets.ModelViewSet):
     filter_backends = [
         DjangoFilterBackend, 
         filters.SearchFilter, 
+        ProximityFilter,
         filters.OrderingFilter
     ]
     
@@ -41,6 +48,8 @@ class HotelViewSet(viewsets.ModelViewSet):
             
             return Response(enriched_results)
         
+        except requests.RequestException as e:
+            return provider_unavailable(e)
         except Exception as e:
             return Response(
                 {'error': str(e)}, 
@@ -49,77 +58,35 @@ class HotelViewSet(viewsets.ModelViewSet):
 
     def _search_osm_locations(self, query):
         """
-        Internal method to search locations via OpenStreetMap with a User-Agent
+        Internal method to search locations via OpenStreetMap (Nominatim),
+        served from the geocode cache when the query was seen before
         """
-        osm_url = "https://nominatim.openstreetmap.org/search"
-        params = {
-            'q': f'hotels in {query}',
-            'format': 'json',
-            'limit': 10
-        }
-        headers = {
-            'User-Agent': 'Suegathu/1.0 (suegathul0@icloud.com)'  
-        }
-        
-        response = requests.get(osm_url, params=params, headers=headers)
-        response.raise_for_status()
-        
-        return response.json()
+        return geocoding.search(f'hotels in {query}', limit=10)
 
     def _add_pexels_images(self, locations):
         """
-        Enrich location results with Pexels images
+        Enrich location results with Pexels images via the shared image cache.
+        Uncached lookups run concurrently under an overall deadline; anything
+        that fails or misses the deadline comes back with image_url None
+        instead of holding up the response.
         """
-        pexels_api_key = os.environ.get('PEXELS_API_KEY')
-        if not pexels_api_key:
+        if not PexelsService.is_configured():
             raise ValueError("Pexels API key is not configured")
 
-        pexels_url = "https://api.pexels.com/v1/search"
-        headers = {
-            'Authorization': pexels_api_key
-        }
-
-        enriched_locations = []
-        for location in locations:
-            try:
-                pexels_params = {
-                    'query': location.get('display_name', 'hotel'),
-                    'per_page': 1
-                }
-                
-                pexels_response = requests.get(
-                    pexels_url, 
-                    headers=headers, 
-                    params=pexels_params
-                )
-                pexels_response.raise_for_status()
-                pexels_data = pexels_response.json()
-
-                location_data = {
-                    'name': location.get('display_name', 'Unknown Hotel'),
-                    'address': location.get('display_name', ''),
-                    'latitude': location.get('lat'),
-                    'longitude': location.get('lon'),
-                    'image_url': (
-                        pexels_data.get('photos', [{}])[0]
-                        .get('src', {})
-                        .get('original')
-                    )
-                }
-                
-                enriched_locations.append(location_data)
-            
-            except requests.RequestException:
-                location_data = {
-                    'name': location.get('display_name', 'Unknown Hotel'),
-                    'address': location.get('display_name', ''),
-                    'latitude': location.get('lat'),
-                    'longitude': location.get('lon'),
-                    'image_url': None
-                }
-                enriched_locations.append(location_data)
-
-        return enriched_locations
+        queries = [location.get('display_name', 'hotel') for location in locations]
+        image_urls = images.image_urls(queries)
+
+        return [
+            {
+                'osm_id': location.get('osm_id'),
+                'name': location.get('display_name', 'Unknown Hotel'),
+                'address': location.get('display_name', ''),
+                'latitude': location.get('lat'),
+                'longitude': location.get('lon'),
+                'image_url': image_urls[query]
+            }
+            for location, query in zip(locations, queries)
+        ]
 
     @action(detail=False, methods=['POST'])
     def import_locations(self, request):
@@ -134,22 +101,29 @@ class HotelViewSet(viewsets.ModelViewSet):
             locations = self._search_osm_locations(query)
             enriched_locations = self._add_pexels_images(locations)
 
-            hotels_to_create = [
-                Hotel(
-                    name=location['name'],
-                    address=location['address'],
-                    latitude=location['latitude'],
-                    longitude=location['longitude'],
-                    image_url=location['image_url'],
-                    price_per_night=0,  
-                )
+            rows = [
+                {
+                    'osm_id': str(location['osm_id']),
+                    'name': location['name'],
+                    'address': location['address'],
+                    'latitude': location['latitude'],
+                    'longitude': location['longitude'],
+                    'image_url': location['image_url'],
+                    'price_per_night': 0,
+                }
                 for location in enriched_locations
+                if location.get('osm_id')
             ]
 
-            created_hotels = Hotel.objects.bulk_create(hotels_to_create)
+            # Upsert on osm_id so re-importing a city does not duplicate hotels;
+            # locally maintained fields (price, rating, amenities) are kept.
+            upsert_rows(Hotel, rows, update_fields=HOTEL_UPDATE_FIELDS)
+            created_hotels = Hotel.objects.filter(osm_id__in=[row['osm_id'] for row in rows])
 
             serializer = self.get_serializer(created_hotels, many=True)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+        except requests.RequestException as e:
+            return provider_unavailable(e)
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
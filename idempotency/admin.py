@@ -0,0 +1,11 @@
+from django.contrib import admin
+
+from .models import IdempotencyRecord
+
+
+@admin.register(IdempotencyRecord)
+class IdempotencyRecordAdmin(admin.ModelAdmin):
+    list_display = ('key', 'scope', 'status', 'response_status', 'created_at', 'expires_at')
+    list_filter = ('status',)
+    search_fields = ('key', 'scope')
+    readonly_fields = ('created_at',)
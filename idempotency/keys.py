@@ -0,0 +1,156 @@
+"""
+Idempotency-Key support for POST endpoints.
+
+Wrap a DRF view with `idempotent` (inside `api_view`, or through
+`method_decorator` on a class-based handler). A request that carries an
+Idempotency-Key header claims the key before the view runs and the response
+is stored against it, so retries with the same key get the stored response
+back, marked with an Idempotent-Replayed header, without running the view
+again. A retry that arrives while the first request is still running waits
+for it (up to IDEMPOTENCY_WAIT seconds) rather than running alongside it.
+
+Exceptions and 5xx responses release the key so the client can try again.
+A key left in progress by a worker that died is taken over after
+IDEMPOTENCY_LEASE seconds.
+"""
+import hashlib
+import time
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyRecord
+
+HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+POLL_INTERVAL = 0.05  # seconds between checks while a duplicate waits
+
+
+def request_scope(request):
+    user = request.user
+    return f"user:{user.pk}" if user.is_authenticated else "anon"
+
+
+def request_fingerprint(request):
+    digest = hashlib.sha256()
+    for part in (request.method.encode(), request.get_full_path().encode(), request.body):
+        digest.update(part)
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def claim(scope, key, fingerprint):
+    """
+    (record, owned) for a key. `owned` is True when this caller inserted the
+    record, or took over an expired or abandoned one, and must run the view.
+    """
+    while True:
+        now = timezone.now()
+        record = IdempotencyRecord.objects.filter(scope=scope, key=key).first()
+        if record is None:
+            try:
+                with transaction.atomic():
+                    record = IdempotencyRecord.objects.create(
+                        scope=scope, key=key, fingerprint=fingerprint, locked_at=now,
+                        expires_at=now + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL),
+                    )
+                return record, True
+            except IntegrityError:
+                continue  # a concurrent duplicate got there first
+
+        abandoned = (
+            record.status == IdempotencyRecord.IN_PROGRESS
+            and record.locked_at < now - timedelta(seconds=settings.IDEMPOTENCY_LEASE)
+        )
+        if record.expires_at <= now or abandoned:
+            # Conditional on the lock we read, so only one taker wins
+            taken = IdempotencyRecord.objects.filter(pk=record.pk, locked_at=record.locked_at).update(
+                status=IdempotencyRecord.IN_PROGRESS, fingerprint=fingerprint, locked_at=now,
+                expires_at=now + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL),
+                response_status=None, response_body=None,
+            )
+            if not taken:
+                continue
+            record.fingerprint, record.locked_at = fingerprint, now
+            return record, True
+        return record, False
+
+
+def _release(record):
+    IdempotencyRecord.objects.filter(pk=record.pk, locked_at=record.locked_at).delete()
+
+
+def _complete(record, response):
+    IdempotencyRecord.objects.filter(pk=record.pk, locked_at=record.locked_at).update(
+        status=IdempotencyRecord.COMPLETED,
+        response_status=response.status_code,
+        response_body=response.data,
+    )
+
+
+def _replay(record):
+    return Response(record.response_body, status=record.response_status, headers={REPLAYED_HEADER: "true"})
+
+
+def idempotent(view):
+    """
+    Serve retries of `view` that reuse an Idempotency-Key from the stored
+    first response. Requests without the header are not affected.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return view(request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return Response(
+                {"error": f"{HEADER} must be at most {MAX_KEY_LENGTH} characters"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        fingerprint = request_fingerprint(request)
+        deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT
+        while True:
+            record, owned = claim(request_scope(request), key, fingerprint)
+            if owned:
+                break
+            if record.fingerprint != fingerprint:
+                return Response(
+                    {"error": f"{HEADER} was already used for a different request"},
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                )
+            if record.status == IdempotencyRecord.COMPLETED:
+                return _replay(record)
+            if time.monotonic() >= deadline:
+                return Response(
+                    {"error": f"A request with this {HEADER} is still in progress"},
+                    status=status.HTTP_409_CONFLICT,
+                )
+            time.sleep(POLL_INTERVAL)
+
+        try:
+            response = view(request, *args, **kwargs)
+        except Exception:
+            _release(record)
+            raise
+        if response.status_code >= 500 or not hasattr(response, "data"):
+            _release(record)
+        else:
+            _complete(record, response)
+        return response
+
+    return wrapper
+
+
+def purge_expired(now=None):
+    """
+    Delete expired records. Returns the number deleted.
+    """
+    deleted, _ = IdempotencyRecord.objects.filter(expires_at__lte=now or timezone.now()).delete()
+    return deleted
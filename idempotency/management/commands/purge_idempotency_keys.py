@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+from idempotency.keys import purge_expired
+
+
+class Command(BaseCommand):
+    help = 'Delete stored Idempotency-Key responses that have expired'
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'{purge_expired()} expired key(s) deleted')
@@ -0,0 +1,184 @@
+import threading
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient, APITestCase
+
+from bookings import views as booking_views
+from bookings.models import Flight, FlightBooking
+from jobs.models import Job
+from restaurants.models import Reservation, Restaurant
+
+from .keys import purge_expired
+from .models import IdempotencyRecord
+
+
+def make_flight():
+    now = timezone.now()
+    return Flight.objects.create(
+        flight_number="KQ100", airline="Kenya Airways", origin="NBO", destination="MBA",
+        departure_time=now + timedelta(days=1), arrival_time=now + timedelta(days=1, hours=1),
+        available_seats=10, price=120, seat_rows=5, seat_letters="AB",
+    )
+
+
+@override_settings(JOBS_EAGER=False)
+class IdempotencyKeyTests(APITestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username="traveller", email="traveller@example.com")
+        self.flight = make_flight()
+        self.client.force_authenticate(self.user)
+
+    def book(self, key, seat="1A"):
+        headers = {"Idempotency-Key": key} if key else {}
+        return self.client.post(
+            reverse("book-flight"), {"flight_number": "KQ100", "seat_number": seat}, format="json", headers=headers
+        )
+
+    def test_retry_storm_runs_the_view_once(self):
+        with mock.patch.object(booking_views, "book_seat", wraps=booking_views.book_seat) as book_seat:
+            with CaptureQueriesContext(connection) as first_run:
+                first = self.book("retry-1")
+            replays = []
+            with CaptureQueriesContext(connection) as replay_run:
+                for _ in range(20):
+                    replays.append(self.book("retry-1"))
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(book_seat.call_count, 1)
+        self.assertEqual(FlightBooking.objects.count(), 1)
+        self.assertEqual(Job.objects.filter(name="bookings.send_confirmation").count(), 1)
+        for replay in replays:
+            self.assertEqual(replay.status_code, 201)
+            self.assertEqual(replay.json(), first.json())
+            self.assertEqual(replay.headers["Idempotent-Replayed"], "true")
+        self.assertNotIn("Idempotent-Replayed", first.headers)
+        # each replay is one indexed lookup instead of the whole booking
+        self.assertEqual(len(replay_run.captured_queries), 20)
+        self.assertGreater(len(first_run.captured_queries), 5)
+
+    def test_requests_without_a_key_are_not_deduplicated(self):
+        self.assertEqual(self.book(None, "1A").status_code, 201)
+        self.assertEqual(self.book(None, "1B").status_code, 201)
+
+        self.assertEqual(FlightBooking.objects.count(), 2)
+        self.assertFalse(IdempotencyRecord.objects.exists())
+
+    def test_key_is_scoped_to_the_user(self):
+        self.book("shared")
+        self.client.force_authenticate(get_user_model().objects.create_user(username="other", email="o@example.com"))
+
+        self.assertEqual(self.book("shared", "1B").status_code, 201)
+        self.assertEqual(FlightBooking.objects.count(), 2)
+
+    def test_key_reused_for_a_different_request_is_rejected(self):
+        self.book("retry-1", "1A")
+
+        response = self.book("retry-1", "1B")
+
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(FlightBooking.objects.count(), 1)
+
+    def test_client_errors_are_replayed(self):
+        self.book(None, "1A")
+
+        first = self.book("retry-1", "1A")
+        with mock.patch.object(booking_views, "book_seat") as book_seat:
+            replay = self.book("retry-1", "1A")
+
+        self.assertEqual((first.status_code, replay.status_code), (400, 400))
+        self.assertEqual(replay.json(), first.json())
+        book_seat.assert_not_called()
+
+    def test_server_error_releases_the_key(self):
+        with mock.patch.object(booking_views, "book_seat", side_effect=RuntimeError("db down")):
+            with self.assertRaises(RuntimeError):
+                self.book("retry-1")
+        self.assertFalse(IdempotencyRecord.objects.exists())
+
+        self.assertEqual(self.book("retry-1").status_code, 201)
+        self.assertEqual(FlightBooking.objects.count(), 1)
+
+    def test_expired_key_runs_the_view_again(self):
+        self.book("retry-1", "1A")
+        IdempotencyRecord.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+
+        response = self.book("retry-1", "1B")
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(FlightBooking.objects.count(), 2)
+        self.assertEqual(purge_expired(), 0)
+        IdempotencyRecord.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(purge_expired(), 1)
+
+    @override_settings(IDEMPOTENCY_WAIT=0)
+    def test_duplicate_of_a_running_request_waits_then_gives_up(self):
+        self.book("retry-1")
+        IdempotencyRecord.objects.update(status=IdempotencyRecord.IN_PROGRESS, response_body=None)
+
+        self.assertEqual(self.book("retry-1").status_code, 409)
+
+        # a worker that died mid-request does not hold the key forever
+        IdempotencyRecord.objects.update(locked_at=timezone.now() - timedelta(minutes=5))
+        self.assertEqual(self.book("retry-1", "1B").status_code, 201)
+        self.assertEqual(FlightBooking.objects.count(), 2)
+
+    def test_reservation_retries_create_one_reservation(self):
+        restaurant = Restaurant.objects.create(
+            name="Talisman", address="Karen", latitude=-1.32, longitude=36.7, cuisine="fusion", osm_id="1"
+        )
+        # a slot inside the default opening hours
+        when = (timezone.localtime() + timedelta(days=2)).replace(hour=19, minute=0, second=0, microsecond=0)
+        payload = {"restaurant": restaurant.pk, "reservation_datetime": when.isoformat(), "party_size": 2}
+        responses = [
+            self.client.post(reverse("reservation-list"), payload, format="json", headers={"Idempotency-Key": "r-1"})
+            for _ in range(3)
+        ]
+
+        self.assertEqual([response.status_code for response in responses], [201] * 3)
+        self.assertEqual(Reservation.objects.count(), 1)
+
+    def test_key_length_is_bounded(self):
+        self.assertEqual(self.book("k" * 256).status_code, 400)
+
+
+@override_settings(JOBS_EAGER=False)
+class ConcurrentIdempotencyTests(TransactionTestCase):
+    def test_concurrent_duplicates_are_serialized_on_the_key(self):
+        user = get_user_model().objects.create_user(username="traveller", email="traveller@example.com")
+        make_flight()
+        barrier = threading.Barrier(8)
+        responses, errors = [], []
+
+        def retry():
+            client = APIClient()
+            client.force_authenticate(user)
+            try:
+                barrier.wait()
+                responses.append(client.post(
+                    reverse("book-flight"), {"flight_number": "KQ100", "seat_number": "1A"}, format="json",
+                    headers={"Idempotency-Key": "storm"},
+                ))
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=retry) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual([response.status_code for response in responses], [201] * 8)
+        self.assertEqual(len({response.json()["id"] for response in responses}), 1)
+        self.assertEqual(sum("Idempotent-Replayed" in response.headers for response in responses), 7)
+        self.assertEqual(FlightBooking.objects.count(), 1)
+        self.assertEqual(Job.objects.count(), 1)
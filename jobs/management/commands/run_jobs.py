@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from jobs.queue import run_pending
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs (QR codes, confirmation e-mails, ...)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Drain the due jobs and exit')
+        parser.add_argument('--batch-size', type=int, default=10, help='Jobs claimed per round trip')
+        parser.add_argument('--sleep', type=float, default=1.0, help='Seconds to wait when the queue is empty')
+
+    def handle(self, *args, **options):
+        while True:
+            succeeded, failed = run_pending(batch_size=options['batch_size'])
+            if succeeded or failed or options['once']:
+                self.stdout.write(f'{succeeded} job(s) done, {failed} failed')
+            if options['once']:
+                return
+            if not (succeeded or failed):
+                time.sleep(options['sleep'])
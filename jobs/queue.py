@@ -0,0 +1,126 @@
+"""
+A small database-backed job queue.
+
+Handlers are registered with the `task` decorator in an app's tasks.py and
+queued with `enqueue(name, **payload)`. The job row is written in the
+caller's transaction, so it exists exactly when the work that produced it
+commits; `manage.py run_jobs` then claims due jobs (skipping rows other
+workers hold locked) and runs them, retrying failures with exponential
+backoff. With settings.JOBS_EAGER the job runs in-process right after the
+commit instead, which is what tests and local development use.
+"""
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+_handlers = {}
+
+
+def task(name, max_attempts=5):
+    """
+    Register a function as the handler for jobs called `name`.
+    """
+    def register(func):
+        _handlers[name] = (func, max_attempts)
+        return func
+    return register
+
+
+def enqueue(name, **payload):
+    """
+    Queue a job for `name`'s handler. Payload values must be JSON-serializable.
+    """
+    if name not in _handlers:
+        raise KeyError(f"No job handler registered for {name!r}")
+    job = Job.objects.create(name=name, payload=payload, max_attempts=_handlers[name][1])
+    if settings.JOBS_EAGER:
+        transaction.on_commit(lambda: run_job(job))
+    return job
+
+
+def claim(limit=10, lease=None):
+    """
+    Mark up to `limit` due jobs as running and return them.
+
+    Jobs left running for longer than `lease` seconds (a worker died
+    mid-job) are due again.
+    """
+    now = timezone.now()
+    lease = settings.JOBS_LEASE if lease is None else lease
+    due = Q(status=Job.QUEUED, run_after__lte=now) | Q(
+        status=Job.RUNNING, locked_at__lt=now - timedelta(seconds=lease)
+    )
+    with transaction.atomic():
+        jobs = list(
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(due)
+            .order_by('run_after', 'id')[:limit]
+        )
+        if jobs:
+            Job.objects.filter(pk__in=[job.pk for job in jobs]).update(
+                status=Job.RUNNING, locked_at=now, attempts=F('attempts') + 1
+            )
+    for job in jobs:
+        job.status, job.locked_at, job.attempts = Job.RUNNING, now, job.attempts + 1
+    return jobs
+
+
+def run_job(job):
+    """
+    Run one job and record the outcome. Returns True on success.
+    """
+    if job.status != Job.RUNNING:
+        # eager jobs are not claimed through the worker
+        job.attempts += 1
+    func, _ = _handlers.get(job.name, (None, None))
+    try:
+        if func is None:
+            raise KeyError(f"No job handler registered for {job.name!r}")
+        func(**job.payload)
+    except Exception as e:
+        logger.warning("Job %s failed (attempt %s/%s): %s", job, job.attempts, job.max_attempts, e)
+        job.last_error = traceback.format_exc()
+        if job.attempts >= job.max_attempts:
+            job.status = Job.FAILED
+            job.finished_at = timezone.now()
+        else:
+            job.status = Job.QUEUED
+            delay = min(settings.JOBS_RETRY_BASE_DELAY * 2 ** (job.attempts - 1), settings.JOBS_RETRY_MAX_DELAY)
+            job.run_after = timezone.now() + timedelta(seconds=delay)
+        job.locked_at = None
+        job.save(update_fields=['status', 'attempts', 'run_after', 'locked_at', 'last_error', 'finished_at'])
+        return False
+
+    job.status = Job.DONE
+    job.locked_at = None
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'attempts', 'locked_at', 'finished_at'])
+    return True
+
+
+def run_pending(limit=None, batch_size=10):
+    """
+    Claim and run due jobs until none are left (or `limit` have run).
+    Returns (succeeded, failed).
+    """
+    succeeded = failed = 0
+    while limit is None or succeeded + failed < limit:
+        size = batch_size if limit is None else min(batch_size, limit - succeeded - failed)
+        jobs = claim(size)
+        if not jobs:
+            break
+        for job in jobs:
+            if run_job(job):
+                succeeded += 1
+            else:
+                failed += 1
+    return succeeded, failed
@@ -0,0 +1,97 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .models import Job
+from .queue import claim, enqueue, run_pending, task
+
+calls = []
+
+
+@task('tests.record')
+def record(value):
+    calls.append(value)
+
+
+@task('tests.flaky', max_attempts=2)
+def flaky(fail_times):
+    calls.append('attempt')
+    if calls.count('attempt') <= fail_times:
+        raise RuntimeError('smtp down')
+
+
+@override_settings(JOBS_EAGER=False, JOBS_RETRY_BASE_DELAY=30)
+class JobQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_job_is_only_queued_when_the_transaction_commits(self):
+        try:
+            with transaction.atomic():
+                enqueue('tests.record', value=1)
+                raise RuntimeError
+        except RuntimeError:
+            pass
+
+        self.assertFalse(Job.objects.exists())
+
+    def test_unknown_job_name_is_rejected(self):
+        with self.assertRaises(KeyError):
+            enqueue('tests.missing')
+
+    def test_worker_runs_due_jobs(self):
+        enqueue('tests.record', value=1)
+        enqueue('tests.record', value=2)
+
+        self.assertEqual(run_pending(), (2, 0))
+
+        self.assertEqual(calls, [1, 2])
+        self.assertEqual(set(Job.objects.values_list('status', flat=True)), {Job.DONE})
+        self.assertEqual(run_pending(), (0, 0))
+
+    def test_failed_job_is_retried_with_backoff_then_given_up(self):
+        job = enqueue('tests.flaky', fail_times=5)
+
+        with self.assertLogs('jobs.queue', 'WARNING'):
+            self.assertEqual(run_pending(), (0, 1))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+        self.assertGreater(job.run_after, timezone.now() + timedelta(seconds=25))
+        self.assertIn('smtp down', job.last_error)
+        # not due yet
+        self.assertEqual(run_pending(), (0, 0))
+
+        Job.objects.update(run_after=timezone.now())
+        with self.assertLogs('jobs.queue', 'WARNING'):
+            self.assertEqual(run_pending(), (0, 1))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+
+    def test_retry_succeeds(self):
+        job = enqueue('tests.flaky', fail_times=1)
+        with self.assertLogs('jobs.queue', 'WARNING'):
+            run_pending()
+        Job.objects.update(run_after=timezone.now())
+
+        self.assertEqual(run_pending(), (1, 0))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.DONE)
+
+    def test_stale_running_job_is_reclaimed(self):
+        job = enqueue('tests.record', value=1)
+        Job.objects.update(status=Job.RUNNING, locked_at=timezone.now() - timedelta(hours=1))
+
+        self.assertEqual([j.pk for j in claim(lease=300)], [job.pk])
+        self.assertEqual(claim(lease=300), [])
+
+    @override_settings(JOBS_EAGER=True)
+    def test_eager_jobs_run_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            job = enqueue('tests.record', value=1)
+            self.assertEqual(calls, [])
+
+        self.assertEqual(calls, [1])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.DONE, 1))
@@ -1,9 +1,9 @@
 from django.contrib import admin
-from .models import Restaurant, Reservation
+from .models import Restaurant, Reservation, SlotOccupancy
 
 @admin.register(Restaurant)
 class RestaurantAdmin(admin.ModelAdmin):
-    list_display = ('name', 'address', 'cuisine', 'latitude', 'longitude', 'phone', 'website')
+    list_display = ('name', 'address', 'cuisine', 'latitude', 'longitude', 'phone', 'website', 'covers_per_slot')
     search_fields = ('name', 'address', 'cuisine')
     ordering = ('name',)
 
@@ -13,3 +13,10 @@ class ReservationAdmin(admin.ModelAdmin):
     list_filter = ('status', 'restaurant', 'reservation_datetime')
     search_fields = ('restaurant__name', 'user__email', 'status')
     ordering = ('-reservation_datetime',)
+
+@admin.register(SlotOccupancy)
+class SlotOccupancyAdmin(admin.ModelAdmin):
+    list_display = ('restaurant', 'slot_start', 'covers_taken')
+    list_filter = ('slot_start',)
+    search_fields = ('restaurant__name',)
+    ordering = ('-slot_start',)
@@ -0,0 +1,156 @@
+"""
+Table capacity for restaurant reservations.
+
+Each restaurant seats `covers_per_slot` guests in every slot of
+`slot_minutes`, starting at `opens_at` and ending by `closes_at` (local
+time, within one day). A reservation takes its party size from the slot it
+starts in. SlotOccupancy keeps the running total per slot, so availability
+is one indexed range read, and a reservation takes capacity with a single
+conditional UPDATE that fails instead of overbooking.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import SlotOccupancy
+
+
+class ReservationError(Exception):
+    pass
+
+
+class InvalidSlot(ReservationError):
+    pass
+
+
+class SlotFull(ReservationError):
+    pass
+
+
+def _day_bounds(restaurant, day):
+    tz = timezone.get_current_timezone()
+    return (
+        timezone.make_aware(datetime.combine(day, restaurant.opens_at), tz),
+        timezone.make_aware(datetime.combine(day, restaurant.closes_at), tz),
+    )
+
+
+def slots_on(restaurant, day):
+    """
+    Start times of a restaurant's slots on a date.
+    """
+    start, close = _day_bounds(restaurant, day)
+    step = timedelta(minutes=restaurant.slot_minutes)
+    slots = []
+    while start + step <= close:
+        slots.append(start)
+        start += step
+    return slots
+
+
+def check_slot(restaurant, when, party_size, now=None):
+    """
+    Raise InvalidSlot unless `when` is the start of a future slot the party
+    could fit into.
+    """
+    if party_size < 1:
+        raise InvalidSlot("Party size must be at least 1")
+    if party_size > restaurant.covers_per_slot:
+        raise InvalidSlot(f"{restaurant} seats at most {restaurant.covers_per_slot} guests per slot")
+    if when <= (now or timezone.now()):
+        raise InvalidSlot("Reservation time is in the past")
+    if when not in slots_on(restaurant, timezone.localtime(when).date()):
+        raise InvalidSlot(
+            f"Reservations start every {restaurant.slot_minutes} minutes between "
+            f"{restaurant.opens_at:%H:%M} and {restaurant.closes_at:%H:%M}"
+        )
+
+
+def take_capacity(restaurant, when, party_size):
+    """
+    Reserve `party_size` covers in the slot starting at `when` and return
+    that slot start, to be saved as the reservation's `slot_start`. Call
+    inside the transaction that saves the reservation.
+    """
+    check_slot(restaurant, when, party_size)
+    with transaction.atomic():
+        SlotOccupancy.objects.bulk_create(
+            [SlotOccupancy(restaurant=restaurant, slot_start=when)], ignore_conflicts=True
+        )
+        taken = SlotOccupancy.objects.filter(
+            restaurant=restaurant,
+            slot_start=when,
+            covers_taken__lte=restaurant.covers_per_slot - party_size,
+        ).update(covers_taken=F('covers_taken') + party_size)
+    if not taken:
+        raise SlotFull(f"Not enough tables left at {timezone.localtime(when):%H:%M} for {party_size}")
+    return when
+
+
+def release_capacity(reservation):
+    """
+    Give a reservation's covers back to the slot it took them from. The slot
+    is the one stored when the covers were taken, so later changes to the
+    restaurant's opening hours or slot length do not strand them.
+    """
+    if reservation.slot_start is None:
+        # never took capacity (e.g. created in the admin)
+        return
+    SlotOccupancy.objects.filter(
+        restaurant_id=reservation.restaurant_id,
+        slot_start=reservation.slot_start,
+        covers_taken__gte=reservation.party_size,
+    ).update(covers_taken=F('covers_taken') - reservation.party_size)
+
+
+def _day_range(first_day, last_day):
+    tz = timezone.get_current_timezone()
+    return (
+        timezone.make_aware(datetime.combine(first_day, datetime.min.time()), tz),
+        timezone.make_aware(datetime.combine(last_day + timedelta(days=1), datetime.min.time()), tz),
+    )
+
+
+def slots_with_room(restaurants, first_day, last_day, party_size, taken, now):
+    """
+    {restaurant id: [(slot start, covers left)]} given `taken`, a
+    {restaurant id: {slot start: covers}} mapping.
+    """
+    days = [first_day + timedelta(days=n) for n in range((last_day - first_day).days + 1)]
+    # Most restaurants share opening hours, so build each grid once
+    grids = {}
+    result = {}
+    for restaurant in restaurants:
+        layout = (restaurant.opens_at, restaurant.closes_at, restaurant.slot_minutes)
+        if layout not in grids:
+            grids[layout] = [slot for day in days for slot in slots_on(restaurant, day) if slot > now]
+        booked = taken.get(restaurant.pk, {})
+        capacity = restaurant.covers_per_slot
+        result[restaurant.pk] = [
+            (slot, capacity - covers)
+            for slot in grids[layout]
+            if capacity - (covers := booked.get(slot, 0)) >= party_size
+        ]
+    return result
+
+
+def open_slots(restaurants, first_day, last_day, party_size, now=None):
+    """
+    {restaurant id: [(slot start, covers left)]} for every future slot from
+    first_day to last_day (inclusive) with room for `party_size`, read with
+    one query however many restaurants and days are asked for.
+    """
+    now = now or timezone.now()
+    range_start, range_end = _day_range(first_day, last_day)
+    taken = defaultdict(dict)
+    for restaurant_id, slot_start, covers in SlotOccupancy.objects.filter(
+        restaurant__in=[restaurant.pk for restaurant in restaurants],
+        slot_start__gte=max(range_start, now),
+        slot_start__lt=range_end,
+        covers_taken__gt=0,
+    ).values_list('restaurant_id', 'slot_start', 'covers_taken'):
+        taken[restaurant_id][slot_start] = covers
+    return slots_with_room(restaurants, first_day, last_day, party_size, taken, now)
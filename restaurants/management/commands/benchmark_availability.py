@@ -0,0 +1,140 @@
+import random
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from restaurants.capacity import ReservationError, open_slots, slots_on, slots_with_room, take_capacity
+from restaurants.models import Reservation, Restaurant, SlotOccupancy
+
+
+class _Rollback(Exception):
+    pass
+
+
+def scan_slots(restaurants, first_day, last_day, party_size, now):
+    """
+    open_slots computed the old way, by adding up Reservation rows.
+    """
+    tz = timezone.get_current_timezone()
+    range_start = timezone.make_aware(datetime.combine(first_day, datetime.min.time()), tz)
+    range_end = timezone.make_aware(datetime.combine(last_day + timedelta(days=1), datetime.min.time()), tz)
+    taken = defaultdict(dict)
+    for row in (
+        Reservation.objects.filter(
+            restaurant__in=[r.pk for r in restaurants],
+            reservation_datetime__gte=max(range_start, now), reservation_datetime__lt=range_end,
+        ).exclude(status='canceled')
+        .values('restaurant_id', 'reservation_datetime').annotate(covers=Sum('party_size'))
+    ):
+        taken[row['restaurant_id']][row['reservation_datetime']] = row['covers']
+    return slots_with_room(restaurants, first_day, last_day, party_size, taken, now)
+
+
+class Command(BaseCommand):
+    help = 'Time reservation availability from the per-slot aggregate vs scanning reservations'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--restaurants', type=int, default=1000)
+        parser.add_argument('--days', type=int, default=30)
+        parser.add_argument('--fill', type=float, default=0.3, help='Share of slots with reservations')
+        parser.add_argument('--reservations', type=int, default=500, help='Reservations taken in the write test')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def measure(self, label, func, repeat=1):
+        queries = 0
+
+        def count_queries(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(count_queries):
+            started = time.perf_counter()
+            for _ in range(repeat):
+                result = func()
+            elapsed = (time.perf_counter() - started) / repeat
+        self.stdout.write(f'{label:<44} {queries // repeat:>5} queries {elapsed * 1000:>10.1f} ms')
+        return result
+
+    def handle(self, *args, **options):
+        # Everything runs in one transaction that is rolled back at the end,
+        # so the benchmark leaves no rows behind.
+        try:
+            with transaction.atomic():
+                self.run(options)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def run(self, options):
+        rng = random.Random(options['seed'])
+        user = get_user_model().objects.create_user(username='bench-diner', email='bench-diner@example.com')
+        restaurants = Restaurant.objects.bulk_create([
+            Restaurant(
+                name=f'Bench {i}', address='Bench Street', latitude=-1.28, longitude=36.81, cuisine='bench',
+                osm_id=f'bench-{i}', covers_per_slot=40,
+            )
+            for i in range(options['restaurants'])
+        ])
+        first_day = timezone.localdate() + timedelta(days=1)
+        last_day = first_day + timedelta(days=options['days'] - 1)
+        now = timezone.now()
+
+        occupancy, reservations = [], []
+        for restaurant in restaurants:
+            for n in range(options['days']):
+                for slot in slots_on(restaurant, first_day + timedelta(days=n)):
+                    if rng.random() < options['fill']:
+                        parties = [rng.randint(2, 6) for _ in range(rng.randint(1, 6))]
+                        occupancy.append(SlotOccupancy(restaurant=restaurant, slot_start=slot, covers_taken=sum(parties)))
+                        reservations.extend(
+                            Reservation(restaurant=restaurant, user=user, reservation_datetime=slot, party_size=party)
+                            for party in parties
+                        )
+        started = time.perf_counter()
+        SlotOccupancy.objects.bulk_create(occupancy, batch_size=5000)
+        Reservation.objects.bulk_create(reservations, batch_size=5000)
+        self.stdout.write(
+            f'{len(restaurants)} restaurants x {options["days"]} days on {connection.vendor}: '
+            f'{len(occupancy)} occupied slots, {len(reservations)} reservations '
+            f'(loaded in {time.perf_counter() - started:.1f}s)'
+        )
+
+        for label, subset, days, repeat in [
+            ('1 restaurant x 30 days', restaurants[:1], 30, 20),
+            ('100 restaurants x 7 days', restaurants[:100], 7, 3),
+            (f'{len(restaurants)} restaurants x {options["days"]} days', restaurants, options['days'], 1),
+        ]:
+            end = min(first_day + timedelta(days=days - 1), last_day)
+            aggregate = self.measure(
+                f'aggregate {label}', lambda: open_slots(subset, first_day, end, 4, now=now), repeat
+            )
+            scanned = self.measure(
+                f'scan      {label}', lambda: scan_slots(subset, first_day, end, 4, now), repeat
+            )
+            assert aggregate == scanned, 'aggregate and reservations disagree'
+
+        slots = [(rng.choice(restaurants), rng.choice(slots_on(restaurants[0], last_day))) for _ in range(options['reservations'])]
+
+        def reserve():
+            full = 0
+            for restaurant, slot in slots:
+                try:
+                    with transaction.atomic():
+                        take_capacity(restaurant, slot, 4)
+                        Reservation.objects.create(restaurant=restaurant, user=user, reservation_datetime=slot, party_size=4)
+                except ReservationError:
+                    full += 1
+            return full
+
+        started = time.perf_counter()
+        full = self.measure(f'{len(slots)} reservations', reserve)
+        self.stdout.write(
+            f'{(len(slots) - full) / (time.perf_counter() - started):.0f} reservations/s, {full} rejected as full'
+        )
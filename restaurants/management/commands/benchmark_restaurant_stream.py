@@ -0,0 +1,92 @@
+import time
+from unittest import mock
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import override_settings
+from rest_framework.test import APIRequestFactory
+
+from restaurants.views import RestaurantViewSet
+from services import images
+
+CUISINES = ('kenyan', 'indian', 'italian', 'chinese', 'ethiopian', 'japanese', 'thai', 'french', 'lebanese', 'mexican')
+
+
+class _Rollback(Exception):
+    pass
+
+
+def synthetic_elements(count):
+    return [
+        {
+            'type': 'node', 'id': 900000 + i, 'lat': -1.28 + (i % 100) * 0.0001, 'lon': 36.81 + (i // 100) * 0.0001,
+            'tags': {'name': f'Benchmark Restaurant {i}', 'cuisine': CUISINES[i % len(CUISINES)]},
+        }
+        for i in range(count)
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Compare time to first byte of fetch_restaurants buffered vs streamed as NDJSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=3000, help='Restaurants in the Overpass payload')
+        parser.add_argument('--overpass-latency', type=float, default=200, help='Simulated Overpass latency in ms')
+        parser.add_argument('--pexels-latency', type=float, default=300, help='Simulated Pexels latency in ms')
+
+    def handle(self, *args, **options):
+        elements = synthetic_elements(options['count'])
+        overpass_latency = options['overpass_latency'] / 1000
+        pexels_latency = options['pexels_latency'] / 1000
+
+        def fetch_elements(*args, **kwargs):
+            time.sleep(overpass_latency)
+            return elements, {}
+
+        def photo_src(query, timeout=None):
+            time.sleep(pexels_latency)
+            return {'medium': f'https://img.example/{query}'}
+
+        view = RestaurantViewSet.as_view({'get': 'fetch_restaurants'})
+        factory = APIRequestFactory()
+        self.stdout.write(
+            f'{options["count"]} restaurants on {connection.vendor}, '
+            f'{options["overpass_latency"]:.0f} ms Overpass, {options["pexels_latency"]:.0f} ms Pexels'
+        )
+
+        with mock.patch('restaurants.views.geocoding.geocode', return_value={'lat': -1.28, 'lon': 36.81}), \
+                mock.patch('restaurants.views.overpass_tiles.fetch_elements', side_effect=fetch_elements), \
+                mock.patch('services.pexels_service.PexelsService.photo_src', side_effect=photo_src), \
+                override_settings(PEXELS_API_KEY='benchmark'):
+            for label, params in [('buffered', {}), ('streamed', {'stream': '1'})]:
+                images.clear_memory_cache()
+                # Each mode runs in a transaction that is rolled back, so both
+                # start from an empty table and image cache.
+                try:
+                    with transaction.atomic():
+                        self.measure(label, view, factory.get('/', {'location': 'Nairobi', **params}))
+                        raise _Rollback
+                except _Rollback:
+                    pass
+
+    def measure(self, label, view, request):
+        started = time.perf_counter()
+        response = view(request)
+        if response.streaming:
+            first_byte = first_restaurant = None
+            size = 0
+            for chunk in response.streaming_content:
+                now = time.perf_counter() - started
+                if first_byte is None:
+                    first_byte = now
+                elif first_restaurant is None:
+                    first_restaurant = now
+                size += len(chunk)
+        else:
+            size = len(response.render().content)
+            first_byte = first_restaurant = time.perf_counter() - started
+        total = time.perf_counter() - started
+        self.stdout.write(
+            f'{label:<9} first byte {first_byte * 1000:>8.1f} ms  first restaurant {first_restaurant * 1000:>8.1f} ms  '
+            f'complete {total * 1000:>8.1f} ms  {size / 1024:>7.0f} KB'
+        )
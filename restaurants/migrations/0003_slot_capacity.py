@@ -0,0 +1,71 @@
+# Generated by Django 5.1.7 on 2026-10-18 17:53
+
+import datetime
+from collections import Counter
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_slot_occupancy(apps, schema_editor):
+    # Count existing reservations against the slot they fall in, on the
+    # default 11:00 opening / 30 minute grid every restaurant starts with.
+    Reservation = apps.get_model('restaurants', 'Reservation')
+    SlotOccupancy = apps.get_model('restaurants', 'SlotOccupancy')
+    step = datetime.timedelta(minutes=30)
+    covers = Counter()
+    for restaurant_id, when, party_size in (
+        Reservation.objects.exclude(status='canceled')
+        .values_list('restaurant_id', 'reservation_datetime', 'party_size').iterator(chunk_size=2000)
+    ):
+        local = timezone.localtime(when)
+        opens = timezone.make_aware(datetime.datetime.combine(local.date(), datetime.time(11, 0)))
+        covers[restaurant_id, opens + (when - opens) // step * step] += party_size
+    SlotOccupancy.objects.bulk_create([
+        SlotOccupancy(restaurant_id=restaurant_id, slot_start=slot_start, covers_taken=taken)
+        for (restaurant_id, slot_start), taken in covers.items()
+    ], batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0002_restaurant_geo_cell'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='restaurant',
+            name='closes_at',
+            field=models.TimeField(default=datetime.time(22, 0)),
+        ),
+        migrations.AddField(
+            model_name='restaurant',
+            name='covers_per_slot',
+            field=models.PositiveSmallIntegerField(default=40),
+        ),
+        migrations.AddField(
+            model_name='restaurant',
+            name='opens_at',
+            field=models.TimeField(default=datetime.time(11, 0)),
+        ),
+        migrations.AddField(
+            model_name='restaurant',
+            name='slot_minutes',
+            field=models.PositiveSmallIntegerField(default=30),
+        ),
+        migrations.CreateModel(
+            name='SlotOccupancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('slot_start', models.DateTimeField()),
+                ('covers_taken', models.PositiveIntegerField(default=0)),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='slot_occupancy', to='restaurants.restaurant')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('restaurant', 'slot_start'), name='unique_restaurant_slot')],
+            },
+        ),
+        migrations.RunPython(backfill_slot_occupancy, migrations.RunPython.noop),
+    ]
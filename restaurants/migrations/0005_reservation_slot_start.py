@@ -0,0 +1,46 @@
+# Generated by Django 5.1.7 on 2026-10-18 18:38
+
+import datetime
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_slot_start(apps, schema_editor):
+    # Existing reservations hold covers in the slot their time falls in on
+    # the restaurant's current grid, which is where release used to look.
+    Reservation = apps.get_model('restaurants', 'Reservation')
+    pending = (
+        Reservation.objects.exclude(status='canceled').select_related('restaurant')
+        .only('reservation_datetime', 'restaurant__opens_at', 'restaurant__slot_minutes')
+    )
+    batch = []
+    for reservation in pending.iterator(chunk_size=2000):
+        when = reservation.reservation_datetime
+        restaurant = reservation.restaurant
+        opens = timezone.make_aware(
+            datetime.datetime.combine(timezone.localtime(when).date(), restaurant.opens_at)
+        )
+        step = datetime.timedelta(minutes=restaurant.slot_minutes)
+        reservation.slot_start = opens + (when - opens) // step * step
+        batch.append(reservation)
+        if len(batch) >= 2000:
+            Reservation.objects.bulk_update(batch, ['slot_start'])
+            batch = []
+    Reservation.objects.bulk_update(batch, ['slot_start'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0004_reservation_user_time_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reservation',
+            name='slot_start',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_slot_start, migrations.RunPython.noop),
+    ]
@@ -1,11 +1,14 @@
+import datetime
+
 from django.db import models
 from django.contrib.auth import get_user_model
 from django.conf import settings
 from accounts.models import UserProfile  
+from services.models import GeoIndexedModel
 
 User = get_user_model()
 
-class Restaurant(models.Model):
+class Restaurant(GeoIndexedModel):
     name = models.CharField(max_length=200)
     address = models.CharField(max_length=255)
     latitude = models.FloatField()
@@ -16,10 +19,35 @@ class Restaurant(models.Model):
     osm_id = models.CharField(max_length=100, unique=True)
     phone = models.CharField(max_length=50, blank=True)
     website = models.URLField(blank=True)
+    # Table capacity (see restaurants.capacity): slots of slot_minutes from
+    # opens_at up to closes_at, local time, each seating covers_per_slot guests
+    covers_per_slot = models.PositiveSmallIntegerField(default=40)
+    slot_minutes = models.PositiveSmallIntegerField(default=30)
+    opens_at = models.TimeField(default=datetime.time(11, 0))
+    closes_at = models.TimeField(default=datetime.time(22, 0))
     
     def __str__(self):
         return self.name
 
+class SlotOccupancy(models.Model):
+    """
+    Covers already reserved in one slot of a restaurant. Rows are created on
+    the first reservation for a slot; a missing row means the slot is empty.
+    Availability is read from here rather than by adding up Reservations.
+    """
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, related_name='slot_occupancy')
+    slot_start = models.DateTimeField()
+    covers_taken = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        constraints = [
+            # also the index behind availability's (restaurant, slot range) reads
+            models.UniqueConstraint(fields=['restaurant', 'slot_start'], name='unique_restaurant_slot'),
+        ]
+    
+    def __str__(self):
+        return f"{self.restaurant_id} @ {self.slot_start}: {self.covers_taken}"
+
 class Reservation(models.Model):
     STATUS_CHOICES = (
         ('pending', 'Pending'),
@@ -33,6 +61,8 @@ class Reservation(models.Model):
     reservation_datetime = models.DateTimeField()
     party_size = models.PositiveIntegerField()
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    # Slot whose covers the reservation holds (see restaurants.capacity.take_capacity)
+    slot_start = models.DateTimeField(blank=True, null=True, editable=False)
     special_requests = models.TextField(blank=True)
     description = models.TextField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -40,6 +70,10 @@ class Reservation(models.Model):
     
     class Meta:
         ordering = ['-reservation_datetime']
+        indexes = [
+            # a user's reservations, newest first (ReservationViewSet's list)
+            models.Index(fields=['user', '-reservation_datetime'], name='reservation_user_time_idx'),
+        ]
     
     def __str__(self):
         return f"{self.restaurant.name} - {self.reservation_datetime}"
@@ -0,0 +1,12 @@
+from rest_framework.pagination import CursorPagination
+
+
+class ReservationCursorPagination(CursorPagination):
+    """
+    Keyset pagination on a user's reservations, newest first, read from the
+    (user, -reservation_datetime) index a page at a time.
+    """
+    ordering = ('-reservation_datetime', '-id')
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
@@ -10,7 +10,7 @@ class UserSerializer(serializers.ModelSerializer):
 class RestaurantSerializer(serializers.ModelSerializer):
     class Meta:
         model = Restaurant
-        fields = '__all__'
+        exclude = ['geo_cell']
 
 class ReservationSerializer(serializers.ModelSerializer):
     restaurant_name = serializers.ReadOnlyField(source='restaurant.name')
@@ -23,4 +23,5 @@ class ReservationSerializer(serializers.ModelSerializer):
             'reservation_datetime', 'party_size', 'status', 
             'special_requests', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['status', 'created_at', 'updated_at']
+        # The owner is always the requesting user (see ReservationViewSet)
+        read_only_fields = ['user', 'status', 'created_at', 'updated_at']
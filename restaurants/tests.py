@@ -1,3 +1,380 @@
-from django.test import TestCase
+import json
+import unittest
+import threading
+from datetime import datetime, time, timedelta
+from time import sleep
+from unittest import mock
 
-# Create your tests here.
+import requests
+from django.contrib.auth import get_user_model
+from django.db import OperationalError, connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient, APITestCase
+
+from services import geocoding, images
+from . import views
+from .capacity import open_slots
+from .models import Reservation, Restaurant, SlotOccupancy
+
+OVERPASS_PAYLOAD = {
+    'elements': [
+        {
+            'type': 'node', 'id': 100 + i, 'lat': -1.28 + i * 0.001, 'lon': 36.82,
+            'tags': {'name': f'Restaurant {i}', 'cuisine': ('kenyan', 'indian', 'italian')[i % 3]},
+        }
+        for i in range(9)
+    ]
+}
+
+
+@override_settings(PEXELS_API_KEY='test-key')
+class FetchRestaurantsTests(TestCase):
+    def setUp(self):
+        geocoding.clear_memory_cache()
+        images.clear_memory_cache()
+        self.addCleanup(images.clear_memory_cache)
+        for target, kwargs in [
+            ('services.geocoding.OpenStreetMapService.search_locations', {'return_value': [{'lat': '-1.28', 'lon': '36.82'}]}),
+            ('services.overpass_tiles.OpenStreetMapService.overpass', {'return_value': OVERPASS_PAYLOAD}),
+            ('services.pexels_service.PexelsService.photo_src', {'side_effect': lambda query, timeout=None: {'medium': f'https://img/{query}'}}),
+        ]:
+            patcher = mock.patch(target, **kwargs)
+            setattr(self, target.rsplit('.', 1)[-1], patcher.start())
+            self.addCleanup(patcher.stop)
+
+    def fetch(self):
+        response = self.client.get(reverse('restaurant-fetch-restaurants'), {'location': 'Nairobi'})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_one_image_lookup_per_distinct_cuisine(self):
+        data = self.fetch()
+
+        self.assertEqual(data['count'], 9)
+        self.assertEqual(Restaurant.objects.count(), 9)
+        self.assertEqual(self.photo_src.call_count, 3)
+        self.assertEqual(data['restaurants'][1]['image_url'], 'https://img/indian restaurant food')
+
+    def test_image_cache_is_shared_across_imports(self):
+        self.fetch()
+        Restaurant.objects.update(image_url='')
+        images.clear_memory_cache()
+
+        self.fetch()
+        self.assertEqual(self.photo_src.call_count, 3)
+        self.assertEqual(Restaurant.objects.exclude(image_url='').count(), 9)
+
+    def test_overpass_failure_is_503_not_an_empty_list(self):
+        self.overpass.side_effect = requests.ConnectionError('down')
+        response = self.client.get(reverse('restaurant-fetch-restaurants'), {'location': 'Nairobi'})
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(Restaurant.objects.count(), 0)
+
+    def stream(self):
+        response = self.client.get(reverse('restaurant-fetch-restaurants'), {'location': 'Nairobi', 'stream': '1'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        return response
+
+    def read_lines(self, response):
+        return [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+
+    def test_stream_sends_the_location_before_touching_overpass(self):
+        chunks = iter(self.stream().streaming_content)
+
+        first = json.loads(next(chunks))
+        self.assertEqual((first['type'], first['lat']), ('location', -1.28))
+        self.overpass.assert_not_called()
+
+    def test_stream_sends_restaurants_first_and_images_last(self):
+        with mock.patch.object(views, 'STREAM_CHUNK_SIZE', 4):
+            response = self.stream()
+            chunks = list(response.streaming_content)
+        lines = [json.loads(line) for line in b''.join(chunks).decode().splitlines()]
+
+        # location, restaurants in chunks of 4, images, end
+        self.assertEqual(len(chunks), 1 + 3 + 2)
+        self.assertEqual([line['type'] for line in lines], ['location'] + ['restaurant'] * 9 + ['images', 'end'])
+        restaurants = lines[1:10]
+        self.assertEqual({r['image_url'] for r in restaurants}, {None})
+        images = lines[10]['images']
+        self.assertEqual(len(images), 9)
+        self.assertEqual(images[str(restaurants[1]['id'])], 'https://img/indian restaurant food')
+        self.assertEqual(lines[-1], {'type': 'end', 'count': 9})
+        self.assertEqual(self.photo_src.call_count, 3)
+        self.assertFalse(Restaurant.objects.filter(image_url='').exists())
+
+    def test_stream_overpass_failure_is_logged_and_reported(self):
+        self.overpass.side_effect = requests.ConnectionError('down')
+
+        with self.assertLogs('restaurants.views', 'ERROR'):
+            lines = self.read_lines(self.stream())
+
+        self.assertEqual([line['type'] for line in lines], ['location', 'error'])
+
+    def test_stored_images_are_sent_inline(self):
+        self.fetch()
+
+        lines = self.read_lines(self.stream())
+
+        self.assertEqual([line['type'] for line in lines], ['location'] + ['restaurant'] * 9 + ['end'])
+        self.assertEqual(lines[2]['image_url'], 'https://img/indian restaurant food')
+        self.assertEqual(self.photo_src.call_count, 3)
+
+
+def make_restaurant(name='Talisman', **kwargs):
+    fields = {
+        'address': 'Karen', 'latitude': -1.32, 'longitude': 36.7, 'cuisine': 'fusion', 'osm_id': name,
+        'covers_per_slot': 10, 'opens_at': time(18, 0), 'closes_at': time(21, 0), **kwargs,
+    }
+    return Restaurant.objects.create(name=name, **fields)
+
+
+def evening(hour=19, minute=0, days=2):
+    day = timezone.localdate() + timedelta(days=days)
+    return timezone.make_aware(datetime.combine(day, time(hour, minute)))
+
+
+class ReservationCapacityTests(APITestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='diner', email='diner@example.com')
+        self.client.force_authenticate(self.user)
+        self.restaurant = make_restaurant()
+
+    def reserve(self, when, party_size=4, restaurant=None):
+        return self.client.post(reverse('reservation-list'), {
+            'restaurant': (restaurant or self.restaurant).pk, 'reservation_datetime': when.isoformat(),
+            'party_size': party_size,
+        }, format='json')
+
+    def availability(self, **params):
+        params = {'restaurant': self.restaurant.pk, 'start': evening().date().isoformat(), **params}
+        response = self.client.get(reverse('restaurant-availability'), params)
+        return response
+
+    def test_reservations_take_covers_until_the_slot_is_full(self):
+        self.assertEqual(self.reserve(evening(), 4).status_code, 201)
+        self.assertEqual(self.reserve(evening(), 6).status_code, 201)
+
+        response = self.reserve(evening(), 1)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Not enough tables', response.json()['error'])
+        self.assertEqual(Reservation.objects.count(), 2)
+        self.assertEqual(SlotOccupancy.objects.get().covers_taken, 10)
+
+    def test_reservation_must_start_on_a_future_slot(self):
+        for when, party_size in [
+            (evening(19, 10), 2),   # between slots
+            (evening(21, 0), 2),    # closed
+            (evening(days=-1), 2),  # past
+            (evening(), 11),        # bigger than the room
+        ]:
+            self.assertEqual(self.reserve(when, party_size).status_code, 400, when)
+        self.assertFalse(Reservation.objects.exists())
+
+    def test_availability_lists_open_slots_for_the_party(self):
+        self.reserve(evening(19, 0), 8)
+
+        response = self.availability(party_size=4)
+
+        self.assertEqual(response.status_code, 200)
+        slots = response.json()['restaurants'][0]['slots']
+        # 18:00 to 21:00 in 30 minute slots, minus the one 19:00 cannot seat 4 in
+        self.assertEqual(len(slots), 5)
+        self.assertNotIn(evening(19, 0), [datetime.fromisoformat(slot['start']) for slot in slots])
+        self.assertEqual(slots[0]['covers_left'], 10)
+        self.assertEqual(len(self.availability(party_size=2).json()['restaurants'][0]['slots']), 6)
+
+    def test_availability_reads_a_constant_number_of_queries(self):
+        others = [make_restaurant(f'Other {i}') for i in range(5)]
+        for restaurant in others:
+            self.reserve(evening(), 2, restaurant)
+        ids = ','.join(str(r.pk) for r in [self.restaurant, *others])
+
+        with self.assertNumQueries(2):
+            response = self.availability(restaurant=ids, end=(evening().date() + timedelta(days=6)).isoformat())
+
+        self.assertEqual(len(response.json()['restaurants']), 6)
+        self.assertEqual(sum(len(r['slots']) for r in response.json()['restaurants']), 6 * 7 * 6)
+
+    def test_availability_validates_its_parameters(self):
+        self.assertEqual(self.client.get(reverse('restaurant-availability')).status_code, 400)
+        self.assertEqual(self.availability(start='tomorrow').status_code, 400)
+        self.assertEqual(self.availability(end='2000-01-01').status_code, 400)
+        self.assertEqual(self.availability(end=(evening().date() + timedelta(days=40)).isoformat()).status_code, 400)
+
+    def test_cancel_and_reschedule_move_covers(self):
+        reservation_id = self.reserve(evening(19, 0), 4).json()['id']
+
+        response = self.client.patch(
+            reverse('reservation-detail', args=[reservation_id]), {'reservation_datetime': evening(20, 0).isoformat()},
+            format='json',
+        )
+        self.assertEqual(response.status_code, 200)
+        occupancy = dict(SlotOccupancy.objects.values_list('slot_start', 'covers_taken'))
+        self.assertEqual((occupancy[evening(19, 0)], occupancy[evening(20, 0)]), (0, 4))
+
+        self.assertEqual(self.client.post(reverse('reservation-cancel', args=[reservation_id])).status_code, 200)
+        self.assertEqual(SlotOccupancy.objects.get(slot_start=evening(20, 0)).covers_taken, 0)
+        self.assertEqual(self.client.post(reverse('reservation-cancel', args=[reservation_id])).status_code, 400)
+
+    def test_cancel_releases_the_booked_slot_after_the_grid_changes(self):
+        reservation_id = self.reserve(evening(19, 30), 4).json()['id']
+        # 19:30 is not on a one hour grid, so the slot cannot be recomputed
+        Restaurant.objects.filter(pk=self.restaurant.pk).update(slot_minutes=60)
+
+        self.assertEqual(self.client.post(reverse('reservation-cancel', args=[reservation_id])).status_code, 200)
+
+        self.assertEqual(SlotOccupancy.objects.get(slot_start=evening(19, 30)).covers_taken, 0)
+
+    def test_open_slots_skips_slots_already_started(self):
+        today = timezone.localdate()
+        now = timezone.make_aware(datetime.combine(today, time(19, 15)))
+
+        slots = open_slots([self.restaurant], today, today, 2, now=now)[self.restaurant.pk]
+
+        self.assertEqual([timezone.localtime(slot).time() for slot, _ in slots], [time(19, 30), time(20, 0), time(20, 30)])
+
+
+class ReservationListTests(APITestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='diner', email='diner@example.com')
+        self.other = get_user_model().objects.create_user(username='other', email='other@example.com')
+        self.restaurants = [make_restaurant(f'Place {i}') for i in range(3)]
+        self.client.force_authenticate(self.user)
+
+    def add_reservations(self, user, count):
+        Reservation.objects.bulk_create([
+            Reservation(
+                restaurant=self.restaurants[i % 3], user=user, party_size=2,
+                reservation_datetime=evening(days=1 + i // 6, hour=18 + i % 6 // 2, minute=30 * (i % 2)),
+            )
+            for i in range(count)
+        ])
+
+    def test_list_only_shows_the_users_reservations(self):
+        self.add_reservations(self.user, 3)
+        self.add_reservations(self.other, 4)
+
+        results = self.client.get(reverse('reservation-list')).json()['results']
+
+        self.assertEqual(len(results), 3)
+        self.assertEqual({r['user_email'] for r in results}, {'diner@example.com'})
+        other_id = Reservation.objects.filter(user=self.other).first().pk
+        self.assertEqual(self.client.get(reverse('reservation-detail', args=[other_id])).status_code, 404)
+
+    def test_owner_cannot_be_changed(self):
+        self.add_reservations(self.user, 1)
+        reservation = Reservation.objects.get()
+
+        response = self.client.patch(
+            reverse('reservation-detail', args=[reservation.pk]), {'user': self.other.pk}, format='json'
+        )
+
+        self.assertEqual(response.status_code, 200)
+        reservation.refresh_from_db()
+        self.assertEqual(reservation.user, self.user)
+
+    def test_form_encoded_create_is_owned_by_the_requester(self):
+        response = self.client.post(reverse('reservation-list'), {
+            'restaurant': self.restaurants[0].pk, 'reservation_datetime': evening().isoformat(),
+            'party_size': 2, 'user': self.other.pk,
+        })
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Reservation.objects.get().user, self.user)
+
+    def test_list_needs_authentication(self):
+        self.client.force_authenticate(None)
+
+        self.assertEqual(self.client.get(reverse('reservation-list')).status_code, 401)
+
+    def test_query_count_does_not_grow_with_the_page(self):
+        self.add_reservations(self.user, 2)
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(reverse('reservation-list'))
+        self.add_reservations(self.user, 18)
+
+        with self.assertNumQueries(len(small.captured_queries)):
+            results = self.client.get(reverse('reservation-list')).json()['results']
+
+        self.assertEqual(len(results), 20)
+        self.assertEqual(len(small.captured_queries), 1)
+
+    def test_cursor_pages_are_newest_first_and_cover_every_reservation_once(self):
+        self.add_reservations(self.user, 25)
+
+        seen, url = [], reverse('reservation-list') + '?page_size=7'
+        while url:
+            page = self.client.get(url).json()
+            seen.extend(page['results'])
+            url = page['next']
+
+        self.assertEqual(len({r['id'] for r in seen}), 25)
+        times = [r['reservation_datetime'] for r in seen]
+        self.assertEqual(times, sorted(times, reverse=True))
+
+    @unittest.skipUnless(connection.vendor == 'sqlite', 'query plan format is backend specific')
+    def test_list_reads_the_user_index(self):
+        self.add_reservations(self.user, 5)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('reservation-list'))
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {queries.captured_queries[0]['sql']}")
+            plan = ' '.join(str(row[-1]) for row in cursor.fetchall())
+
+        self.assertIn('reservation_user_time_idx', plan)
+
+
+def post_with_retry(client, *args, attempts=2000, **kwargs):
+    # The shared-cache SQLite test database reports contention as "table is
+    # locked" instead of waiting; a real client would retry, so the test does,
+    # up to a couple of seconds before giving up with the last error.
+    for attempt in range(attempts):
+        try:
+            return client.post(*args, **kwargs)
+        except OperationalError as e:
+            if 'locked' not in str(e) or attempt == attempts - 1:
+                raise
+            sleep(0.001)
+
+
+class ConcurrentReservationTests(TransactionTestCase):
+    def test_concurrent_reservations_never_overbook_a_slot(self):
+        user = get_user_model().objects.create_user(username='diner', email='diner@example.com')
+        restaurant = make_restaurant(covers_per_slot=20)
+        barrier = threading.Barrier(8)
+        statuses, errors = [], []
+
+        def reserve():
+            client = APIClient()
+            client.force_authenticate(user)
+            try:
+                barrier.wait()
+                statuses.append(post_with_retry(client, reverse('reservation-list'), {
+                    'restaurant': restaurant.pk, 'reservation_datetime': evening().isoformat(), 'party_size': 4,
+                }, format='json').status_code)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=reserve) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(statuses), 8)
+        self.assertEqual(set(statuses) - {201, 400}, set())
+        # A retry can follow a commit whose response failed, so count rows
+        # rather than responses: exactly the 5 parties of 4 that fit
+        self.assertEqual(Reservation.objects.count(), 5)
+        self.assertEqual(SlotOccupancy.objects.get().covers_taken, 20)
@@ -1,37 +1,79 @@
 from rest_framework import viewsets, status
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, action
-from rest_framework.permissions import AllowAny
+from rest_framework.permissions import AllowAny, IsAuthenticated
 from django.core.mail import send_mail
 from django.conf import settings
-import requests
-from requests_cache import CachedSession
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from django.utils.decorators import method_decorator
 import json
+import logging
+from itertools import islice
+import requests
+from idempotency.keys import idempotent
+from services import geocoding
+from services.geo import ProximityFilter
+from services.osm_ingest import upsert_rows, values_by_key
+from services import images, overpass_tiles
+from services.views import provider_unavailable
+from .capacity import ReservationError, open_slots, release_capacity, take_capacity
 from .models import Restaurant, Reservation
+from .pagination import ReservationCursorPagination
 from .serializers import RestaurantSerializer, ReservationSerializer
 
+MAX_AVAILABILITY_DAYS = 31
+MAX_AVAILABILITY_RESTAURANTS = 100
+STREAM_CHUNK_SIZE = 50  # restaurants stored and sent per streamed chunk
+DEFAULT_RESTAURANT_IMAGE = "https://images.pexels.com/photos/6267/menu-restaurant-vintage-table.jpg"
+RESTAURANT_UPDATE_FIELDS = ['name', 'address', 'latitude', 'longitude', 'cuisine', 'phone', 'website', 'image_url']
+
+logger = logging.getLogger(__name__)
+
 class RestaurantViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Restaurant.objects.all()
     serializer_class = RestaurantSerializer
     permission_classes = [AllowAny]  # Allow anyone to view restaurants
+    filter_backends = [ProximityFilter]  # ?lat=&lon=&radius= or ?bbox=
     
     @action(detail=False, methods=['get'], url_path='fetch_restaurants')
     def fetch_restaurants(self, request):
         """
         Fetch restaurants from OSM based on location parameter
         Usage: /api/restaurants/fetch_restaurants/?location=nairobi
+        
+        With ?stream=1 the response is NDJSON, one object per line, starting
+        with the location and sending restaurants as they are stored; see
+        stream_restaurants.
         """
         location = request.query_params.get('location')
         if not location:  # If param is missing or empty
             return Response({'error': 'location is required'}, status=status.HTTP_400_BAD_REQUEST)
         
         # Geocode the given location: location -> coordinates
-        coords = self.geocode_location(location)
+        try:
+            coords = self.geocode_location(location)
+        except requests.RequestException as e:
+            return provider_unavailable(e)
         if not coords:
             return Response({'error': 'Could not geocode the location'}, status=status.HTTP_400_BAD_REQUEST)
         
+        if request.query_params.get('stream') in ('1', 'true'):
+            response = StreamingHttpResponse(
+                self.stream_restaurants(location, coords['lat'], coords['lon']),
+                content_type='application/x-ndjson',
+            )
+            response['Cache-Control'] = 'no-cache'
+            return response
+        
         # Call OSM with the coordinates
-        restaurants = self.fetch_restaurants_from_overpass(coords['lat'], coords['lon'])
+        try:
+            restaurants = self.fetch_restaurants_from_overpass(coords['lat'], coords['lon'])
+        except requests.RequestException as e:
+            return provider_unavailable(e)
         
         return Response({
             'location': location,
@@ -41,137 +83,259 @@ class RestaurantViewSet(viewsets.ReadOnlyModelViewSet):
     
     def geocode_location(self, location):
         """
-        Convert location name to coordinates using Nominatim
+        Convert location name to coordinates using Nominatim; None when
+        nothing matches. Provider failures raise requests.RequestException.
         """
-        nominatim_url = "https://nominatim.openstreetmap.org/search"
-        params = {
-            'q': location,
-            'format': 'json',
-            'limit': 1
-        }
+        return geocoding.geocode(location)
+    
+    def fetch_restaurants_from_overpass(self, lat, lon, radius=5000):
+        # Assembled from cached Overpass tiles, only missing tiles go upstream
+        elements, _ = overpass_tiles.fetch_elements(overpass_tiles.RESTAURANTS, lat, lon, radius)
+        parsed = [parse_element(element) for element in elements if element.get('type') == 'node']
         
-        # Add a User-Agent header as required by Nominatim's usage policy
-        headers = {
-            'User-Agent': 'TravelWithSue/0.1'
-        }
+        # Keep images we already have, only look up the missing ones
+        osm_ids = [row['osm_id'] for row, _, _ in parsed]
+        existing_images = values_by_key(Restaurant, osm_ids, 'image_url')
+        missing_cuisines = {cuisine for row, _, cuisine in parsed if not existing_images.get(row['osm_id'])}
+        cuisine_images = self.get_restaurant_images(missing_cuisines)
+        for row, _, cuisine in parsed:
+            row['image_url'] = existing_images.get(row['osm_id']) or cuisine_images[cuisine]
         
-        try:
-            response = requests.get(nominatim_url, params=params, headers=headers)
-            data = response.json()
-            
-            if data and len(data) > 0:
-                return {
-                    'lat': float(data[0]['lat']),
-                    'lon': float(data[0]['lon'])
-                }
-            return None
-        except Exception as e:
-            print(f"Error geocoding location: {e}")
-            return None
+        # Create or update all restaurants in one batched upsert
+        upsert_rows(Restaurant, [row for row, _, _ in parsed], update_fields=RESTAURANT_UPDATE_FIELDS)
+        ids = values_by_key(Restaurant, osm_ids, 'id')
+        
+        return [restaurant_result(row, name, cuisine, ids.get(row['osm_id'])) for row, name, cuisine in parsed]
     
-    def fetch_restaurants_from_overpass(self, lat, lon, radius=5000):
-        # Overpass API query
-        overpass_url = "https://overpass-api.de/api/interpreter"
-        overpass_query = f"""
-        [out:json];
-        node["amenity"="restaurant"](around:{radius},{lat},{lon});
-        out body;
+    def stream_restaurants(self, location, lat, lon, radius=5000):
         """
-
-        session = CachedSession()
+        NDJSON lines for a streamed fetch:
         
+            {"type": "location", ...}      straight away
+            {"type": "restaurant", ...}    per restaurant, STREAM_CHUNK_SIZE at a time
+            {"type": "images", "images": {id: url}}
+            {"type": "end", "count": n}
+        
+        Restaurants are stored and sent chunk by chunk with the image already
+        on file, or null. Images for the rest are looked up once the last
+        restaurant is out and sent in the "images" line, so Pexels never
+        holds up the list.
+        """
+        yield ndjson_line({'type': 'location', 'location': location, 'lat': lat, 'lon': lon})
         try:
-            response = session.get(overpass_url, params={"data": overpass_query})
-            data = response.json()
+            elements, _ = overpass_tiles.fetch_elements(overpass_tiles.RESTAURANTS, lat, lon, radius)
+            nodes = (element for element in elements if element.get('type') == 'node')
             
-            results = []
-            for element in data.get('elements', []):
-                if element.get('type') == 'node':
-                    tags = element.get('tags', {})
-                    osm_id = str(element.get('id'))
-                    
-                    # Create restaurant object
-                    name = tags.get('name', 'Unknown Restaurant')
-                    address = tags.get('addr:full', tags.get('addr:housenumber', '') + ' ' + tags.get('addr:street', '')).strip() or 'Address not available'
-                    cuisine = tags.get('cuisine', 'Various')
-                    
-                    # Create or update restaurant in database
-                    restaurant, created = Restaurant.objects.update_or_create(
-                        osm_id=osm_id,
-                        defaults={
-                            'name': truncate_string(name, 200),
-                            'address': address,
-                            'latitude': element.get('lat'),
-                            'longitude': element.get('lon'),
-                            'cuisine': truncate_string(cuisine, 100),
-                            'phone': tags.get('phone', ''),
-                            'website': tags.get('website', '')
-                        }
-                    )
-                    
-                    # Get image for restaurant
-                    if created or not restaurant.image_url:
-                        restaurant.image_url = self.get_restaurant_image(cuisine)
-                        restaurant.save()
-                    
-                    # Add to results
-                    results.append({
-                        'id': restaurant.id,
-                        'osm_id': osm_id,
-                        'name': name,
-                        'address': address,
-                        'cuisine': cuisine,
-                        'lat': element.get('lat'),
-                        'lon': element.get('lon'),
-                        'image_url': restaurant.image_url
-                    })
+            count = 0
+            pending = {}  # restaurant id -> cuisine, for rows still without an image
+            while chunk := [parse_element(element) for element in islice(nodes, STREAM_CHUNK_SIZE)]:
+                osm_ids = [row['osm_id'] for row, _, _ in chunk]
+                existing_images = values_by_key(Restaurant, osm_ids, 'image_url')
+                for row, _, _ in chunk:
+                    row['image_url'] = existing_images.get(row['osm_id']) or ''
+                upsert_rows(Restaurant, [row for row, _, _ in chunk], update_fields=RESTAURANT_UPDATE_FIELDS)
+                ids = values_by_key(Restaurant, osm_ids, 'id')
+                
+                lines = []
+                for row, name, cuisine in chunk:
+                    result = restaurant_result(row, name, cuisine, ids.get(row['osm_id']))
+                    if not result['image_url']:
+                        result['image_url'] = None
+                        pending[result['id']] = cuisine
+                    lines.append(ndjson_line({'type': 'restaurant', **result}))
+                count += len(chunk)
+                yield ''.join(lines)
             
-            return results
+            if pending:
+                # One lookup per distinct cuisine, then one UPDATE per cuisine
+                cuisine_images = self.get_restaurant_images(set(pending.values()))
+                for cuisine, url in cuisine_images.items():
+                    Restaurant.objects.filter(
+                        id__in=[pk for pk, c in pending.items() if c == cuisine], image_url=''
+                    ).update(image_url=url)
+                yield ndjson_line({
+                    'type': 'images',
+                    'images': {pk: cuisine_images[cuisine] for pk, cuisine in pending.items()},
+                })
             
-        except Exception as e:
-            print(f"Error fetching from OSM: {e}")
-            return []
+            yield ndjson_line({'type': 'end', 'count': count})
+        except requests.RequestException:
+            logger.exception("Error streaming restaurants from OSM for %s", location)
+            yield ndjson_line({'type': 'error', 'error': 'Could not fetch restaurants'})
     
-    def get_restaurant_image(self, cuisine):
-        # Replace with your Pexels API key
-        pexels_api_key = "PEXELS_API_KEY"
+    @action(detail=False, methods=['get'])
+    def availability(self, request):
+        """
+        Open reservation slots for a party.
+        Usage: /restaurants/restaurants/availability/?restaurant=1,2&start=2026-12-01&end=2026-12-07&party_size=4
         
-        headers = {
-            "Authorization": pexels_api_key
-        }
+        Instead of ids, restaurants can be picked with the ?lat=&lon=&radius=
+        or ?bbox= filters. `end` defaults to `start`, which defaults to today.
+        """
+        params = request.query_params
+        try:
+            party_size = int(params.get('party_size', 2))
+            first_day = parse_date(params['start']) if params.get('start') else timezone.localdate()
+            last_day = parse_date(params['end']) if params.get('end') else first_day
+            ids = [int(pk) for value in params.getlist('restaurant') for pk in value.split(',') if pk]
+        except ValueError:
+            return Response({'error': 'Invalid party_size, start, end or restaurant'}, status=status.HTTP_400_BAD_REQUEST)
+        if first_day is None or last_day is None or last_day < first_day:
+            return Response({'error': 'start and end must be dates (YYYY-MM-DD), start first'}, status=status.HTTP_400_BAD_REQUEST)
+        if (last_day - first_day).days >= MAX_AVAILABILITY_DAYS:
+            return Response({'error': f'At most {MAX_AVAILABILITY_DAYS} days at a time'}, status=status.HTTP_400_BAD_REQUEST)
+        if party_size < 1:
+            return Response({'error': 'party_size must be at least 1'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        if not ids and not {'lat', 'lon', 'bbox'} & set(params):
+            return Response({'error': 'restaurant, lat/lon or bbox is required'}, status=status.HTTP_400_BAD_REQUEST)
+        restaurants = self.filter_queryset(self.get_queryset())
+        if ids:
+            restaurants = restaurants.filter(pk__in=ids)
+        restaurants = list(restaurants.only(
+            'id', 'name', 'covers_per_slot', 'slot_minutes', 'opens_at', 'closes_at'
+        )[:MAX_AVAILABILITY_RESTAURANTS])
         
-        search_term = f"{cuisine} restaurant food"
-        url = f"https://api.pexels.com/v1/search?query={search_term}&per_page=1"
+        slots = open_slots(restaurants, first_day, last_day, party_size)
+        return Response({
+            'party_size': party_size,
+            'start': first_day,
+            'end': last_day,
+            'restaurants': [
+                {
+                    'id': restaurant.pk,
+                    'name': restaurant.name,
+                    'slots': [{'start': start, 'covers_left': left} for start, left in slots[restaurant.pk]],
+                }
+                for restaurant in restaurants
+            ],
+        })
+    
+    def get_restaurant_images(self, cuisines):
+        """
+        One image per distinct cuisine, through the shared image cache, so an
+        import costs at most O(distinct cuisines) Pexels calls.
+        """
+        search_terms = {cuisine: f"{cuisine} restaurant food" for cuisine in cuisines}
         
         try:
-            response = requests.get(url, headers=headers)
-            data = response.json()
-            
-            if 'photos' in data and len(data['photos']) > 0:
-                return data['photos'][0]['src']['medium']
-        except Exception as e:
-            print(f"Error fetching image: {e}")
+            urls = images.image_urls(search_terms.values(), size='medium')
+        except requests.RequestException:
+            logger.exception("Error fetching restaurant images")
+            urls = {}
             
-        # Return a default image if Pexels fetch fails
-        return "https://images.pexels.com/photos/6267/menu-restaurant-vintage-table.jpg"
+        # Fall back to a default image if Pexels has nothing
+        return {
+            cuisine: urls.get(term) or DEFAULT_RESTAURANT_IMAGE
+            for cuisine, term in search_terms.items()
+        }
 
 class ReservationViewSet(viewsets.ModelViewSet):
-    queryset = Reservation.objects.all()
+    queryset = Reservation.objects.select_related('restaurant', 'user')
     serializer_class = ReservationSerializer
-    permission_classes = [AllowAny]
+    permission_classes = [IsAuthenticated]
+    pagination_class = ReservationCursorPagination
+    
+    def get_queryset(self):
+        # Users only ever see, change or cancel their own reservations
+        return super().get_queryset().filter(user=self.request.user)
 
     
+    @method_decorator(idempotent)
     def create(self, request):
-        data = request.data       
-        data['user'] = request.user.id
-
-        print(request.user)
-        
-        serializer = self.serializer_class(data=data)
+        serializer = self.serializer_class(data=request.data)
         if serializer.is_valid():
-            serializer.save()
+            # Take the covers and save the reservation together, so a full
+            # slot rejects the reservation instead of overbooking
+            try:
+                with transaction.atomic():
+                    slot_start = take_capacity(
+                        serializer.validated_data['restaurant'],
+                        serializer.validated_data['reservation_datetime'],
+                        serializer.validated_data['party_size'],
+                    )
+                    serializer.save(user=request.user, slot_start=slot_start)
+            except ReservationError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    def update(self, request, *args, **kwargs):
+        try:
+            return super().update(request, *args, **kwargs)
+        except ReservationError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    def perform_update(self, serializer):
+        # Move the covers when the time or party size changes
+        reservation = serializer.instance
+        when = serializer.validated_data.get('reservation_datetime', reservation.reservation_datetime)
+        party_size = serializer.validated_data.get('party_size', reservation.party_size)
+        restaurant = serializer.validated_data.get('restaurant', reservation.restaurant)
+        moved = (restaurant.pk, when, party_size) != (
+            reservation.restaurant_id, reservation.reservation_datetime, reservation.party_size
+        )
+        with transaction.atomic():
+            if moved and reservation.status != 'canceled':
+                release_capacity(reservation)
+                serializer.save(slot_start=take_capacity(restaurant, when, party_size))
+            else:
+                serializer.save()
+    
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            if instance.status != 'canceled':
+                release_capacity(instance)
+            instance.delete()
+    
+    @action(detail=True, methods=['post'])
+    def cancel(self, request, pk=None):
+        reservation = self.get_object()
+        with transaction.atomic():
+            canceled = Reservation.objects.filter(pk=reservation.pk).exclude(status='canceled').update(status='canceled')
+            if canceled:
+                release_capacity(reservation)
+        if not canceled:
+            return Response({'error': 'Reservation is already canceled'}, status=status.HTTP_400_BAD_REQUEST)
+        reservation.refresh_from_db()
+        return Response(self.get_serializer(reservation).data)
+
+def parse_element(element):
+    """
+    (row, name, cuisine) for an Overpass node; `row` is ready for upsert_rows
+    once image_url is set.
+    """
+    tags = element.get('tags', {})
+    name = tags.get('name', 'Unknown Restaurant')
+    address = tags.get('addr:full', tags.get('addr:housenumber', '') + ' ' + tags.get('addr:street', '')).strip() or 'Address not available'
+    cuisine = tags.get('cuisine', 'Various')
+    
+    row = {
+        'osm_id': str(element.get('id')),
+        'name': truncate_string(name, 200),
+        'address': address,
+        'latitude': element.get('lat'),
+        'longitude': element.get('lon'),
+        'cuisine': truncate_string(cuisine, 100),
+        'phone': tags.get('phone', ''),
+        'website': tags.get('website', ''),
+    }
+    return row, name, cuisine
+
+def restaurant_result(row, name, cuisine, restaurant_id):
+    return {
+        'id': restaurant_id,
+        'osm_id': row['osm_id'],
+        'name': name,
+        'address': row['address'],
+        'cuisine': cuisine,
+        'lat': row['latitude'],
+        'lon': row['longitude'],
+        'image_url': row['image_url']
+    }
+
+def ndjson_line(obj):
+    return json.dumps(obj, cls=DjangoJSONEncoder) + '\n'
 
 def truncate_string(s, length=100):
     if len(s) > length:
@@ -0,0 +1,22 @@
+from django.contrib import admin
+
+from .models import GeocodeCacheEntry, ImageCacheEntry, OverpassTile
+
+
+@admin.register(GeocodeCacheEntry)
+class GeocodeCacheEntryAdmin(admin.ModelAdmin):
+    list_display = ('query', 'limit', 'created_at', 'expires_at')
+    search_fields = ('query',)
+
+
+@admin.register(ImageCacheEntry)
+class ImageCacheEntryAdmin(admin.ModelAdmin):
+    list_display = ('provider', 'term', 'created_at', 'expires_at')
+    list_filter = ('provider',)
+    search_fields = ('term',)
+
+
+@admin.register(OverpassTile)
+class OverpassTileAdmin(admin.ModelAdmin):
+    list_display = ('selector', 'zoom', 'x', 'y', 'fetch_count', 'hit_count', 'fetched_at', 'expires_at')
+    list_filter = ('selector', 'zoom')
@@ -0,0 +1,16 @@
+from .http import get_client
+
+
+class AviationstackService:
+    """
+    Aviationstack real-time flights API over the shared session.
+    """
+
+    @staticmethod
+    def flights(**params):
+        """
+        Raw `/flights` payload. Empty parameters are dropped; the access key
+        is added by the provider client.
+        """
+        params = {key: value for key, value in params.items() if value not in (None, '')}
+        return get_client('aviationstack').get_json('flights', params=params)
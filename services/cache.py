@@ -0,0 +1,58 @@
+"""
+Small in-process caches used in front of the database-backed provider caches.
+"""
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+MISSING = object()
+
+
+def normalize_query(query):
+    """
+    Case-, whitespace- and diacritic-insensitive form of a search string.
+    """
+    decomposed = unicodedata.normalize("NFKD", query)
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return " ".join(stripped.casefold().split())
+
+
+class LRUCache:
+    """
+    Thread-safe LRU cache with a per-entry TTL. `get` returns MISSING on a
+    miss so that None can be cached (negative caching).
+    """
+
+    def __init__(self, maxsize=1024, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key, MISSING)
+            if item is MISSING:
+                return MISSING
+            value, expires = item
+            if expires <= time.monotonic():
+                del self._data[key]
+                return MISSING
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
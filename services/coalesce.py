@@ -0,0 +1,172 @@
+"""
+Single-flight coalescing for provider calls.
+
+When a city trends, many requests miss the caches at the same moment and each
+would send the same Nominatim, Overpass or Pexels call. A SingleFlight lets
+the first caller for a key (the leader) make the call while identical callers
+in the process wait for its result (or its exception) instead of calling
+upstream themselves.
+
+With COALESCE_CROSS_PROCESS the leader also takes a file lock (fcntl, striped
+by key under COALESCE_LOCK_DIR), so leaders in other workers queue behind it.
+A leader that had to wait calls `recheck` first, which normally reads the
+database cache the previous holder just filled, and only goes upstream when
+that still misses. Waiting is bounded by COALESCE_LOCK_TIMEOUT, after which
+the call proceeds without the lock.
+"""
+import hashlib
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+
+from .cache import MISSING
+
+try:
+    import fcntl
+except ImportError:  # Windows: in-process coalescing only
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+_flights = {}
+_flights_lock = threading.Lock()
+
+
+class SingleFlight:
+    """
+    Share one in-flight call per key between concurrent callers.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "upstream": 0, "coalesced": 0}
+
+    def do(self, key, func, recheck=None):
+        """
+        Result of `func()`, shared with every concurrent `do` for the same key.
+        `recheck` is called by a leader that waited for another process and
+        should return MISSING when the upstream call is still needed.
+        """
+        with self._lock:
+            self._stats["calls"] += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = Future()
+            else:
+                self._stats["coalesced"] += 1
+        if not leader:
+            return call.result()
+
+        try:
+            result = self._lead(key, func, recheck)
+        except BaseException as e:
+            self._finish(key)
+            call.set_exception(e)
+            raise
+        self._finish(key)
+        call.set_result(result)
+        return result
+
+    def _lead(self, key, func, recheck):
+        with _process_lock(self.name, key) as waited:
+            if waited and recheck is not None:
+                result = recheck()
+                if result is not MISSING:
+                    self._count("coalesced")
+                    return result
+            self._count("upstream")
+            return func()
+
+    def _finish(self, key):
+        # Callers arriving after this start a new call, which by then should
+        # find the caches the leader filled.
+        with self._lock:
+            del self._calls[key]
+
+    def _count(self, counter):
+        with self._lock:
+            self._stats[counter] += 1
+
+    def stats(self):
+        with self._lock:
+            snapshot = dict(self._stats)
+        snapshot["coalesced_rate"] = snapshot["coalesced"] / snapshot["calls"] if snapshot["calls"] else 0.0
+        return snapshot
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats = dict.fromkeys(self._stats, 0)
+
+
+def flight(name):
+    """
+    The process-wide SingleFlight called `name`.
+    """
+    with _flights_lock:
+        if name not in _flights:
+            _flights[name] = SingleFlight(name)
+        return _flights[name]
+
+
+def stats():
+    """
+    Per-provider coalescing counters since start-up: calls, upstream (calls
+    that reached the provider), coalesced and coalesced_rate.
+    """
+    with _flights_lock:
+        flights = list(_flights.values())
+    return {single.name: single.stats() for single in flights}
+
+
+def reset_stats():
+    with _flights_lock:
+        flights = list(_flights.values())
+    for single in flights:
+        single.reset_stats()
+
+
+def _lock_path(name, key):
+    digest = hashlib.sha256(f"{name}|{key!r}".encode()).digest()
+    stripe = int.from_bytes(digest[:4], "big") % settings.COALESCE_LOCK_STRIPES
+    return Path(settings.COALESCE_LOCK_DIR) / f"{name}-{stripe}.lock"
+
+
+@contextmanager
+def _process_lock(name, key):
+    """
+    Hold the cross-process lock for (name, key) when enabled. Yields whether
+    the caller had to wait for another holder.
+    """
+    if not settings.COALESCE_CROSS_PROCESS or fcntl is None:
+        yield False
+        return
+
+    path = _lock_path(name, key)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a") as handle:
+        waited = locked = False
+        deadline = time.monotonic() + settings.COALESCE_LOCK_TIMEOUT
+        while True:
+            try:
+                fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                locked = True
+                break
+            except BlockingIOError:
+                waited = True
+                if time.monotonic() >= deadline:
+                    logger.warning("Gave up waiting for %s lock on %r", name, key)
+                    break
+                time.sleep(0.05)
+        try:
+            yield waited
+        finally:
+            if locked:
+                fcntl.flock(handle, fcntl.LOCK_UN)
@@ -0,0 +1,389 @@
+"""
+Local stand-ins for Nominatim, Overpass, Pexels and Aviationstack.
+
+FakeProviders is a small threaded HTTP server that answers each provider's
+endpoints under a path prefix (`/nominatim/search`, `/overpass`,
+`/pexels/search`, `/aviationstack/flights`) with payloads shaped and sized
+like the real ones: ten Nominatim places per search, restaurant and
+attraction nodes spread over the map at city density, Pexels photos with the
+full set of sizes and paged Aviationstack flights. Answers are derived from
+the request and the seed only, so every run sees the same data; latency is
+each provider's typical response time with seeded jitter, scaled by
+`latency_scale`, and `error_rate` turns that share of requests into 503s.
+
+Point the project at it with FAKE_PROVIDERS_URL (see settings), run it with
+`manage.py run_fake_providers`, or start one in-process as
+`benchmark_providers` does.
+"""
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime, time as dt_time, timedelta, timezone as dt_timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+# (mean, jitter) seconds per response, roughly what the public services take
+LATENCY = {
+    "nominatim": (0.35, 0.15),
+    "overpass": (1.2, 0.6),
+    "pexels": (0.2, 0.1),
+    "aviationstack": (0.45, 0.2),
+}
+OVERPASS_LATENCY_PER_ELEMENT = 0.0002  # big answers take longer to build and send
+
+CITIES = {
+    "nairobi": (-1.286389, 36.817223),
+    "mombasa": (-4.043477, 39.668206),
+    "kisumu": (-0.091702, 34.767956),
+    "nakuru": (-0.303099, 36.080026),
+    "kampala": (0.347596, 32.582520),
+    "dar es salaam": (-6.792354, 39.208328),
+    "addis ababa": (9.005401, 38.763611),
+    "london": (51.507351, -0.127758),
+    "paris": (48.856613, 2.352222),
+}
+AIRPORTS = {
+    "NBO": ("Jomo Kenyatta International", "HKJK", "Africa/Nairobi"),
+    "MBA": ("Moi International", "HKMO", "Africa/Nairobi"),
+    "KIS": ("Kisumu International", "HKKI", "Africa/Nairobi"),
+    "EBB": ("Entebbe International", "HUEN", "Africa/Kampala"),
+    "DAR": ("Julius Nyerere International", "HTDA", "Africa/Dar_es_Salaam"),
+    "ADD": ("Addis Ababa Bole International", "HAAB", "Africa/Addis_Ababa"),
+    "JNB": ("OR Tambo International", "FAOR", "Africa/Johannesburg"),
+    "DXB": ("Dubai International", "OMDB", "Asia/Dubai"),
+    "LHR": ("Heathrow", "EGLL", "Europe/London"),
+    "AMS": ("Amsterdam Schiphol", "EHAM", "Europe/Amsterdam"),
+}
+AIRLINES = [("Kenya Airways", "KQ", "KQA"), ("Jambojet", "JM", "JMA"), ("Ethiopian Airlines", "ET", "ETH"),
+            ("Emirates", "EK", "UAE"), ("KLM", "KL", "KLM")]
+CUISINES = ["kenyan", "indian", "italian", "chinese", "ethiopian", "japanese", "thai", "french", "lebanese",
+            "pizza", "burger", "coffee_shop", "seafood", "regional"]
+STREETS = ["Kenyatta Avenue", "Moi Avenue", "Kimathi Street", "Ngong Road", "Waiyaki Way", "Mama Ngina Street",
+           "Muindi Mbingu Street", "Koinange Street", "Riverside Drive", "Argwings Kodhek Road"]
+NAME_PARTS = ["Savanna", "Baobab", "Jacaranda", "Kilimanjaro", "Safari", "Msafiri", "Simba", "Twiga", "Zuri",
+              "Amani", "Karibu", "Jambo", "Sunset", "Highland", "Coast", "Spice", "Ivory", "Acacia"]
+
+# Nodes per 0.01° cell (about 1.1 km square at the equator)
+DENSITY = {"amenity=restaurant": 12, "tourism=attraction": 2}
+CELL = 0.01
+MAX_OVERPASS_CELLS = 20000
+
+_BBOX = re.compile(r'node\["(\w+)"="(\w+)"\]\(([-\d.]+),([-\d.]+),([-\d.]+),([-\d.]+)\)')
+
+
+def _rng(*parts):
+    digest = hashlib.sha256("|".join(map(str, parts)).encode()).digest()
+    return random.Random(int.from_bytes(digest[:8], "big"))
+
+
+def _name(rng, suffix):
+    return f"{rng.choice(NAME_PARTS)} {rng.choice(NAME_PARTS)} {suffix}"
+
+
+def nominatim_search(seed, query, limit):
+    """
+    Nominatim `format=json` search results near the city named in `query`.
+    """
+    text = " ".join(query.casefold().split())
+    rng = _rng(seed, "nominatim", text, limit)
+    city = next((name for name in CITIES if name in text), None)
+    if city is None:
+        if rng.random() < 0.1:
+            return []
+        center = (rng.uniform(-40, 60), rng.uniform(-120, 140))
+        city = text.split(" in ")[-1].title() or "Unknown"
+    else:
+        center = CITIES[city]
+        city = city.title()
+
+    results = []
+    for i in range(limit):
+        lat = center[0] + (rng.random() - 0.5) * 0.08 if i else center[0]
+        lon = center[1] + (rng.random() - 0.5) * 0.08 if i else center[1]
+        name = _name(rng, "Hotel") if "hotel" in text else city
+        osm_id = rng.randint(10 ** 8, 10 ** 10)
+        results.append({
+            "place_id": rng.randint(10 ** 7, 10 ** 9),
+            "licence": "Data © OpenStreetMap contributors, ODbL 1.0. http://osm.org/copyright",
+            "osm_type": "node",
+            "osm_id": osm_id,
+            "lat": f"{lat:.7f}",
+            "lon": f"{lon:.7f}",
+            "class": "tourism" if "hotel" in text else "place",
+            "type": "hotel" if "hotel" in text else "city",
+            "place_rank": 30 if "hotel" in text else 16,
+            "importance": round(0.7 - i * 0.03, 8),
+            "addresstype": "tourism" if "hotel" in text else "city",
+            "name": name,
+            "display_name": f"{name}, {rng.choice(STREETS)}, {city}, {rng.randint(100, 99999):05d}",
+            "boundingbox": [f"{lat - 0.001:.7f}", f"{lat + 0.001:.7f}", f"{lon - 0.001:.7f}", f"{lon + 0.001:.7f}"],
+        })
+    return results
+
+
+def _cell_nodes(seed, key, value, cell_x, cell_y):
+    rng = _rng(seed, "overpass", key, value, cell_x, cell_y)
+    nodes = []
+    for i in range(rng.randint(0, 2 * DENSITY.get(f"{key}={value}", 4))):
+        node_id = int.from_bytes(hashlib.sha256(f"{key}{value}{cell_x},{cell_y},{i}".encode()).digest()[:5], "big")
+        tags = {key: value, "name": _name(rng, "Restaurant" if value == "restaurant" else "Gardens")}
+        if value == "restaurant":
+            tags.update({
+                "cuisine": rng.choice(CUISINES),
+                "addr:street": rng.choice(STREETS),
+                "addr:housenumber": str(rng.randint(1, 400)),
+                "opening_hours": "Mo-Su 11:00-22:00",
+            })
+            if rng.random() < 0.6:
+                tags["phone"] = f"+254 7{rng.randint(10, 99)} {rng.randint(100000, 999999)}"
+            if rng.random() < 0.4:
+                tags["website"] = f"https://{tags['name'].lower().replace(' ', '')}.co.ke"
+        else:
+            tags["wikidata"] = f"Q{rng.randint(10 ** 5, 10 ** 8)}"
+        nodes.append({
+            "type": "node",
+            "id": node_id,
+            "lat": round((cell_y + rng.random()) * CELL, 7),
+            "lon": round((cell_x + rng.random()) * CELL, 7),
+            "tags": tags,
+        })
+    return nodes
+
+
+def overpass_query(seed, query):
+    """
+    Overpass `[out:json]` answer for the bbox union queries built by
+    services.overpass_tiles.
+    """
+    elements = {}
+    cells = 0
+    for key, value, *box in _BBOX.findall(query):
+        south, west, north, east = map(float, box)
+        for cell_y in range(math.floor(south / CELL), math.floor(north / CELL) + 1):
+            for cell_x in range(math.floor(west / CELL), math.floor(east / CELL) + 1):
+                cells += 1
+                if cells > MAX_OVERPASS_CELLS:
+                    raise ValueError("query area too large")
+                for node in _cell_nodes(seed, key, value, cell_x, cell_y):
+                    if south <= node["lat"] <= north and west <= node["lon"] <= east:
+                        elements[node["id"]] = node
+    return {
+        "version": 0.6,
+        "generator": "Overpass API (fake)",
+        "osm3s": {
+            "timestamp_osm_base": "2026-01-01T00:00:00Z",
+            "copyright": "The data included in this document is from www.openstreetmap.org. "
+                         "The data is made available under ODbL.",
+        },
+        "elements": list(elements.values()),
+    }
+
+
+def pexels_search(seed, query, per_page):
+    """
+    Pexels `/v1/search` payload; about one query in twenty has no photos.
+    """
+    rng = _rng(seed, "pexels", query.casefold())
+    total = 0 if rng.random() < 0.05 else rng.randint(1, 8000)
+    photos = []
+    for _ in range(min(per_page, total)):
+        photo_id = rng.randint(10 ** 6, 3 * 10 ** 7)
+        base = f"https://images.pexels.com/photos/{photo_id}/pexels-photo-{photo_id}.jpeg"
+        slug = "-".join(query.casefold().split())
+        photos.append({
+            "id": photo_id,
+            "width": 4000 + rng.randint(0, 2000),
+            "height": 3000 + rng.randint(0, 1500),
+            "url": f"https://www.pexels.com/photo/{slug}-{photo_id}/",
+            "photographer": f"{rng.choice(NAME_PARTS)} {rng.choice(NAME_PARTS)}",
+            "photographer_url": f"https://www.pexels.com/@user-{photo_id % 100000}",
+            "photographer_id": photo_id % 100000,
+            "avg_color": f"#{rng.randint(0, 0xFFFFFF):06X}",
+            "src": {
+                "original": base,
+                "large2x": f"{base}?auto=compress&cs=tinysrgb&dpr=2&h=650&w=940",
+                "large": f"{base}?auto=compress&cs=tinysrgb&h=650&w=940",
+                "medium": f"{base}?auto=compress&cs=tinysrgb&h=350",
+                "small": f"{base}?auto=compress&cs=tinysrgb&h=130",
+                "portrait": f"{base}?auto=compress&cs=tinysrgb&fit=crop&h=1200&w=800",
+                "landscape": f"{base}?auto=compress&cs=tinysrgb&fit=crop&h=627&w=1200",
+                "tiny": f"{base}?auto=compress&cs=tinysrgb&dpr=1&fit=crop&h=200&w=280",
+            },
+            "liked": False,
+            "alt": query,
+        })
+    return {
+        "page": 1,
+        "per_page": per_page,
+        "photos": photos,
+        "total_results": total,
+        "next_page": f"https://api.pexels.com/v1/search/?page=2&per_page={per_page}&query={query}" if total > per_page else None,
+    }
+
+
+def _airport(iata, when):
+    name, icao, tz = AIRPORTS[iata]
+    return {
+        "airport": name, "timezone": tz, "iata": iata, "icao": icao, "terminal": "1", "gate": None,
+        "delay": None, "scheduled": when.isoformat(), "estimated": when.isoformat(),
+        "actual": None, "estimated_runway": None, "actual_runway": None,
+    }
+
+
+def aviationstack_flights(seed, day, dep_iata=None, arr_iata=None, limit=100, offset=0):
+    """
+    One page of Aviationstack `/v1/flights` for a route over the three days
+    from `day`. Routes have a fixed number of flights for the seed.
+    """
+    route = (dep_iata or "*", arr_iata or "*")
+    rng = _rng(seed, "aviationstack", *route, day)
+    total = rng.randint(40, 300) if "*" in route else rng.randint(6, 60)
+    start = datetime.combine(day, dt_time(), tzinfo=dt_timezone.utc)
+    limit = min(max(limit, 1), 100)
+
+    data = []
+    for index in range(offset, min(offset + limit, total)):
+        flight_rng = _rng(seed, "flight", *route, day, index)
+        dep = dep_iata if dep_iata in AIRPORTS else flight_rng.choice(sorted(AIRPORTS))
+        arr = arr_iata if arr_iata in AIRPORTS else flight_rng.choice(sorted(set(AIRPORTS) - {dep}))
+        airline, iata, icao = flight_rng.choice(AIRLINES)
+        # flight_number is the Flight key, so keep numbers unique per route
+        codes = sorted(AIRPORTS)
+        number = str((codes.index(dep) * 10 + codes.index(arr)) * 600 + index + (300 if "*" in route else 0))
+        departure = start + timedelta(minutes=flight_rng.randint(0, 3 * 24 * 60 // 5) * 5)
+        arrival = departure + timedelta(minutes=flight_rng.randint(45, 600))
+        data.append({
+            "flight_date": departure.date().isoformat(),
+            "flight_status": flight_rng.choice(["scheduled"] * 8 + ["active", "landed", "cancelled"]),
+            "departure": _airport(dep, departure),
+            "arrival": _airport(arr, arrival),
+            "airline": {"name": airline, "iata": iata, "icao": icao},
+            "flight": {"number": number, "iata": f"{iata}{number}", "icao": f"{icao}{number}", "codeshared": None},
+            "aircraft": None,
+            "live": None,
+        })
+    return {
+        "pagination": {"limit": limit, "offset": offset, "count": len(data), "total": total},
+        "data": data,
+    }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real providers
+
+    def do_GET(self):
+        fakes = self.server.fakes
+        url = urlsplit(self.path)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        provider, _, path = url.path.strip("/").partition("/")
+        if provider not in LATENCY:
+            return self._send(404, {"error": "unknown provider"})
+
+        fakes.count(provider)
+        if fakes.fails():
+            time.sleep(fakes.latency(provider, self.path) / 4)
+            return self._send(503, {"error": "injected failure"})
+        try:
+            payload = fakes.answer(provider, path, params)
+        except (KeyError, ValueError) as e:
+            return self._send(400, {"error": str(e)})
+        extra = len(payload.get("elements", ())) * OVERPASS_LATENCY_PER_ELEMENT if provider == "overpass" else 0
+        time.sleep(fakes.latency(provider, self.path) + extra * fakes.latency_scale)
+        self._send(200, payload)
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the client timed out
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeProviders:
+    """
+    The fake provider server. Use as a context manager, or start()/stop();
+    `url` is the value for FAKE_PROVIDERS_URL and `requests` counts the
+    requests each provider received.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, latency_scale=1.0, error_rate=0.0, seed=0, day=None):
+        self.latency_scale = latency_scale
+        self.error_rate = error_rate
+        self.seed = seed
+        self.day = day or datetime.now(dt_timezone.utc).date()
+        self.requests = Counter()
+        self._errors = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), _Handler)
+        self._server.daemon_threads = True
+        self._server.fakes = self
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, provider):
+        with self._lock:
+            self.requests[provider] += 1
+
+    def fails(self):
+        with self._lock:
+            return self._errors.random() < self.error_rate
+
+    def latency(self, provider, path):
+        mean, jitter = LATENCY[provider]
+        return max(mean + _rng(self.seed, path).uniform(-jitter, jitter), 0) * self.latency_scale
+
+    def answer(self, provider, path, params):
+        if provider == "nominatim" and path == "search":
+            return nominatim_search(self.seed, params["q"], int(params.get("limit", 10)))
+        if provider == "overpass":
+            return overpass_query(self.seed, params["data"])
+        if provider == "pexels" and path == "search":
+            return pexels_search(self.seed, params["query"], int(params.get("per_page", 15)))
+        if provider == "aviationstack" and path == "flights":
+            return aviationstack_flights(
+                self.seed, self.day, params.get("dep_iata"), params.get("arr_iata"),
+                int(params.get("limit", 100)), int(params.get("offset", 0)),
+            )
+        raise KeyError(f"unknown endpoint {provider}/{path}")
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def provider_settings(providers, url):
+    """
+    A copy of a PROVIDERS setting with every base URL pointed at `url`.
+    """
+    url = url.rstrip("/")
+    return {name: {**config, "base_url": f"{url}/{name}"} for name, config in providers.items()}
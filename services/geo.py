@@ -0,0 +1,178 @@
+"""
+Grid-cell spatial key and "what is near me" filtering.
+
+The world is cut into CELL_SIZE x CELL_SIZE degree cells numbered row by row
+(`row * LON_CELLS + column`), so every latitude band of a bounding box maps to
+one contiguous range of cell ids. A proximity query becomes a handful of index
+range scans on `geo_cell`, an exact lat/lon box check and finally the haversine
+distance on the few rows that are left.
+"""
+import math
+
+from django.db.models import FloatField, Q
+from django.db.models.functions import ASin, Cast, Cos, Power, Radians, Sin, Sqrt
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+EARTH_RADIUS_M = 6371008.8
+CELL_SIZE = 0.01  # degrees, roughly 1.1 km of latitude
+LAT_CELLS = int(180 / CELL_SIZE)
+LON_CELLS = int(360 / CELL_SIZE)
+
+# Above this many latitude bands a single range over the whole band is cheaper
+# than OR-ing one range per band.
+MAX_CELL_RANGES = 120
+
+DEFAULT_RADIUS_M = 5000
+MAX_RADIUS_M = 100000
+
+
+def _row(lat):
+    return min(max(int(math.floor((float(lat) + 90) / CELL_SIZE)), 0), LAT_CELLS - 1)
+
+
+def _column(lon):
+    return min(max(int(math.floor((float(lon) + 180) / CELL_SIZE)), 0), LON_CELLS - 1)
+
+
+def cell_for(lat, lon):
+    """
+    Grid cell id for a coordinate, or None when the coordinate is missing.
+    """
+    if lat is None or lon is None:
+        return None
+    return _row(lat) * LON_CELLS + _column(lon)
+
+
+def bounding_box(lat, lon, radius_m):
+    """
+    (south, west, north, east) of the box that encloses a circle.
+    """
+    dlat = math.degrees(radius_m / EARTH_RADIUS_M)
+    cos_lat = max(math.cos(math.radians(lat)), 1e-6)
+    dlon = min(math.degrees(radius_m / (EARTH_RADIUS_M * cos_lat)), 180)
+    return (
+        max(lat - dlat, -90.0),
+        max(lon - dlon, -180.0),
+        min(lat + dlat, 90.0),
+        min(lon + dlon, 180.0),
+    )
+
+
+def cell_ranges(south, west, north, east):
+    """
+    Inclusive (low, high) cell id ranges covering a bounding box.
+    """
+    first_row, last_row = _row(south), _row(north)
+    first_col, last_col = _column(west), _column(east)
+    if last_row - first_row + 1 > MAX_CELL_RANGES:
+        return [(first_row * LON_CELLS + first_col, last_row * LON_CELLS + last_col)]
+    return [
+        (row * LON_CELLS + first_col, row * LON_CELLS + last_col)
+        for row in range(first_row, last_row + 1)
+    ]
+
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    """
+    Great-circle distance in metres between two coordinates.
+    """
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(min(a, 1.0)))
+
+
+def haversine_expression(lat, lon, lat_field="latitude", lon_field="longitude"):
+    """
+    Database expression for the distance in metres from (lat, lon) to each row.
+    """
+    row_lat = Radians(Cast(lat_field, FloatField()))
+    row_lon = Radians(Cast(lon_field, FloatField()))
+    phi = math.radians(lat)
+    a = (
+        Power(Sin((row_lat - phi) / 2), 2)
+        + math.cos(phi) * Cos(row_lat) * Power(Sin((row_lon - math.radians(lon)) / 2), 2)
+    )
+    return 2 * EARTH_RADIUS_M * ASin(Sqrt(a))
+
+
+def within_box(queryset, south, west, north, east):
+    """
+    Restrict a queryset of GeoIndexedModel rows to a bounding box.
+    """
+    cells = Q()
+    for low, high in cell_ranges(south, west, north, east):
+        cells |= Q(geo_cell__range=(low, high))
+    return queryset.filter(
+        cells,
+        latitude__range=(south, north),
+        longitude__range=(west, east),
+    )
+
+
+def nearby(queryset, lat, lon, radius_m):
+    """
+    Rows within `radius_m` metres of (lat, lon), nearest first, annotated with `distance`.
+    """
+    box = bounding_box(lat, lon, radius_m)
+    return (
+        within_box(queryset, *box)
+        .annotate(distance=haversine_expression(lat, lon))
+        .filter(distance__lte=radius_m)
+        .order_by("distance")
+    )
+
+
+def in_bbox(queryset, south, west, north, east):
+    """
+    Rows inside a bounding box, ordered by distance from its centre.
+    """
+    centre_lat, centre_lon = (south + north) / 2, (west + east) / 2
+    return (
+        within_box(queryset, south, west, north, east)
+        .annotate(distance=haversine_expression(centre_lat, centre_lon))
+        .order_by("distance")
+    )
+
+
+def _parse_float(value, name, low, high):
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ValidationError({name: "Must be a number."})
+    if not math.isfinite(number) or not low <= number <= high:
+        raise ValidationError({name: f"Must be between {low} and {high}."})
+    return number
+
+
+class ProximityFilter(BaseFilterBackend):
+    """
+    `?lat=&lon=&radius=` (metres) returns rows within the radius, nearest first.
+    `?bbox=west,south,east,north` returns rows inside the box, nearest to its centre first.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+
+        bbox = params.get("bbox")
+        if bbox:
+            parts = bbox.split(",")
+            if len(parts) != 4:
+                raise ValidationError({"bbox": "Expected west,south,east,north."})
+            west = _parse_float(parts[0], "bbox", -180, 180)
+            south = _parse_float(parts[1], "bbox", -90, 90)
+            east = _parse_float(parts[2], "bbox", -180, 180)
+            north = _parse_float(parts[3], "bbox", -90, 90)
+            if south > north or west > east:
+                raise ValidationError({"bbox": "Expected west,south,east,north."})
+            return in_bbox(queryset, south, west, north, east)
+
+        if "lat" in params or "lon" in params:
+            lat = _parse_float(params.get("lat"), "lat", -90, 90)
+            lon = _parse_float(params.get("lon"), "lon", -180, 180)
+            radius = _parse_float(params.get("radius", DEFAULT_RADIUS_M), "radius", 1, MAX_RADIUS_M)
+            return nearby(queryset, lat, lon, radius)
+
+        return queryset
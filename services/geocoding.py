@@ -0,0 +1,105 @@
+"""
+Cached Nominatim lookups.
+
+Queries are normalized (case, whitespace and diacritics folded) so that
+"Nairobi", " nairobi " and "NAIROBÍ" share one entry. Lookups go through an
+in-process LRU, then the GeocodeCacheEntry table, and only reach Nominatim
+(about 1 request/second under its usage policy) when both miss or expired.
+Misses are cached too, for a shorter time. Concurrent misses for the same key
+share one upstream call (services.coalesce), and expired entries are served
+while they are refreshed in the background (services.revalidate).
+"""
+import hashlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from . import revalidate
+from .cache import MISSING, LRUCache, normalize_query
+from .coalesce import flight
+from .models import GeocodeCacheEntry
+from .osm_service import OpenStreetMapService
+
+_memory = LRUCache(
+    maxsize=settings.GEOCODE_MEMORY_CACHE_SIZE,
+    ttl=settings.GEOCODE_MEMORY_CACHE_TTL,
+)
+
+
+def cache_key(query, limit):
+    normalized = normalize_query(query)
+    return hashlib.sha256(f"{limit}|{normalized}".encode()).hexdigest()
+
+
+def search(query, limit=10):
+    """
+    Nominatim search results for `query`, served from cache when possible.
+    """
+    key = cache_key(query, limit)
+
+    results = _memory.get(key)
+    if results is not MISSING:
+        return results
+
+    now = timezone.now()
+    entry = GeocodeCacheEntry.objects.filter(
+        query_key=key, expires_at__gt=revalidate.oldest_servable(now)
+    ).first()
+    if entry is not None:
+        if entry.expires_at > now:
+            _memory.set(key, entry.results, ttl=(entry.expires_at - now).total_seconds())
+        else:
+            revalidate.refresh(("nominatim", key), lambda: _coalesced_fetch(query, limit, key))
+        return entry.results
+
+    return _coalesced_fetch(query, limit, key)
+
+
+def _coalesced_fetch(query, limit, key):
+    return flight("nominatim").do(
+        key, lambda: _fetch(query, limit, key), recheck=lambda: _stored(key)
+    )
+
+
+def _stored(key):
+    now = timezone.now()
+    entry = GeocodeCacheEntry.objects.filter(query_key=key, expires_at__gt=now).first()
+    if entry is None:
+        return MISSING
+    _memory.set(key, entry.results, ttl=(entry.expires_at - now).total_seconds())
+    return entry.results
+
+
+def _fetch(query, limit, key):
+    results = OpenStreetMapService.search_locations(query, limit=limit)
+    now = timezone.now()
+    ttl = settings.GEOCODE_CACHE_TTL if results else settings.GEOCODE_NEGATIVE_CACHE_TTL
+    GeocodeCacheEntry.objects.update_or_create(
+        query_key=key,
+        defaults={
+            "query": normalize_query(query),
+            "limit": limit,
+            "results": results,
+            "expires_at": now + timedelta(seconds=ttl),
+        },
+    )
+    _memory.set(key, results, ttl=ttl)
+    return results
+
+
+def geocode(query):
+    """
+    Coordinates of the best match for `query`, or None when nothing matches.
+    """
+    results = search(query, limit=1)
+    if not results:
+        return None
+    return {
+        "lat": float(results[0]["lat"]),
+        "lon": float(results[0]["lon"]),
+    }
+
+
+def clear_memory_cache():
+    _memory.clear()
@@ -0,0 +1,240 @@
+"""
+One pooled, keep-alive HTTP session per external provider.
+
+Sessions are created lazily from `settings.PROVIDERS` and shared by every
+thread in the process, so repeated calls to the same host reuse TCP/TLS
+connections. Each session applies the provider's timeout, retries idempotent
+requests with exponential backoff and caches successful responses for the
+provider's `cache_ttl` through requests-cache.
+
+Every client also has a circuit breaker: after `breaker_failures` failed calls
+in a row (connection errors, timeouts, 429 and 5xx answers) the provider is
+considered down and calls raise ProviderUnavailable straight away for
+`breaker_reset` seconds, after which one trial call decides whether it closes
+again.
+"""
+import threading
+import time
+from pathlib import Path
+
+import requests
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from requests.adapters import HTTPAdapter
+from requests_cache import CachedSession
+from urllib3.util.retry import Retry
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class ProviderUnavailable(requests.RequestException):
+    """
+    Raised instead of calling a provider whose circuit breaker is open.
+    `retry_after` is the number of seconds until the next trial call.
+    """
+
+    def __init__(self, *args, retry_after=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Closed until `failure_threshold` consecutive failures, then open (calls
+    fail fast) for `reset_timeout` seconds, then half-open: the next call is a
+    trial that closes the breaker on success and re-opens it on failure.
+    """
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    def _state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def before_call(self):
+        """
+        Raise ProviderUnavailable unless a call may go through now.
+        """
+        with self._lock:
+            state = self._state()
+            if state == "closed":
+                return
+            if state == "half_open" and not self._trial:
+                self._trial = True
+                return
+            retry_after = max(self.reset_timeout - (time.monotonic() - self.opened_at), 0)
+        raise ProviderUnavailable(f"{self.name} is unavailable", retry_after=retry_after)
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._trial = False
+
+    def stats(self):
+        with self._lock:
+            return {"state": self._state(), "failures": self.failures}
+
+
+class ProviderClient:
+    """
+    Thin wrapper around a requests session bound to one provider's base URL.
+    """
+
+    def __init__(self, name, base_url, timeout=10, retries=2, backoff=0.5,
+                 cache_ttl=0, pool_size=10, headers=None, params=None,
+                 breaker_failures=5, breaker_reset=30):
+        self.name = name
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.cache_ttl = cache_ttl
+        self.pool_size = pool_size
+        self.headers = headers or {}
+        self.params = params or {}
+        self.breaker = CircuitBreaker(name, breaker_failures, breaker_reset)
+        self._session = None
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    self._session = self._build_session()
+        return self._session
+
+    def _build_session(self):
+        backend = settings.HTTP_CACHE_BACKEND
+        cache_name = self.name
+        if backend == "sqlite":
+            cache_dir = Path(settings.HTTP_CACHE_DIR)
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            cache_name = str(cache_dir / self.name)
+
+        session = CachedSession(
+            cache_name=cache_name,
+            backend=backend,
+            expire_after=self.cache_ttl,
+            allowable_codes=(200,),
+            # cache_ttl=0 means "never cache" for this provider
+            disabled=not self.cache_ttl,
+        )
+        retry = Retry(
+            total=self.retries,
+            backoff_factor=self.backoff,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset({"GET", "HEAD"}),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=self.pool_size, max_retries=retry
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.headers.update(self.headers)
+        return session
+
+    def url(self, path=""):
+        return f"{self.base_url}/{path.lstrip('/')}" if path else self.base_url
+
+    def get(self, path="", params=None, headers=None, timeout=None):
+        """
+        GET `path` relative to the provider's base URL. Returns the response
+        without raising on HTTP errors; callers decide what a failure means.
+        Raises ProviderUnavailable while the provider's breaker is open.
+        """
+        self.breaker.before_call()
+        try:
+            response = self.session.get(
+                self.url(path),
+                params={**self.params, **(params or {})},
+                headers=headers,
+                timeout=timeout or self.timeout,
+            )
+        except Exception:
+            # Anything the session raises (cache backend errors included)
+            # counts, so a failed half-open trial never leaves the breaker stuck
+            self.breaker.record_failure()
+            raise
+        if response.status_code in RETRY_STATUSES:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return response
+
+    def get_json(self, path="", params=None, headers=None, timeout=None):
+        """
+        GET and decode JSON, raising requests.HTTPError for non-2xx responses.
+        """
+        response = self.get(path, params=params, headers=headers, timeout=timeout)
+        response.raise_for_status()
+        return response.json()
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(name):
+    """
+    The shared ProviderClient for a provider configured in settings.PROVIDERS.
+    """
+    client = _clients.get(name)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(name)
+            if client is None:
+                client = _clients[name] = ProviderClient(name, **settings.PROVIDERS[name])
+    return client
+
+
+def breaker_stats():
+    """
+    Circuit breaker state of every provider client created in this process.
+    """
+    with _clients_lock:
+        clients = list(_clients.values())
+    return {client.name: client.breaker.stats() for client in clients}
+
+
+def reset_clients():
+    """
+    Drop all shared sessions, e.g. after settings.PROVIDERS changes in tests.
+    """
+    with _clients_lock:
+        for client in _clients.values():
+            if client._session is not None:
+                client._session.close()
+        _clients.clear()
+
+
+@receiver(setting_changed)
+def _reset_on_settings_change(setting, **kwargs):
+    if setting in ("PROVIDERS", "HTTP_CACHE_BACKEND", "HTTP_CACHE_DIR"):
+        reset_clients()
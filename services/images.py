@@ -0,0 +1,110 @@
+"""
+Shared image-URL cache in front of Pexels.
+
+Hotels, restaurants and attractions all resolve "search term -> photo" through
+`image_urls`. Terms are normalized, checked against an in-process LRU, then
+looked up in the ImageCacheEntry table with a single query, and only the
+distinct terms still missing go to Pexels (concurrently, under the batch
+deadline). Successful lookups, including "no photo found", are written back
+in one batched upsert; failed calls are not cached. Expired entries are
+served while they are refreshed in the background (services.revalidate).
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from . import revalidate
+from .cache import MISSING, LRUCache, normalize_query
+from .models import ImageCacheEntry
+from .pexels_service import PexelsService
+
+PROVIDER = "pexels"
+
+_memory = LRUCache(
+    maxsize=settings.IMAGE_MEMORY_CACHE_SIZE,
+    ttl=settings.IMAGE_MEMORY_CACHE_TTL,
+)
+
+
+def _term(query):
+    return normalize_query(query)[:255]
+
+
+def photo_srcs(queries):
+    """
+    {query: src dict} for every query whose lookup succeeded (from cache or
+    Pexels). Queries whose upstream call failed or timed out are left out.
+    """
+    terms = {query: _term(query) for query in queries}
+    srcs_by_term = {}
+
+    missing = set()
+    for term in set(terms.values()):
+        src = _memory.get((PROVIDER, term))
+        if src is MISSING:
+            missing.add(term)
+        else:
+            srcs_by_term[term] = src
+
+    now = timezone.now()
+    stale = set()
+    if missing:
+        entries = ImageCacheEntry.objects.filter(
+            provider=PROVIDER, term__in=missing, expires_at__gt=revalidate.oldest_servable(now)
+        ).values_list("term", "src", "expires_at")
+        for term, src, expires_at in entries:
+            srcs_by_term[term] = src
+            missing.discard(term)
+            if expires_at > now:
+                _memory.set((PROVIDER, term), src, ttl=(expires_at - now).total_seconds())
+            else:
+                stale.add(term)
+
+    if PexelsService.is_configured():
+        if stale:
+            stale = sorted(stale)
+            revalidate.refresh((PROVIDER, tuple(stale)), lambda: _fetch(stale))
+        if missing:
+            srcs_by_term.update(_fetch(sorted(missing)))
+
+    return {query: srcs_by_term[term] for query, term in terms.items() if term in srcs_by_term}
+
+
+def _fetch(terms):
+    """
+    Look terms up on Pexels and store the answers; returns {term: src} for
+    the lookups that succeeded.
+    """
+    now = timezone.now()
+    fetched = PexelsService.photo_srcs(terms)
+    new_entries = []
+    for term, src in fetched.items():
+        ttl = settings.IMAGE_CACHE_TTL if src else settings.IMAGE_NEGATIVE_CACHE_TTL
+        _memory.set((PROVIDER, term), src, ttl=ttl)
+        new_entries.append(ImageCacheEntry(
+            provider=PROVIDER, term=term, src=src, expires_at=now + timedelta(seconds=ttl)
+        ))
+    ImageCacheEntry.objects.bulk_create(
+        new_entries,
+        update_conflicts=True,
+        unique_fields=["provider", "term"],
+        update_fields=["src", "created_at", "expires_at"],
+    )
+    return fetched
+
+
+def image_urls(queries, size="original"):
+    """
+    {query: url or None} for the given photo size.
+    """
+    srcs = photo_srcs(queries)
+    return {query: srcs.get(query, {}).get(size) for query in queries}
+
+
+def image_url(query, size="original"):
+    return image_urls([query], size)[query]
+
+
+def clear_memory_cache():
+    _memory.clear()
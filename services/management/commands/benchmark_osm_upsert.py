@@ -0,0 +1,77 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from restaurants.models import Restaurant
+from restaurants.views import RESTAURANT_UPDATE_FIELDS
+from services.osm_ingest import upsert_rows
+
+
+class _Rollback(Exception):
+    pass
+
+
+def synthetic_rows(count, offset=0):
+    return [
+        {
+            'osm_id': f'bench-{offset + i}',
+            'name': f'Benchmark Restaurant {i}',
+            'address': f'{i} Benchmark Street',
+            'latitude': -1.28 + (i % 1000) * 0.0001,
+            'longitude': 36.81 + (i // 1000) * 0.0001,
+            'cuisine': ('kenyan', 'indian', 'italian', 'chinese')[i % 4],
+            'phone': '',
+            'website': '',
+            'image_url': '',
+        }
+        for i in range(count)
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Compare per-element update_or_create with the batched OSM upsert (query count and wall time)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=10000, help='Number of synthetic Overpass elements')
+        parser.add_argument('--skip-legacy', action='store_true', help='Only run the batched upsert')
+
+    def measure(self, label, func):
+        queries = 0
+
+        def count_queries(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(count_queries):
+            started = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - started
+        self.stdout.write(f'{label:<32} {queries:>8} queries {elapsed:>9.3f}s')
+
+    def handle(self, *args, **options):
+        rows = synthetic_rows(options['count'])
+
+        def legacy():
+            for row in rows:
+                defaults = {k: v for k, v in row.items() if k != 'osm_id'}
+                Restaurant.objects.update_or_create(osm_id=row['osm_id'], defaults=defaults)
+
+        def batched():
+            upsert_rows(Restaurant, rows, update_fields=RESTAURANT_UPDATE_FIELDS)
+
+        self.stdout.write(f'{options["count"]} elements on {connection.vendor}')
+        # Everything runs in one transaction that is rolled back at the end,
+        # so the benchmark leaves no rows behind.
+        try:
+            with transaction.atomic():
+                if not options['skip_legacy']:
+                    self.measure('update_or_create (insert)', legacy)
+                    self.measure('update_or_create (update)', legacy)
+                    Restaurant.objects.filter(osm_id__startswith='bench-').delete()
+                self.measure('bulk upsert (insert)', batched)
+                self.measure('bulk upsert (update)', batched)
+                raise _Rollback
+        except _Rollback:
+            pass
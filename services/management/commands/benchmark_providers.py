@@ -0,0 +1,84 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import override_settings
+from rest_framework.test import APIRequestFactory
+
+from attractions.sync import fetch_osm_attractions
+from bookings.views import fetch_flights
+from hotels.views import HotelViewSet
+from restaurants.views import RestaurantViewSet
+from services import coalesce, geocoding, images
+from services.fakes import CITIES, FakeProviders, provider_settings
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Time the provider-backed endpoints cold and warm against the local fake providers, offline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--location', default='Nairobi', help=f'One of: {", ".join(sorted(CITIES))}')
+        parser.add_argument('--route', default='NBO-MBA', help='DEP-ARR for fetch_flights')
+        parser.add_argument('--latency-scale', type=float, default=1.0, help='Multiplier for provider latencies')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        location = options['location']
+        lat, lon = CITIES[location.casefold()]
+        dep_iata, arr_iata = options['route'].upper().split('-')
+        factory = APIRequestFactory()
+        hotels = HotelViewSet.as_view({'get': 'search_locations'})
+        restaurants = RestaurantViewSet.as_view({'get': 'fetch_restaurants'})
+        radius = settings.ATTRACTION_SYNC_AREAS.get(location.casefold(), {}).get('radius', 10000)
+
+        steps = [
+            ('search_locations', lambda: hotels(factory.get('/', {'query': location}))),
+            ('fetch_restaurants', lambda: restaurants(factory.get('/', {'location': location}))),
+            ('fetch_osm_attractions', lambda: fetch_osm_attractions(lat, lon, radius)),
+            ('fetch_flights', lambda: fetch_flights(factory.get('/', {'dep_iata': dep_iata, 'arr_iata': arr_iata}))),
+        ]
+
+        with FakeProviders(latency_scale=options['latency_scale'], seed=options['seed']) as fakes, override_settings(
+            PROVIDERS=provider_settings(settings.PROVIDERS, fakes.url),
+            # a fresh in-memory HTTP cache per run keeps runs comparable
+            HTTP_CACHE_BACKEND='memory',
+            PEXELS_API_KEY=settings.PEXELS_API_KEY or 'benchmark',
+        ):
+            self.stdout.write(
+                f'{location} ({lat}, {lon}), route {dep_iata}-{arr_iata}, latency x{options["latency_scale"]}, '
+                f'seed {options["seed"]}, {connection.vendor}'
+            )
+            geocoding.clear_memory_cache()
+            images.clear_memory_cache()
+            coalesce.reset_stats()
+            # Everything runs in one transaction that is rolled back at the
+            # end, so every run starts from the same empty caches.
+            try:
+                with transaction.atomic():
+                    for label, step in steps:
+                        for run in ('cold', 'warm'):
+                            self.measure(f'{label} ({run})', step, fakes)
+                    raise _Rollback
+            except _Rollback:
+                pass
+
+    def measure(self, label, step, fakes):
+        before = dict(fakes.requests)
+        started = time.perf_counter()
+        result = step()
+        elapsed = time.perf_counter() - started
+        if hasattr(result, 'render'):
+            size = len(result.render().content)
+            outcome = f'HTTP {result.status_code} {size / 1024:>6.0f} KB'
+        else:
+            outcome = f'{result} rows'
+        upstream = ', '.join(
+            f'{name} {count - before.get(name, 0)}' for name, count in sorted(fakes.requests.items())
+            if count > before.get(name, 0)
+        )
+        self.stdout.write(f'{label:<30} {elapsed * 1000:>9.1f} ms  {outcome:<20} upstream: {upstream or "none"}')
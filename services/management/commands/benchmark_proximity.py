@@ -0,0 +1,75 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from attractions.models import Attraction
+from services.geo import cell_for, haversine_expression, nearby
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Time indexed ?lat=&lon=&radius= queries against a large synthetic Attraction table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000000, help='Synthetic attractions to insert')
+        parser.add_argument('--queries', type=int, default=200, help='Radius queries to time')
+        parser.add_argument('--radius', type=int, default=5000, help='Query radius in metres')
+        parser.add_argument('--scan-queries', type=int, default=3, help='Unindexed full-scan queries to time for comparison')
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        # Roughly the extent of Kenya, so the density is realistic for one country.
+        south, west, north, east = -4.7, 33.9, 5.0, 41.9
+
+        try:
+            with transaction.atomic():
+                started = time.perf_counter()
+                batch = []
+                for i in range(options['rows']):
+                    lat, lon = rng.uniform(south, north), rng.uniform(west, east)
+                    batch.append(Attraction(
+                        osm_id=-(i + 1), name=f'Benchmark {i}', latitude=lat, longitude=lon,
+                        category='attraction', geo_cell=cell_for(lat, lon),
+                    ))
+                    if len(batch) == 5000:
+                        Attraction.objects.bulk_create(batch)
+                        batch = []
+                Attraction.objects.bulk_create(batch)
+                self.stdout.write(f'Inserted {options["rows"]} rows in {time.perf_counter() - started:.1f}s')
+
+                timings, hits = [], 0
+                for _ in range(options['queries']):
+                    lat, lon = rng.uniform(south, north), rng.uniform(west, east)
+                    started = time.perf_counter()
+                    hits += len(list(nearby(Attraction.objects.all(), lat, lon, options['radius'])))
+                    timings.append((time.perf_counter() - started) * 1000)
+                timings.sort()
+                p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+                self.stdout.write(
+                    f'indexed:   {options["queries"]} queries, {hits / options["queries"]:.0f} rows avg, '
+                    f'p50 {statistics.median(timings):.2f}ms p99 {p99:.2f}ms'
+                )
+
+                if options['scan_queries']:
+                    timings = []
+                    for _ in range(options['scan_queries']):
+                        lat, lon = rng.uniform(south, north), rng.uniform(west, east)
+                        started = time.perf_counter()
+                        list(
+                            Attraction.objects.annotate(distance=haversine_expression(lat, lon))
+                            .filter(distance__lte=options['radius']).order_by('distance')
+                        )
+                        timings.append((time.perf_counter() - started) * 1000)
+                    self.stdout.write(
+                        f'full scan: {options["scan_queries"]} queries, '
+                        f'p50 {statistics.median(timings):.2f}ms max {max(timings):.2f}ms'
+                    )
+                raise _Rollback
+        except _Rollback:
+            pass
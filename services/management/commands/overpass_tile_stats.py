@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from services.models import OverpassTile
+
+
+class Command(BaseCommand):
+    help = 'Report Overpass tile cache size, upstream fetches and reuse rate per selector'
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        rows = (
+            OverpassTile.objects.values('selector', 'zoom')
+            .annotate(tiles=Count('id'), fetches=Sum('fetch_count'), hits=Sum('hit_count'))
+            .order_by('selector', 'zoom')
+        )
+        if not rows:
+            self.stdout.write('No Overpass tiles cached yet')
+        for row in rows:
+            fresh = OverpassTile.objects.filter(
+                selector=row['selector'], zoom=row['zoom'], expires_at__gt=now
+            ).count()
+            served = row['fetches'] + row['hits']
+            self.stdout.write(
+                f"{row['selector']} z{row['zoom']}: {row['tiles']} tiles ({fresh} fresh), "
+                f"{row['fetches']} upstream tile fetches, {row['hits']} reused, "
+                f"reuse rate {row['hits'] / served:.1%}"
+            )
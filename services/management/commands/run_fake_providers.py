@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from services.fakes import FakeProviders
+
+
+class Command(BaseCommand):
+    help = 'Serve local stand-ins for Nominatim, Overpass, Pexels and Aviationstack (see services/fakes.py)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8900)
+        parser.add_argument('--latency-scale', type=float, default=1.0,
+                            help='Multiplier for the simulated provider latencies, 0 to answer at once')
+        parser.add_argument('--error-rate', type=float, default=0.0, help='Share of requests answered with 503')
+        parser.add_argument('--seed', type=int, default=0, help='Seed for payloads, latency jitter and errors')
+
+    def handle(self, *args, **options):
+        fakes = FakeProviders(
+            options['host'], options['port'], latency_scale=options['latency_scale'],
+            error_rate=options['error_rate'], seed=options['seed'],
+        )
+        self.stdout.write(f'Fake providers on {fakes.url}, start the app with FAKE_PROVIDERS_URL={fakes.url}')
+        try:
+            fakes.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            fakes.stop()
+            self.stdout.write(', '.join(f'{name}: {count}' for name, count in sorted(fakes.requests.items()))
+                              or 'No requests served')
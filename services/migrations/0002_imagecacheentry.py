@@ -0,0 +1,28 @@
+# Generated by Django 5.1.7 on 2026-10-18 17:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageCacheEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('provider', models.CharField(max_length=20)),
+                ('term', models.CharField(max_length=255)),
+                ('src', models.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField(auto_now=True)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'verbose_name_plural': 'image cache entries',
+                'constraints': [models.UniqueConstraint(fields=('provider', 'term'), name='unique_image_cache_term')],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.1.7 on 2026-10-18 17:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0002_imagecacheentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OverpassTile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('selector', models.CharField(max_length=200)),
+                ('zoom', models.PositiveSmallIntegerField()),
+                ('x', models.PositiveIntegerField()),
+                ('y', models.PositiveIntegerField()),
+                ('elements', models.JSONField(blank=True, default=list)),
+                ('fetched_at', models.DateTimeField(auto_now=True)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+                ('fetch_count', models.PositiveIntegerField(default=1)),
+                ('hit_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('selector', 'zoom', 'x', 'y'), name='unique_overpass_tile')],
+            },
+        ),
+    ]
@@ -0,0 +1,90 @@
+from django.db import models
+
+from .geo import cell_for
+
+
+class GeoIndexedModel(models.Model):
+    """
+    Abstract base for models with `latitude`/`longitude` columns. Keeps an
+    indexed grid-cell key in sync so proximity queries can use an index.
+    """
+    geo_cell = models.BigIntegerField(null=True, blank=True, editable=False, db_index=True)
+
+    class Meta:
+        abstract = True
+
+    def update_geo_cell(self):
+        self.geo_cell = cell_for(self.latitude, self.longitude)
+
+    def save(self, *args, **kwargs):
+        self.update_geo_cell()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and ('latitude' in update_fields or 'longitude' in update_fields):
+            kwargs['update_fields'] = {*update_fields, 'geo_cell'}
+        super().save(*args, **kwargs)
+
+
+class GeocodeCacheEntry(models.Model):
+    """
+    Persisted Nominatim search results, keyed on the normalized query and
+    result limit. An empty `results` list is a cached miss.
+    """
+    query_key = models.CharField(max_length=64, unique=True)
+    query = models.TextField()
+    limit = models.PositiveSmallIntegerField(default=1)
+    results = models.JSONField(default=list, blank=True)
+    created_at = models.DateTimeField(auto_now=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        verbose_name_plural = 'geocode cache entries'
+
+    def __str__(self):
+        return f"{self.query} ({len(self.results)} results)"
+
+
+class ImageCacheEntry(models.Model):
+    """
+    Photo lookup results shared by hotels, restaurants and attractions, keyed
+    on provider and normalized search term. `src` maps size names to URLs; an
+    empty dict is a cached "no photo found".
+    """
+    provider = models.CharField(max_length=20)
+    term = models.CharField(max_length=255)
+    src = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        verbose_name_plural = 'image cache entries'
+        constraints = [
+            models.UniqueConstraint(fields=['provider', 'term'], name='unique_image_cache_term'),
+        ]
+
+    def __str__(self):
+        return f"{self.provider}: {self.term}"
+
+
+class OverpassTile(models.Model):
+    """
+    Overpass elements matching `selector` inside one slippy-map tile
+    (zoom/x/y). Radius searches are assembled from these tiles so overlapping
+    searches share upstream work.
+    """
+    selector = models.CharField(max_length=200)
+    zoom = models.PositiveSmallIntegerField()
+    x = models.PositiveIntegerField()
+    y = models.PositiveIntegerField()
+    elements = models.JSONField(default=list, blank=True)
+    fetched_at = models.DateTimeField(auto_now=True)
+    expires_at = models.DateTimeField(db_index=True)
+    fetch_count = models.PositiveIntegerField(default=1)
+    hit_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['selector', 'zoom', 'x', 'y'], name='unique_overpass_tile'),
+        ]
+
+    def __str__(self):
+        return f"{self.selector} {self.zoom}/{self.x}/{self.y}"
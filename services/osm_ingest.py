@@ -0,0 +1,62 @@
+"""
+Batched upserts for rows ingested from external providers (Overpass, Nominatim).
+
+Every ingest path builds plain dicts keyed on the provider id and hands them to
+`upsert_rows`, which writes them with `bulk_create(update_conflicts=True)` in
+chunks inside a single transaction: one INSERT ... ON CONFLICT per chunk instead
+of a SELECT plus INSERT/UPDATE per element.
+"""
+from django.db import transaction
+
+from .models import GeoIndexedModel
+
+BATCH_SIZE = 500
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def upsert_rows(model, rows, update_fields, unique_field="osm_id", batch_size=BATCH_SIZE):
+    """
+    Insert or update `rows` (dicts of field values) keyed on `unique_field`.
+
+    Only `update_fields` are overwritten when a row already exists, so columns
+    edited locally (prices, ratings, ...) survive a re-import. Duplicate keys in
+    the input are collapsed, last one wins. Returns the number of rows written.
+    """
+    by_key = {}
+    for row in rows:
+        by_key[row[unique_field]] = row
+    objs = [model(**row) for row in by_key.values()]
+
+    # bulk_create bypasses save(), so keep the spatial key in step here
+    if issubclass(model, GeoIndexedModel):
+        for obj in objs:
+            obj.update_geo_cell()
+        if "latitude" in update_fields or "longitude" in update_fields:
+            update_fields = [*update_fields, "geo_cell"]
+
+    with transaction.atomic():
+        for chunk in _chunks(objs, batch_size):
+            model.objects.bulk_create(
+                chunk,
+                update_conflicts=True,
+                unique_fields=[unique_field],
+                update_fields=update_fields,
+            )
+    return len(objs)
+
+
+def values_by_key(model, keys, field, unique_field="osm_id", batch_size=BATCH_SIZE):
+    """
+    Map each existing key to the current value of `field`, in chunked queries.
+    """
+    keys = list(keys)
+    values = {}
+    for chunk in _chunks(keys, batch_size):
+        values.update(
+            model.objects.filter(**{f"{unique_field}__in": chunk}).values_list(unique_field, field)
+        )
+    return values
@@ -0,0 +1,38 @@
+from .http import get_client
+
+
+class OpenStreetMapService:
+    """
+    Nominatim geocoding/search and Overpass queries over the shared sessions.
+    """
+
+    @staticmethod
+    def search_locations(query, limit=10):
+        """
+        Nominatim search results (list of dicts) for a free-text query.
+        """
+        return get_client('nominatim').get_json('search', params={
+            'q': query,
+            'format': 'json',
+            'limit': limit,
+        })
+
+    @classmethod
+    def geocode(cls, query):
+        """
+        Coordinates of the best Nominatim match, or None when nothing matches.
+        """
+        results = cls.search_locations(query, limit=1)
+        if not results:
+            return None
+        return {
+            'lat': float(results[0]['lat']),
+            'lon': float(results[0]['lon']),
+        }
+
+    @staticmethod
+    def overpass(query):
+        """
+        Run an Overpass QL query and return the decoded JSON payload.
+        """
+        return get_client('overpass').get_json(params={'data': query})
@@ -0,0 +1,226 @@
+"""
+Tile-based Overpass cache.
+
+Instead of sending an `around:` query built from the exact search centre, a
+radius search is mapped onto the fixed slippy-map tiles (z/x/y) that cover it.
+Fresh tiles come from the OverpassTile table; all missing tiles are fetched
+in one union query, split back into tiles locally and stored with an expiry.
+The answer is then assembled from the tiles and trimmed to the radius, so
+"Nairobi" and "Nairobi CBD" reuse almost all of each other's work. Concurrent
+searches missing the same tiles share one upstream call (services.coalesce).
+Expired tiles are served while they are refreshed in the background
+(services.revalidate); only tiles never fetched, or too old to serve, make
+the request wait for Overpass.
+"""
+import logging
+import math
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from . import revalidate
+from .cache import MISSING
+from .coalesce import flight
+from .geo import bounding_box, haversine_m
+from .models import OverpassTile
+from .osm_service import OpenStreetMapService
+
+logger = logging.getLogger(__name__)
+
+RESTAURANTS = 'node["amenity"="restaurant"]'
+ATTRACTIONS = 'node["tourism"="attraction"]'
+
+MAX_LAT = 85.05112878
+
+# Per-process counters, see stats()
+_stats = {"requests": 0, "tile_hits": 0, "tile_stale": 0, "tile_misses": 0, "upstream_calls": 0}
+_stats_lock = threading.Lock()
+
+
+def tile_for(lat, lon, zoom):
+    """
+    Slippy-map (x, y) of the tile containing a coordinate.
+    """
+    lat = min(max(lat, -MAX_LAT), MAX_LAT)
+    n = 2 ** zoom
+    x = int((lon + 180.0) / 360.0 * n)
+    phi = math.radians(lat)
+    y = int((1.0 - math.asinh(math.tan(phi)) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def tile_bounds(x, y, zoom):
+    """
+    (south, west, north, east) of a tile.
+    """
+    n = 2 ** zoom
+
+    def lat(row):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / n))))
+
+    return lat(y + 1), x / n * 360.0 - 180.0, lat(y), (x + 1) / n * 360.0 - 180.0
+
+
+def tiles_for_radius(lat, lon, radius_m, zoom):
+    """
+    Every tile that intersects the box enclosing a circle.
+    """
+    south, west, north, east = bounding_box(lat, lon, radius_m)
+    min_x, min_y = tile_for(north, west, zoom)
+    max_x, max_y = tile_for(south, east, zoom)
+    return [(x, y) for x in range(min_x, max_x + 1) for y in range(min_y, max_y + 1)]
+
+
+def _union_query(selector, tiles, zoom):
+    parts = "".join(
+        "{selector}({:.7f},{:.7f},{:.7f},{:.7f});".format(*tile_bounds(x, y, zoom), selector=selector)
+        for x, y in tiles
+    )
+    return f"[out:json][timeout:60];({parts});out body;"
+
+
+def _fetch_tiles(selector, tiles, zoom):
+    """
+    Fetch the given tiles with a single Overpass call and split the result.
+    """
+    data = OpenStreetMapService.overpass(_union_query(selector, tiles, zoom))
+    by_tile = {tile: [] for tile in tiles}
+    seen = set()
+    for element in data.get("elements", []):
+        if "lat" not in element or element.get("id") in seen:
+            continue
+        seen.add(element.get("id"))
+        tile = tile_for(element["lat"], element["lon"], zoom)
+        # Elements on a shared edge come back for both tiles; keep one copy.
+        if tile in by_tile:
+            by_tile[tile].append(element)
+    return by_tile
+
+
+def _load_tiles(selector, tiles, zoom, fetch_counts):
+    """
+    Fetch missing tiles upstream and store them; `fetch_counts` holds the
+    previous fetch_count of expired tiles being refreshed.
+    """
+    fetched = _fetch_tiles(selector, tiles, zoom)
+    expires_at = timezone.now() + timedelta(seconds=settings.OVERPASS_TILE_TTL)
+    OverpassTile.objects.bulk_create(
+        [
+            OverpassTile(
+                selector=selector, zoom=zoom, x=x, y=y, elements=items, expires_at=expires_at,
+                # an expired tile being refreshed counts as another upstream fetch
+                fetch_count=fetch_counts.get((x, y), 0) + 1,
+            )
+            for (x, y), items in fetched.items()
+        ],
+        update_conflicts=True,
+        unique_fields=["selector", "zoom", "x", "y"],
+        update_fields=["elements", "fetched_at", "expires_at", "fetch_count"],
+    )
+    return fetched
+
+
+def _coalesced_load(selector, tiles, zoom, stored):
+    fetch_counts = {tile: stored[tile].fetch_count for tile in tiles if tile in stored}
+    return flight("overpass").do(
+        (selector, zoom, tuple(tiles)),
+        lambda: _load_tiles(selector, tiles, zoom, fetch_counts),
+        recheck=lambda: _fresh_tiles(selector, tiles, zoom),
+    )
+
+
+def _fresh_tiles(selector, tiles, zoom):
+    """
+    {tile: elements} when every tile is now fresh in the table (another
+    process fetched them while we waited), else MISSING.
+    """
+    fresh = {
+        (x, y): elements
+        for x, y, elements in OverpassTile.objects.filter(
+            selector=selector, zoom=zoom, expires_at__gt=timezone.now(),
+            x__range=(min(x for x, _ in tiles), max(x for x, _ in tiles)),
+            y__range=(min(y for _, y in tiles), max(y for _, y in tiles)),
+        ).values_list("x", "y", "elements")
+    }
+    if not all(tile in fresh for tile in tiles):
+        return MISSING
+    return {tile: fresh[tile] for tile in tiles}
+
+
+def fetch_elements(selector, lat, lon, radius_m, zoom=None):
+    """
+    Overpass elements matching `selector` within `radius_m` metres of
+    (lat, lon), nearest first, built from cached tiles where possible.
+    Returns (elements, stats) where stats counts tile hits, stale tiles
+    served, misses and upstream calls for this request.
+    """
+    zoom = zoom or settings.OVERPASS_TILE_ZOOM
+    wanted = tiles_for_radius(lat, lon, radius_m, zoom)
+    xs = [x for x, _ in wanted]
+    ys = [y for _, y in wanted]
+    now = timezone.now()
+
+    stored = {
+        (tile.x, tile.y): tile
+        for tile in OverpassTile.objects.filter(
+            selector=selector, zoom=zoom,
+            x__range=(min(xs), max(xs)), y__range=(min(ys), max(ys)),
+        )
+    }
+    oldest = revalidate.oldest_servable(now)
+    hits = [tile for tile in wanted if tile in stored and stored[tile].expires_at > now]
+    stale = [tile for tile in wanted if tile in stored and oldest < stored[tile].expires_at <= now]
+    served = set(hits) | set(stale)
+    missing = [tile for tile in wanted if tile not in served]
+
+    elements_by_tile = {tile: stored[tile].elements for tile in served}
+    if served:
+        OverpassTile.objects.filter(pk__in=[stored[tile].pk for tile in served]).update(
+            hit_count=F("hit_count") + 1
+        )
+    if stale:
+        revalidate.refresh(
+            ("overpass", selector, zoom, tuple(stale)),
+            lambda: _coalesced_load(selector, stale, zoom, stored),
+        )
+
+    if missing:
+        elements_by_tile.update(_coalesced_load(selector, missing, zoom, stored))
+
+    results = []
+    for items in elements_by_tile.values():
+        for element in items:
+            distance = haversine_m(lat, lon, element["lat"], element["lon"])
+            if distance <= radius_m:
+                results.append((distance, element))
+    results.sort(key=lambda item: item[0])
+
+    request_stats = {
+        "tiles": len(wanted),
+        "tile_hits": len(hits),
+        "tile_stale": len(stale),
+        "tile_misses": len(missing),
+        "upstream_calls": 1 if missing else 0,
+    }
+    with _stats_lock:
+        _stats["requests"] += 1
+        for key in ("tile_hits", "tile_stale", "tile_misses", "upstream_calls"):
+            _stats[key] += request_stats[key]
+    logger.info("Overpass tiles for %s: %s", selector, request_stats)
+
+    return [element for _, element in results], request_stats
+
+
+def stats():
+    """
+    Process-wide tile reuse counters since start-up.
+    """
+    with _stats_lock:
+        snapshot = dict(_stats)
+    reused = snapshot["tile_hits"] + snapshot["tile_stale"]
+    looked_up = reused + snapshot["tile_misses"]
+    snapshot["reuse_rate"] = reused / looked_up if looked_up else 0.0
+    return snapshot
@@ -0,0 +1,97 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import requests
+from django.conf import settings
+
+from .coalesce import flight
+from .http import get_client
+
+logger = logging.getLogger(__name__)
+
+# Shared by every request in the process so concurrent searches cannot spawn
+# more than PEXELS_MAX_WORKERS upstream calls between them.
+_executor = ThreadPoolExecutor(
+    max_workers=settings.PEXELS_MAX_WORKERS, thread_name_prefix='pexels'
+)
+
+
+class PexelsService:
+    """
+    Pexels photo search over the shared session.
+    """
+
+    @staticmethod
+    def is_configured():
+        return bool(settings.PEXELS_API_KEY)
+
+    @staticmethod
+    def search_images(query, per_page=1, timeout=None):
+        """
+        Raw Pexels search payload (`{'photos': [...], ...}`).
+        """
+        return get_client('pexels').get_json(
+            'search', params={'query': query, 'per_page': per_page}, timeout=timeout
+        )
+
+    @classmethod
+    def photo_src(cls, query, timeout=None):
+        """
+        The `src` dict (one URL per size) of the first photo matching `query`,
+        or an empty dict when Pexels has no match. Concurrent lookups of the
+        same query share one upstream call.
+        """
+        return flight('pexels').do(query, lambda: cls._first_photo_src(query, timeout))
+
+    @classmethod
+    def _first_photo_src(cls, query, timeout):
+        photos = cls.search_images(query, timeout=timeout).get('photos') or []
+        if not photos:
+            return {}
+        return photos[0].get('src') or {}
+
+    @classmethod
+    def image_url(cls, query, size='original', timeout=None):
+        """
+        URL of the first photo matching `query` in the given size, or None.
+        """
+        return cls.photo_src(query, timeout=timeout).get(size)
+
+    @classmethod
+    def photo_srcs(cls, queries, timeout=None, deadline=None):
+        """
+        Look up many queries concurrently. Identical queries are fetched once;
+        each call gets `timeout` seconds and the whole batch `deadline` seconds.
+        Returns {query: src dict} for the lookups that completed; failed calls
+        and stragglers are left out.
+        """
+        timeout = timeout or settings.PEXELS_CALL_TIMEOUT
+        deadline = deadline or settings.PEXELS_BATCH_DEADLINE
+        futures = {
+            query: _executor.submit(cls.photo_src, query, timeout)
+            for query in dict.fromkeys(queries)
+        }
+        if not futures:
+            return {}
+        done, not_done = wait(futures.values(), timeout=deadline)
+        for future in not_done:
+            future.cancel()
+        if not_done:
+            logger.warning('Pexels deadline hit, %d of %d lookups unfinished', len(not_done), len(futures))
+
+        srcs = {}
+        for query, future in futures.items():
+            if future in done:
+                try:
+                    srcs[query] = future.result()
+                except requests.RequestException as e:
+                    logger.warning('Pexels lookup for %r failed: %s', query, e)
+        return srcs
+
+    @classmethod
+    def image_urls(cls, queries, size='original', timeout=None, deadline=None):
+        """
+        {query: url or None} for many queries, see photo_srcs.
+        """
+        srcs = cls.photo_srcs(queries, timeout=timeout, deadline=deadline)
+        return {query: srcs.get(query, {}).get(size) for query in queries}
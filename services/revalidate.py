@@ -0,0 +1,67 @@
+"""
+Stale-while-revalidate for the provider caches.
+
+Cached provider data past its expiry is still served for up to
+PROVIDER_SERVE_STALE seconds: the caller answers from the stale entry and
+schedules a refresh here instead of waiting on (or failing with) the
+provider. Refreshes run on a small shared thread pool, at most one per key at
+a time; a failed refresh is logged and the stale entry keeps being served,
+while the provider's circuit breaker stops a dead provider from being called
+on every request. With PROVIDER_REVALIDATE_EAGER the refresh runs inline,
+which is what the tests use.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+_executor = ThreadPoolExecutor(
+    max_workers=settings.PROVIDER_REVALIDATE_WORKERS, thread_name_prefix='revalidate'
+)
+_pending = set()
+_pending_lock = threading.Lock()
+
+
+def oldest_servable(now):
+    """
+    Entries that expired before this time are too old to serve while stale.
+    """
+    return now - timedelta(seconds=settings.PROVIDER_SERVE_STALE)
+
+
+def refresh(key, func):
+    """
+    Run `func` in the background unless a refresh for `key` is already
+    pending. Returns whether a refresh was scheduled.
+    """
+    with _pending_lock:
+        if key in _pending:
+            return False
+        _pending.add(key)
+    if settings.PROVIDER_REVALIDATE_EAGER:
+        _run(key, func)
+    else:
+        _executor.submit(_run_in_thread, key, func)
+    return True
+
+
+def _run(key, func):
+    try:
+        func()
+    except Exception:
+        logger.warning('Background refresh of %r failed', key, exc_info=True)
+    finally:
+        with _pending_lock:
+            _pending.discard(key)
+
+
+def _run_in_thread(key, func):
+    try:
+        _run(key, func)
+    finally:
+        connection.close()
@@ -0,0 +1,564 @@
+import fcntl
+import json
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+import requests
+from django.contrib.auth import get_user_model
+from django.conf import settings
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from restaurants.models import Restaurant
+from bookings.models import Flight
+from bookings.sync import sync_flights
+from . import coalesce, geo, geocoding, overpass_tiles
+from .cache import MISSING
+from .fakes import FakeProviders, overpass_query, provider_settings
+from .http import ProviderUnavailable, breaker_stats, get_client
+from .models import GeocodeCacheEntry, OverpassTile
+from .osm_ingest import upsert_rows, values_by_key
+from .pexels_service import PexelsService
+
+RESTAURANT_FIELDS = ['name', 'address', 'latitude', 'longitude', 'cuisine', 'image_url']
+
+
+def restaurant_row(osm_id, **overrides):
+    row = {
+        'osm_id': osm_id,
+        'name': f'Restaurant {osm_id}',
+        'address': 'Kenyatta Avenue',
+        'latitude': -1.28,
+        'longitude': 36.82,
+        'cuisine': 'kenyan',
+        'image_url': '',
+    }
+    row.update(overrides)
+    return row
+
+
+class UpsertRowsTests(TestCase):
+    def test_inserts_then_updates_without_duplicates(self):
+        upsert_rows(Restaurant, [restaurant_row('1'), restaurant_row('2')], RESTAURANT_FIELDS)
+        upsert_rows(Restaurant, [restaurant_row('1', name='Renamed')], RESTAURANT_FIELDS)
+
+        self.assertEqual(Restaurant.objects.count(), 2)
+        self.assertEqual(Restaurant.objects.get(osm_id='1').name, 'Renamed')
+
+    def test_duplicate_keys_in_one_batch_collapse(self):
+        written = upsert_rows(
+            Restaurant, [restaurant_row('1'), restaurant_row('1', name='Last')], RESTAURANT_FIELDS
+        )
+
+        self.assertEqual(written, 1)
+        self.assertEqual(Restaurant.objects.get().name, 'Last')
+
+    def test_fields_outside_update_fields_are_kept(self):
+        upsert_rows(Restaurant, [restaurant_row('1', phone='0700')], RESTAURANT_FIELDS)
+        upsert_rows(Restaurant, [restaurant_row('1', phone='')], RESTAURANT_FIELDS)
+
+        self.assertEqual(Restaurant.objects.get().phone, '0700')
+
+    def test_query_count_is_per_chunk_not_per_row(self):
+        rows = [restaurant_row(str(i)) for i in range(50)]
+
+        # savepoint + one INSERT ... ON CONFLICT per chunk + release
+        with self.assertNumQueries(4):
+            upsert_rows(Restaurant, rows, RESTAURANT_FIELDS, batch_size=25)
+
+        self.assertEqual(len(values_by_key(Restaurant, [str(i) for i in range(50)], 'id')), 50)
+
+
+class GeoTests(TestCase):
+    def test_haversine(self):
+        # Nairobi to Mombasa is roughly 440 km as the crow flies
+        self.assertAlmostEqual(geo.haversine_m(-1.2864, 36.8172, -4.0435, 39.6682) / 1000, 440, delta=5)
+
+    def test_cell_ranges_cover_the_box(self):
+        south, west, north, east = geo.bounding_box(-1.28, 36.82, 5000)
+        ranges = geo.cell_ranges(south, west, north, east)
+
+        for lat, lon in [(south, west), (north, east), (-1.28, 36.82)]:
+            cell = geo.cell_for(lat, lon)
+            self.assertTrue(any(low <= cell <= high for low, high in ranges))
+
+    def test_large_boxes_collapse_to_one_range(self):
+        self.assertEqual(len(geo.cell_ranges(-40, 10, 40, 50)), 1)
+
+
+class FlakyHandler(BaseHTTPRequestHandler):
+    """Fails the first `failures` requests with 503, then answers with JSON after `delay` seconds."""
+    failures = 0
+    delay = 0
+    requests_seen = 0
+
+    def do_GET(self):
+        cls = type(self)
+        cls.requests_seen += 1
+        time.sleep(cls.delay)
+        if cls.requests_seen <= cls.failures:
+            self.send_response(503)
+            self.end_headers()
+            return
+        body = json.dumps({'path': self.path}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the client gave up waiting
+
+    def log_message(self, *args):
+        pass
+
+
+class ProviderClientTests(TestCase):
+    def setUp(self):
+        FlakyHandler.failures = 0
+        FlakyHandler.delay = 0
+        FlakyHandler.requests_seen = 0
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), FlakyHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        base_url = f'http://127.0.0.1:{self.server.server_port}'
+        providers = {
+            'fake': {'base_url': base_url, 'timeout': 2, 'retries': 2, 'backoff': 0, 'params': {'key': 'k'}},
+            'cached': {'base_url': base_url, 'timeout': 2, 'cache_ttl': 60},
+            'fragile': {'base_url': base_url, 'timeout': 0.2, 'retries': 0, 'breaker_failures': 2, 'breaker_reset': 60},
+        }
+        settings_override = override_settings(PROVIDERS=providers, HTTP_CACHE_BACKEND='memory')
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_client_is_shared(self):
+        self.assertIs(get_client('fake'), get_client('fake'))
+        self.assertIs(get_client('fake').session, get_client('fake').session)
+
+    def test_default_params_are_merged(self):
+        data = get_client('fake').get_json('search', params={'q': 'nairobi'})
+        self.assertEqual(data['path'], '/search?key=k&q=nairobi')
+
+    def test_retries_server_errors(self):
+        FlakyHandler.failures = 2
+        self.assertEqual(get_client('fake').get_json('x')['path'], '/x?key=k')
+        self.assertEqual(FlakyHandler.requests_seen, 3)
+
+    def test_responses_are_cached_per_provider(self):
+        get_client('cached').get_json('x')
+        get_client('cached').get_json('x')
+        get_client('fake').get_json('x')
+        self.assertEqual(FlakyHandler.requests_seen, 2)
+
+
+class CircuitBreakerTests(TestCase):
+    setUp = ProviderClientTests.setUp
+
+    def test_breaker_opens_after_repeated_failures_and_fails_fast(self):
+        FlakyHandler.failures = 10
+        client = get_client('fragile')
+        for _ in range(2):
+            with self.assertRaises(requests.HTTPError):
+                client.get_json('x')
+
+        started = time.perf_counter()
+        with self.assertRaises(ProviderUnavailable) as raised:
+            client.get_json('x')
+        self.assertLess(time.perf_counter() - started, 0.05)
+        self.assertEqual(FlakyHandler.requests_seen, 2)
+        self.assertGreater(raised.exception.retry_after, 59)
+        self.assertEqual(breaker_stats()['fragile'], {'state': 'open', 'failures': 2})
+
+    def test_timeouts_trip_the_breaker(self):
+        FlakyHandler.delay = 0.5
+        client = get_client('fragile')
+        for _ in range(2):
+            with self.assertRaisesRegex(requests.ConnectionError, 'Read timed out'):
+                client.get_json('x')
+        self.assertEqual(client.breaker.state, 'open')
+
+    def test_half_open_trial_closes_or_reopens_the_breaker(self):
+        FlakyHandler.failures = 3
+        client = get_client('fragile')
+        client.breaker.reset_timeout = 0.05
+        for _ in range(2):
+            with self.assertRaises(requests.HTTPError):
+                client.get_json('x')
+
+        time.sleep(0.06)
+        self.assertEqual(client.breaker.state, 'half_open')
+        with self.assertRaises(requests.HTTPError):
+            client.get_json('x')  # the trial fails: open again straight away
+        self.assertEqual(client.breaker.state, 'open')
+
+        time.sleep(0.06)
+        self.assertEqual(client.get_json('x')['path'], '/x')
+        self.assertEqual(client.breaker.stats(), {'state': 'closed', 'failures': 0})
+
+    def test_trial_failing_outside_requests_still_settles_the_breaker(self):
+        FlakyHandler.failures = 2
+        client = get_client('fragile')
+        client.breaker.reset_timeout = 0.05
+        for _ in range(2):
+            with self.assertRaises(requests.HTTPError):
+                client.get_json('x')
+
+        time.sleep(0.06)
+        with mock.patch.object(client.session, 'get', side_effect=sqlite3.OperationalError('disk I/O error')):
+            with self.assertRaises(sqlite3.OperationalError):
+                client.get_json('x')
+        self.assertEqual(client.breaker.state, 'open')
+
+        time.sleep(0.06)
+        self.assertEqual(client.get_json('x')['path'], '/x')
+        self.assertEqual(client.breaker.state, 'closed')
+
+    def test_success_resets_the_failure_count(self):
+        FlakyHandler.failures = 1
+        client = get_client('fragile')
+        with self.assertRaises(requests.HTTPError):
+            client.get_json('x')
+        client.get_json('x')
+        FlakyHandler.failures, FlakyHandler.requests_seen = 1, 0
+        with self.assertRaises(requests.HTTPError):
+            client.get_json('x')
+        self.assertEqual(client.breaker.state, 'closed')
+
+
+@override_settings(GEOCODE_CACHE_TTL=3600, GEOCODE_NEGATIVE_CACHE_TTL=60, PROVIDER_REVALIDATE_EAGER=True)
+class GeocodingCacheTests(TestCase):
+    def setUp(self):
+        geocoding.clear_memory_cache()
+        self.addCleanup(geocoding.clear_memory_cache)
+        patcher = mock.patch(
+            'services.geocoding.OpenStreetMapService.search_locations',
+            side_effect=lambda query, limit: [{'lat': '-1.28', 'lon': '36.82'}] if 'nairobi' in query.lower() else [],
+        )
+        self.search_locations = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_normalization(self):
+        self.assertEqual(geocoding.normalize_query('  Nairobí   CBD '), 'nairobi cbd')
+        self.assertEqual(geocoding.cache_key('NAIROBI', 1), geocoding.cache_key('nairobi', 1))
+        self.assertNotEqual(geocoding.cache_key('nairobi', 1), geocoding.cache_key('nairobi', 10))
+
+    def test_repeated_lookups_hit_upstream_once(self):
+        for query in ['Nairobi', 'nairobi', ' NAIRÓBI ']:
+            self.assertEqual(geocoding.geocode(query), {'lat': -1.28, 'lon': 36.82})
+        self.assertEqual(self.search_locations.call_count, 1)
+
+    def test_database_cache_survives_memory_eviction(self):
+        geocoding.geocode('Nairobi')
+        geocoding.clear_memory_cache()
+
+        with self.assertNumQueries(1):
+            self.assertIsNotNone(geocoding.geocode('Nairobi'))
+        self.assertEqual(self.search_locations.call_count, 1)
+
+    def test_misses_are_cached(self):
+        self.assertIsNone(geocoding.geocode('Atlantis'))
+        geocoding.clear_memory_cache()
+        self.assertIsNone(geocoding.geocode('atlantis'))
+
+        self.assertEqual(self.search_locations.call_count, 1)
+        entry = GeocodeCacheEntry.objects.get()
+        self.assertEqual(entry.results, [])
+        self.assertLess(entry.expires_at, timezone.now() + timedelta(seconds=61))
+
+    def test_expired_entries_are_refetched(self):
+        geocoding.geocode('Nairobi')
+        GeocodeCacheEntry.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        geocoding.clear_memory_cache()
+
+        geocoding.geocode('Nairobi')
+        self.assertEqual(self.search_locations.call_count, 2)
+        self.assertEqual(GeocodeCacheEntry.objects.count(), 1)
+
+    def test_expired_entries_are_served_while_the_provider_is_down(self):
+        geocoding.geocode('Nairobi')
+        GeocodeCacheEntry.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        geocoding.clear_memory_cache()
+        self.search_locations.side_effect = ProviderUnavailable('nominatim is unavailable')
+
+        with self.assertLogs('services.revalidate', 'WARNING'):
+            self.assertEqual(geocoding.geocode('Nairobi'), {'lat': -1.28, 'lon': 36.82})
+
+        with override_settings(PROVIDER_SERVE_STALE=0), self.assertRaises(ProviderUnavailable):
+            geocoding.geocode('Nairobi')
+
+
+def fake_overpass_grid(step=0.005):
+    """A fake Overpass answering bbox union queries from a regular grid of nodes."""
+    nodes = [
+        {'type': 'node', 'id': i * 1000 + j, 'lat': -1.40 + i * step, 'lon': 36.70 + j * step, 'tags': {}}
+        for i in range(60) for j in range(60)
+    ]
+
+    def overpass(query):
+        boxes = [tuple(map(float, box)) for box in re.findall(r'\(([-\d.]+),([-\d.]+),([-\d.]+),([-\d.]+)\)', query)]
+        return {'elements': [
+            node for node in nodes
+            if any(s <= node['lat'] <= n and w <= node['lon'] <= e for s, w, n, e in boxes)
+        ]}
+    return overpass
+
+
+@override_settings(OVERPASS_TILE_ZOOM=13, OVERPASS_TILE_TTL=3600, PROVIDER_REVALIDATE_EAGER=True)
+class OverpassTileTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch('services.overpass_tiles.OpenStreetMapService.overpass', side_effect=fake_overpass_grid())
+        self.overpass = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_tile_round_trip(self):
+        x, y = overpass_tiles.tile_for(-1.2864, 36.8172, 13)
+        south, west, north, east = overpass_tiles.tile_bounds(x, y, 13)
+        self.assertTrue(south <= -1.2864 <= north and west <= 36.8172 <= east)
+
+    def test_results_match_a_direct_radius_query(self):
+        elements, stats = overpass_tiles.fetch_elements(overpass_tiles.RESTAURANTS, -1.28, 36.82, 3000)
+
+        expected = {
+            node['id'] for node in fake_overpass_grid()('(-90,-180,90,180)')['elements']
+            if geo.haversine_m(-1.28, 36.82, node['lat'], node['lon']) <= 3000
+        }
+        self.assertEqual({element['id'] for element in elements}, expected)
+        self.assertEqual(stats['upstream_calls'], 1)
+        distances = [geo.haversine_m(-1.28, 36.82, e['lat'], e['lon']) for e in elements]
+        self.assertEqual(distances, sorted(distances))
+
+    def test_overlapping_searches_share_tiles(self):
+        _, first = overpass_tiles.fetch_elements(overpass_tiles.RESTAURANTS, -1.2864, 36.8172, 5000)
+        _, second = overpass_tiles.fetch_elements(overpass_tiles.RESTAURANTS, -1.2833, 36.8219, 5000)
+        _, third = overpass_tiles.fetch_elements(overpass_tiles.RESTAURANTS, -1.2864, 36.8172, 2000)
+
+        self.assertEqual(first['tile_hits'], 0)
+        self.assertGreater(second['tile_hits'], second['tile_misses'])
+        self.assertEqual(third, {
+            'tiles': third['tiles'], 'tile_hits': third['tiles'], 'tile_stale': 0, 'tile_misses': 0, 'upstream_calls': 0,
+        })
+        self.assertEqual(self.overpass.call_count, 2 if second['tile_misses'] else 1)
+
+    def test_expired_tiles_are_served_and_refreshed(self):
+        first, _ = overpass_tiles.fetch_elements(overpass_tiles.ATTRACTIONS, -1.28, 36.82, 1000)
+        OverpassTile.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.overpass.side_effect = requests.ConnectionError('down')
+
+        # The refresh fails, the stale tiles still answer the request
+        with self.assertLogs('services.revalidate', 'WARNING'):
+            elements, stats = overpass_tiles.fetch_elements(overpass_tiles.ATTRACTIONS, -1.28, 36.82, 1000)
+        self.assertEqual(elements, first)
+        self.assertEqual((stats['tile_hits'], stats['tile_stale'], stats['upstream_calls']), (0, stats['tiles'], 0))
+
+        self.overpass.side_effect = fake_overpass_grid()
+        overpass_tiles.fetch_elements(overpass_tiles.ATTRACTIONS, -1.28, 36.82, 1000)
+        self.assertEqual(set(OverpassTile.objects.values_list('fetch_count', flat=True)), {2})
+        self.assertFalse(OverpassTile.objects.filter(expires_at__lte=timezone.now()).exists())
+
+    @override_settings(PROVIDER_SERVE_STALE=0)
+    def test_tiles_too_old_to_serve_are_refetched(self):
+        overpass_tiles.fetch_elements(overpass_tiles.ATTRACTIONS, -1.28, 36.82, 1000)
+        OverpassTile.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.overpass.side_effect = requests.ConnectionError('down')
+
+        with self.assertRaises(requests.ConnectionError):
+            overpass_tiles.fetch_elements(overpass_tiles.ATTRACTIONS, -1.28, 36.82, 1000)
+
+
+def wait_for(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError('timed out waiting')
+        time.sleep(0.005)
+
+
+class SingleFlightTests(TestCase):
+    def run_callers(self, single, key, func, count, **kwargs):
+        results, errors = [], []
+
+        def caller():
+            try:
+                results.append(single.do(key, func, **kwargs))
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=caller) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        return threads, results, errors
+
+    def test_concurrent_identical_calls_share_one_upstream_call(self):
+        single = coalesce.SingleFlight('test')
+        release = threading.Event()
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            release.wait(5)
+            return {'lat': '-1.28'}
+
+        threads, results, errors = self.run_callers(single, 'nairobi', fetch, 20)
+        wait_for(lambda: single.stats()['calls'] == 20)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual((len(calls), errors), (1, []))
+        self.assertEqual(len(results), 20)
+        self.assertTrue(all(result is results[0] for result in results))
+        self.assertEqual(single.stats(), {'calls': 20, 'upstream': 1, 'coalesced': 19, 'coalesced_rate': 0.95})
+
+        # Once the call finished the next caller goes upstream again
+        single.do('nairobi', fetch)
+        self.assertEqual(len(calls), 2)
+
+    def test_followers_get_the_leaders_exception(self):
+        single = coalesce.SingleFlight('test')
+        release = threading.Event()
+
+        def fetch():
+            release.wait(5)
+            raise ValueError('upstream down')
+
+        threads, results, errors = self.run_callers(single, 'nairobi', fetch, 5)
+        wait_for(lambda: single.stats()['calls'] == 5)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, [])
+        self.assertEqual([str(e) for e in errors], ['upstream down'] * 5)
+        self.assertEqual(single.do('nairobi', lambda: 'recovered'), 'recovered')
+
+    def test_different_keys_do_not_wait_for_each_other(self):
+        single = coalesce.SingleFlight('test')
+        release = threading.Event()
+        threads, _, _ = self.run_callers(single, 'nairobi', lambda: release.wait(5), 1)
+        wait_for(lambda: single.stats()['calls'] == 1)
+
+        self.assertEqual(single.do('mombasa', lambda: 'mombasa'), 'mombasa')
+        release.set()
+        threads[0].join()
+        self.assertEqual(single.stats()['coalesced'], 0)
+
+    def test_waiting_on_another_process_rechecks_the_cache(self):
+        single = coalesce.SingleFlight('test')
+        with tempfile.TemporaryDirectory() as lock_dir, override_settings(
+            COALESCE_CROSS_PROCESS=True, COALESCE_LOCK_DIR=lock_dir, COALESCE_LOCK_TIMEOUT=5,
+        ):
+            filled = []
+            path = coalesce._lock_path('test', 'nairobi')
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Another worker is fetching: it holds the lock on its own open file
+            with open(path, 'a') as other:
+                fcntl.flock(other, fcntl.LOCK_EX)
+                threads, results, errors = self.run_callers(
+                    single, 'nairobi', lambda: 'upstream', 1,
+                    recheck=lambda: filled[0] if filled else MISSING,
+                )
+                time.sleep(0.1)
+                filled.append('from the database')
+                fcntl.flock(other, fcntl.LOCK_UN)
+            threads[0].join()
+
+            self.assertEqual((results, errors), (['from the database'], []))
+            self.assertEqual(single.stats()['upstream'], 0)
+
+            # An uncontended lock goes straight upstream without rechecking
+            self.assertEqual(single.do('nairobi', lambda: 'upstream', recheck=lambda: 'stale'), 'upstream')
+
+    def test_pexels_lookups_are_coalesced(self):
+        coalesce.flight('pexels').reset_stats()
+        release = threading.Event()
+
+        def search_images(query, per_page=1, timeout=None):
+            release.wait(5)
+            return {'photos': [{'src': {'original': f'https://images.pexels.com/{query}.jpg'}}]}
+
+        with mock.patch.object(PexelsService, 'search_images', side_effect=search_images) as upstream:
+            threads = [
+                threading.Thread(target=PexelsService.photo_srcs, args=(['Nairobi', 'Mombasa'],))
+                for _ in range(4)
+            ]
+            for thread in threads:
+                thread.start()
+            wait_for(lambda: coalesce.flight('pexels').stats()['calls'] == 8)
+            release.set()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(upstream.call_count, 2)
+        self.assertEqual(coalesce.stats()['pexels']['coalesced'], 6)
+
+
+class ProviderStatsViewTests(APITestCase):
+    def test_admin_only(self):
+        user = get_user_model().objects.create_user(username='ops', email='ops@example.com')
+        self.client.force_authenticate(user)
+        self.assertEqual(self.client.get('/services/stats/').status_code, 403)
+
+        user.is_staff = True
+        user.save()
+        response = self.client.get('/services/stats/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('coalescing', response.data)
+        self.assertIn('reuse_rate', response.data['overpass_tiles'])
+
+
+@override_settings(PROVIDER_REVALIDATE_EAGER=True)
+class FakeProvidersTests(TestCase):
+    def setUp(self):
+        geocoding.clear_memory_cache()
+        self.addCleanup(geocoding.clear_memory_cache)
+        self.fakes = FakeProviders(latency_scale=0, seed=7).start()
+        self.addCleanup(self.fakes.stop)
+        providers = provider_settings(settings.PROVIDERS, self.fakes.url)
+        providers['aviationstack']['retries'] = 0
+        settings_override = override_settings(PROVIDERS=providers, HTTP_CACHE_BACKEND='memory')
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_geocoding_and_overpass_answer_near_the_city(self):
+        coords = geocoding.geocode('Nairobi')
+        self.assertAlmostEqual(coords['lat'], -1.286389, places=4)
+
+        elements, stats = overpass_tiles.fetch_elements(overpass_tiles.RESTAURANTS, coords['lat'], coords['lon'], 2000)
+        self.assertGreater(len(elements), 50)
+        self.assertTrue(all(element['tags']['amenity'] == 'restaurant' for element in elements))
+        self.assertTrue(all(geo.haversine_m(coords['lat'], coords['lon'], e['lat'], e['lon']) <= 2000 for e in elements))
+        self.assertEqual(self.fakes.requests, {'nominatim': 1, 'overpass': stats['upstream_calls']})
+
+    def test_payloads_depend_only_on_the_request_and_seed(self):
+        query = overpass_tiles._union_query(overpass_tiles.ATTRACTIONS, [(4915, 4124)], 13)
+        self.assertEqual(overpass_query(7, query), overpass_query(7, query))
+        self.assertNotEqual(overpass_query(7, query)['elements'], overpass_query(8, query)['elements'])
+
+    def test_pexels_photos_have_every_size(self):
+        src = PexelsService.photo_src('nairobi national park')
+        self.assertEqual(
+            set(src), {'original', 'large2x', 'large', 'medium', 'small', 'portrait', 'landscape', 'tiny'}
+        )
+
+    @override_settings(AVIATIONSTACK_PAGE_SIZE=10)
+    def test_flight_sync_pages_through_a_route(self):
+        result = sync_flights('NBO', 'MBA')
+
+        self.assertEqual(self.fakes.requests['aviationstack'], result['pages'])
+        self.assertEqual(Flight.objects.count(), result['seen'])
+        self.assertEqual(set(Flight.objects.values_list('origin_iata', 'destination_iata')), {('NBO', 'MBA')})
+
+    def test_injected_errors(self):
+        self.fakes.error_rate = 1
+        with self.assertRaises(requests.HTTPError) as raised:
+            get_client('aviationstack').get_json('flights')
+        self.assertEqual(raised.exception.response.status_code, 503)
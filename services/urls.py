@@ -0,0 +1,6 @@
+from django.urls import path
+from .views import provider_stats
+
+urlpatterns = [
+    path('stats/', provider_stats, name='provider-stats'),
+]
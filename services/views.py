@@ -0,0 +1,58 @@
+import logging
+import math
+
+import requests
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+
+from . import coalesce, http, overpass_tiles
+
+logger = logging.getLogger(__name__)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def provider_stats(request):
+    """
+    This worker's provider counters: circuit breaker states, calls coalesced
+    per provider and Overpass tile reuse. Counters are per process and reset on restart.
+    """
+    return Response({
+        'breakers': http.breaker_stats(),
+        'coalescing': coalesce.stats(),
+        'overpass_tiles': overpass_tiles.stats(),
+    })
+
+
+def provider_unavailable(error):
+    """
+    Response for a failed provider call. Outages (connection errors,
+    timeouts, 5xx or 429 answers, or an open circuit breaker) are a 503, with
+    Retry-After when the breaker knows it. Anything else, e.g. a 401 for a bad
+    API key, is our request or configuration being rejected: that is logged
+    and answered with a 502 rather than reported as an outage.
+    """
+    if not _is_outage(error):
+        logger.error("Upstream provider rejected the request: %s", error)
+        return Response(
+            {'error': 'An upstream provider rejected the request'},
+            status=status.HTTP_502_BAD_GATEWAY,
+        )
+    response = Response(
+        {'error': 'An upstream provider is unavailable, please retry shortly'},
+        status=status.HTTP_503_SERVICE_UNAVAILABLE,
+    )
+    retry_after = getattr(error, 'retry_after', None)
+    if retry_after is not None:
+        # Round up, so a client that waits this long finds the breaker half-open
+        response['Retry-After'] = str(max(math.ceil(retry_after), 1))
+    return response
+
+
+def _is_outage(error):
+    if isinstance(error, (http.ProviderUnavailable, requests.ConnectionError, requests.Timeout)):
+        return True
+    status_code = getattr(getattr(error, 'response', None), 'status_code', None)
+    return status_code is not None and (status_code >= 500 or status_code == 429)
@@ -36,6 +36,9 @@ INSTALLED_APPS = [
     'bookings',
     'attractions',
     'accounts',  
+    'services',
+    'jobs',
+    'idempotency',
 ]
 
 MIDDLEWARE = [
@@ -146,6 +149,139 @@ CORS_ALLOW_ALL_ORIGINS = True
 
 # API Keys
 AVIATIONSTACK_API_KEY = config("AVIATIONSTACK_API_KEY")
+PEXELS_API_KEY = config("PEXELS_API_KEY", default="")
+
+# Local stand-ins for every provider, e.g. FAKE_PROVIDERS_URL=http://127.0.0.1:8900
+# for offline load tests. They accept any key, so Pexels works without one;
+# resolved here so the pexels session below sends it.
+FAKE_PROVIDERS_URL = config("FAKE_PROVIDERS_URL", default="")
+if FAKE_PROVIDERS_URL:
+    PEXELS_API_KEY = PEXELS_API_KEY or "fake"
+
+# External providers: one pooled session per provider (see services/http.py).
+# cache_ttl is in seconds, 0 disables response caching for that provider.
+HTTP_CACHE_BACKEND = config("HTTP_CACHE_BACKEND", default="sqlite")  # any requests-cache backend
+HTTP_CACHE_DIR = BASE_DIR / ".http_cache"
+PROVIDERS = {
+    "nominatim": {
+        "base_url": "https://nominatim.openstreetmap.org",
+        "timeout": 10,
+        "retries": 2,
+        "cache_ttl": 24 * 3600,
+        # Nominatim's usage policy requires an identifying User-Agent
+        "headers": {"User-Agent": "TravelWithSue/0.1 (suegathul0@icloud.com)"},
+    },
+    "overpass": {
+        "base_url": "https://overpass-api.de/api/interpreter",
+        "timeout": 60,
+        "retries": 2,
+        "cache_ttl": 3600,
+    },
+    "pexels": {
+        "base_url": "https://api.pexels.com/v1",
+        "timeout": 10,
+        "retries": 2,
+        "cache_ttl": 24 * 3600,
+        "headers": {"Authorization": PEXELS_API_KEY},
+    },
+    "aviationstack": {
+        "base_url": "http://api.aviationstack.com/v1",
+        "timeout": 20,
+        "retries": 2,
+        "cache_ttl": 300,
+        "params": {"access_key": AVIATIONSTACK_API_KEY},
+    },
+}
+
+# Send every provider call to the local stand-ins instead
+# (`manage.py run_fake_providers`, see services/fakes.py).
+if FAKE_PROVIDERS_URL:
+    for _name, _provider in PROVIDERS.items():
+        _provider["base_url"] = f"{FAKE_PROVIDERS_URL.rstrip('/')}/{_name}"
 
 # Custom User Model
 AUTH_USER_MODEL = 'accounts.User'
+
+# Attractions refresh: the list endpoint only reads the Attraction table, the
+# Overpass sync runs from `manage.py sync_attractions` or a background thread.
+ATTRACTION_SYNC_TTL = config("ATTRACTION_SYNC_TTL", default=3600, cast=int)  # seconds
+ATTRACTION_SYNC_IN_PROCESS = config("ATTRACTION_SYNC_IN_PROCESS", default=True, cast=bool)
+ATTRACTION_SYNC_AREAS = {
+    "nairobi": {"lat": -1.286389, "lon": 36.817223, "radius": 10000},
+}
+
+# Nominatim lookups are cached in the database (services.GeocodeCacheEntry)
+# behind an in-process LRU. Misses are cached for a shorter time.
+GEOCODE_CACHE_TTL = config("GEOCODE_CACHE_TTL", default=30 * 24 * 3600, cast=int)  # seconds
+GEOCODE_NEGATIVE_CACHE_TTL = config("GEOCODE_NEGATIVE_CACHE_TTL", default=24 * 3600, cast=int)
+GEOCODE_MEMORY_CACHE_SIZE = 2048
+GEOCODE_MEMORY_CACHE_TTL = 600
+
+# Pexels image lookups run on a shared, bounded thread pool. Each call gets
+# PEXELS_CALL_TIMEOUT seconds and a whole batch PEXELS_BATCH_DEADLINE seconds.
+PEXELS_MAX_WORKERS = config("PEXELS_MAX_WORKERS", default=8, cast=int)
+PEXELS_CALL_TIMEOUT = config("PEXELS_CALL_TIMEOUT", default=3.0, cast=float)
+PEXELS_BATCH_DEADLINE = config("PEXELS_BATCH_DEADLINE", default=4.0, cast=float)
+
+# Photo lookups shared by hotels, restaurants and attractions
+# (services.ImageCacheEntry behind an in-process LRU).
+IMAGE_CACHE_TTL = config("IMAGE_CACHE_TTL", default=30 * 24 * 3600, cast=int)  # seconds
+IMAGE_NEGATIVE_CACHE_TTL = config("IMAGE_NEGATIVE_CACHE_TTL", default=24 * 3600, cast=int)
+IMAGE_MEMORY_CACHE_SIZE = 4096
+IMAGE_MEMORY_CACHE_TTL = 600
+
+# Overpass results are cached per slippy-map tile (services.OverpassTile);
+# zoom 13 tiles are roughly 5 km across at the equator.
+OVERPASS_TILE_ZOOM = 13
+OVERPASS_TILE_TTL = config("OVERPASS_TILE_TTL", default=24 * 3600, cast=int)  # seconds
+
+# Background jobs (jobs.Job), run by `manage.py run_jobs`. With JOBS_EAGER the
+# job runs in-process as soon as the enqueuing transaction commits.
+JOBS_EAGER = config("JOBS_EAGER", default=False, cast=bool)
+JOBS_LEASE = 300  # seconds before a job held by a dead worker is retried
+JOBS_RETRY_BASE_DELAY = config("JOBS_RETRY_BASE_DELAY", default=30, cast=int)  # seconds, doubled per attempt
+JOBS_RETRY_MAX_DELAY = 3600
+
+# Rendered boarding-pass QR PNGs (bookings.qr), a few KB each
+QR_CACHE_SIZE = config("QR_CACHE_SIZE", default=2048, cast=int)
+QR_CACHE_TTL = 24 * 3600  # seconds; rendering is deterministic, so this only bounds memory churn
+
+# Boarding tokens (bookings.boarding) stay valid this long after departure
+BOARDING_TOKEN_GRACE = config("BOARDING_TOKEN_GRACE", default=6 * 3600, cast=int)  # seconds
+
+# Aviationstack flight sync (bookings.sync): pages of AVIATIONSTACK_PAGE_SIZE
+# (the free plan allows 100) up to AVIATIONSTACK_MAX_PAGES per run. A route
+# synced within FLIGHT_SYNC_TTL is served from the database only.
+AVIATIONSTACK_PAGE_SIZE = config("AVIATIONSTACK_PAGE_SIZE", default=100, cast=int)
+AVIATIONSTACK_MAX_PAGES = config("AVIATIONSTACK_MAX_PAGES", default=20, cast=int)
+FLIGHT_SYNC_TTL = config("FLIGHT_SYNC_TTL", default=900, cast=int)  # seconds
+
+# Seat holds (pending bookings) during checkout; expired by `manage.py expire_seat_holds`
+SEAT_HOLD_TTL = config("SEAT_HOLD_TTL", default=600, cast=int)  # seconds
+
+# Idempotency-Key handling for booking POSTs (idempotency.keys). A retry that
+# arrives while the first request runs waits up to IDEMPOTENCY_WAIT seconds.
+IDEMPOTENCY_KEY_TTL = config("IDEMPOTENCY_KEY_TTL", default=24 * 3600, cast=int)  # seconds a response is replayed
+IDEMPOTENCY_WAIT = config("IDEMPOTENCY_WAIT", default=10.0, cast=float)
+IDEMPOTENCY_LEASE = 60  # seconds before a key left in progress by a dead worker is taken over
+
+# Flight change notifications (bookings.notifications) go out in batches of
+# this many messages over one e-mail connection
+FLIGHT_NOTIFY_BATCH_SIZE = config("FLIGHT_NOTIFY_BATCH_SIZE", default=100, cast=int)
+
+# Identical concurrent provider calls share one upstream request
+# (services.coalesce). With COALESCE_CROSS_PROCESS, workers on the same host
+# also queue behind each other through file locks in COALESCE_LOCK_DIR.
+COALESCE_CROSS_PROCESS = config("COALESCE_CROSS_PROCESS", default=False, cast=bool)
+COALESCE_LOCK_DIR = HTTP_CACHE_DIR / "locks"
+COALESCE_LOCK_STRIPES = 256  # lock files per provider; unrelated keys may share one
+COALESCE_LOCK_TIMEOUT = config("COALESCE_LOCK_TIMEOUT", default=30.0, cast=float)  # seconds, then call anyway
+
+# Provider resilience. Cached provider data (geocodes, images, Overpass tiles,
+# synced flights) is still served up to PROVIDER_SERVE_STALE seconds past its
+# expiry while it is refreshed in the background (services.revalidate).
+# Circuit breakers are configured per provider in PROVIDERS with
+# breaker_failures (default 5) and breaker_reset (default 30 seconds).
+PROVIDER_SERVE_STALE = config("PROVIDER_SERVE_STALE", default=7 * 24 * 3600, cast=int)  # seconds
+PROVIDER_REVALIDATE_WORKERS = config("PROVIDER_REVALIDATE_WORKERS", default=4, cast=int)
+PROVIDER_REVALIDATE_EAGER = config("PROVIDER_REVALIDATE_EAGER", default=False, cast=bool)  # refresh inline, for tests
@@ -25,4 +25,5 @@ path('restaurants/', include('restaurants.urls')),
 path('bookings/', include('bookings.urls')),
 path('attractions/', include('attractions.urls')),
 path('accounts/', include('accounts.urls')),
+path('services/', include('services.urls')),
 ]
\ No newline at end of file